@@ -10,7 +10,21 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.urls import reverse
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'GTD.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Server-Sent Event streams stay open for hours, mostly idle
+EVENTS_PATH = reverse('async-events')
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+        # Django's handler gives every request its own thread for sync code
+        # (ThreadSensitiveContext), held until the response ends; streams
+        # share the default one instead, so idle connections hold no thread
+        await django_application.handle(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,84 @@
+"""
+MySQL backend that returns connections to a per-process pool on close.
+
+Django's persistent connections (CONN_MAX_AGE) are kept per thread. Under
+ASGI, sync code for each request may run on a different thread, so those
+connections are rarely reused and can pile up. With this backend Django
+still "closes" the connection at the end of every request (use it with
+CONN_MAX_AGE=0), but the underlying MySQL connection is handed back to a
+pool and reused by the next request on any thread, skipping the TCP and
+authentication handshake. Pooled connections are pinged before reuse.
+
+Set ``POOL_SIZE`` in the database settings to cap the idle connections
+kept per process.
+"""
+import queue
+import threading
+
+from django.db.backends.mysql import base as mysql
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Thread-safe LIFO pool of idle DB-API connections."""
+
+    def __init__(self, size):
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        """Return an idle connection that answers a ping, or None."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            try:
+                connection.ping()
+            except mysql.Database.Error:
+                self._discard(connection)
+                continue
+            return connection
+
+    def release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            self._discard(connection)
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except mysql.Database.Error:
+            pass
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        with _pools_lock:
+            if self.alias not in _pools:
+                _pools[self.alias] = ConnectionPool(self.settings_dict.get('POOL_SIZE', 10))
+            return _pools[self.alias]
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire()
+        if connection is None:
+            connection = super().get_new_connection(conn_params)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.errors_occurred and not self.is_usable():
+                return self.connection.close()
+            # Never hand a connection with an open transaction to the next request
+            try:
+                self.connection.rollback()
+            except mysql.Database.Error:
+                return self.connection.close()
+            self.pool.release(self.connection)
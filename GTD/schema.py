@@ -0,0 +1,177 @@
+"""
+Pre-generated OpenAPI schema.
+
+drf_yasg walks every view and serializer to build the schema, which is far
+too slow to repeat on every hit of ``/api/schema/``. The schema is instead
+generated once into a versioned artifact,
+``OPENAPI_SCHEMA_DIR/openapi-<version>.json``, either ahead of time by
+``manage.py generate_schema`` or by the first request that needs it. The
+version is a fingerprint of the URLconf, the views, their serializers,
+filters and paginators, so the artifact is only rebuilt when one of those
+changes.
+
+Spec responses carry a strong ETag and answer ``If-None-Match`` with
+``304 Not Modified``. The UI pages (Swagger, ReDoc) are unchanged: they
+are cheap to render and load the spec from the cached endpoint.
+"""
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import drf_yasg
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import URLResolver, get_resolver
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, yaml_dump
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+
+INFO = {
+    'title': "GTD (Getting Things Done) API",
+    'default_version': 'v1',
+    'description': "API documentation for GTD (Getting Things Done) Application",
+}
+# drf_yasg adds the version to this object while generating, so the
+# fingerprint uses INFO instead
+SCHEMA_INFO = openapi.Info(**INFO)
+
+_lock = threading.Lock()
+_version = None
+_documents = {}
+
+
+def _walk(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix + str(pattern.pattern), pattern.callback
+
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return f'{obj.__module__}.{obj.__qualname__}'
+
+
+def compute_version():
+    """Fingerprint everything the generated schema depends on."""
+    digest = hashlib.sha256()
+
+    def add(*parts):
+        for part in parts:
+            digest.update(str(part).encode())
+            digest.update(b'\0')
+
+    add(drf_yasg.__version__, sorted(INFO.items()), getattr(settings, 'SWAGGER_SETTINGS', None))
+    for route, callback in _walk(get_resolver().url_patterns):
+        add(route, f'{callback.__module__}.{callback.__qualname__}', getattr(callback, 'actions', None))
+        view = getattr(callback, 'cls', None)
+        if view is None:
+            continue
+        add(_source(view))
+        for backend in getattr(view, 'filter_backends', ()):
+            add(_source(backend))
+        if getattr(view, 'pagination_class', None):
+            add(_source(view.pagination_class))
+        serializer_class = getattr(view, 'serializer_class', None)
+        if serializer_class is not None:
+            # repr() lists every field, including those derived from the model
+            add(_source(serializer_class), repr(serializer_class()))
+    return digest.hexdigest()[:16]
+
+
+def schema_version():
+    global _version
+    if _version is None:
+        _version = compute_version()
+    return _version
+
+
+def artifact_path(version=None):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f'openapi-{version or schema_version()}.json'
+
+
+def generate_schema():
+    """Generate the full schema as JSON bytes."""
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(SCHEMA_INFO)
+    # Every authenticated user may see every endpoint, so one public
+    # document serves all of them
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def write_artifact(path, content):
+    """Write ``content`` to ``path`` atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.openapi-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_schema():
+    """The schema as JSON bytes, reading or writing the artifact on first use."""
+    path = artifact_path()
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    content = generate_schema()
+    try:
+        write_artifact(path, content)
+    except OSError:
+        # A read-only deployment still caches it in memory
+        pass
+    return content
+
+
+def get_document(fmt):
+    """``(content, etag)`` of the schema rendered as ``json`` or ``yaml``."""
+    if fmt not in _documents:
+        with _lock:
+            if fmt not in _documents:
+                content = load_schema()
+                if fmt == 'yaml':
+                    content = yaml_dump(json.loads(content), binary=True)
+                _documents[fmt] = (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+    return _documents[fmt]
+
+
+def reset():
+    """Forget the in-process schema and version (used by tests)."""
+    global _version
+    with _lock:
+        _version = None
+        _documents.clear()
+
+
+class SchemaView(get_schema_view(SCHEMA_INFO)):
+
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            return super().get(request, version, format)
+
+        content, etag = get_document('yaml' if renderer.format == 'yaml' else 'json')
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(content, content_type=f'{renderer.media_type}; charset={renderer.charset}')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Accept', 'Authorization', 'Cookie'])
+        return response
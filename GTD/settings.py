@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Before any middleware that reads or changes the response body
+    'tasks.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,17 +82,110 @@ import os
 
 load_dotenv()  # Load environment variables from .env file
 
-DATABASES = {
+# DB_ENGINE=sqlite runs everything (tests, benchmarks) without a MySQL server
+DB_ENGINE = os.getenv('DB_ENGINE', 'mysql')
+
+# Connection reuse:
+# - DB_CONN_MODE=persistent (default) keeps each worker thread's connection
+#   open for DB_CONN_MAX_AGE seconds ('none' = forever, 0 = per request) and
+#   checks it is alive before reusing it.
+# - DB_CONN_MODE=pooled is for ASGI, where requests hop between threads:
+#   connections go back to a per-process pool of DB_POOL_SIZE after each
+#   request (see GTD/db/mysql_pool).
+DB_CONN_MODE = os.getenv('DB_CONN_MODE', 'persistent')
+DB_CONN_MAX_AGE = os.getenv('DB_CONN_MAX_AGE', '60')
+
+if DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                # Concurrent writers queue for the lock instead of failing
+                # with "database is locked"
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # An in-memory test database cannot be shared between threads
+            # without table-lock errors, and the concurrency tests need that
+            'TEST': {'NAME': str(BASE_DIR / 'test_db.sqlite3')},
+        }
+    }
+    # A second database file standing in for a read replica. The alias
+    # always exists, with its own test database, so the tests can tell
+    # which database answered; reads only go to it with DB_REPLICA_NAME set.
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME') or DATABASES['default']['NAME'],
+        'TEST': {'NAME': str(BASE_DIR / 'test_replica.sqlite3')},
+    }
+    DATABASE_REPLICAS = ['replica'] if os.getenv('DB_REPLICA_NAME') else []
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'GTD.db.mysql_pool' if DB_CONN_MODE == 'pooled' else 'django.db.backends.mysql',
+            'NAME': os.getenv('DB_NAME', 'gtd_db'),
+            'USER': os.getenv('DB_USER', 'gtd_user'),
+            'PASSWORD': os.getenv('DB_PASSWORD', 'gtd_pass'),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '3306'),
+            'CONN_MAX_AGE': (
+                0 if DB_CONN_MODE == 'pooled'
+                else None if DB_CONN_MAX_AGE.lower() == 'none'
+                else int(DB_CONN_MAX_AGE)
+            ),
+            'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
+            'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', '10')),
+        }
+    }
+    # Read replicas of the primary, with the same credentials
+    DATABASE_REPLICAS = []
+    for number, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+        DATABASES[f'replica{number}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+        DATABASE_REPLICAS.append(f'replica{number}')
+
+# Task and group reads go to a random alias of DATABASE_REPLICAS (see
+# tasks/replicas.py), except a user's reads for REPLICA_PIN_SECONDS after
+# a change to their tasks or groups; keep it above the replicas' usual lag.
+DATABASE_ROUTERS = ['tasks.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '5'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The response cache keeps its version counters here, so deployments with
+# more than one worker process need a shared backend (e.g. Redis/Memcached)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': os.getenv('DB_NAME', 'gtd_db'),
-        'USER': os.getenv('DB_USER', 'gtd_user'),
-        'PASSWORD': os.getenv('DB_PASSWORD', 'gtd_pass'),
-        'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', '3306'),
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+# Seconds a cached task/group response is kept (writes invalidate it sooner)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+# Responses smaller than this many bytes are sent uncompressed (see
+# tasks/compression.py; brotli is offered when the package is installed)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
+
+# Per-route request metrics (Server-Timing headers and /metrics, see
+# tasks/metrics.py). SQL and serialization time are measured on a sample of
+# INSTRUMENTATION_SAMPLE_RATE requests; set METRICS_TOKEN to require
+# "Authorization: Bearer <token>" on /metrics.
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', 'false').lower() == 'true'
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', '0.1'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+if INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'tasks.metrics.InstrumentationMiddleware')
+
+# Live change events (GET /api/async/events/, see tasks/events.py). The
+# default broker only reaches clients connected to the same process, so
+# deployments with several ASGI workers need a shared one.
+EVENTS_BROKER = os.getenv('EVENTS_BROKER', 'tasks.events.LocalBroker')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +223,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Pre-generated OpenAPI schema artifacts (see GTD/schema.py)
+OPENAPI_SCHEMA_DIR = os.getenv('OPENAPI_SCHEMA_DIR', str(BASE_DIR / 'openapi'))
+
+# Files written by export_data background jobs (see tasks/jobs.py)
+EXPORT_DIR = os.getenv('EXPORT_DIR', str(BASE_DIR / 'exports'))
+
+# Completed tasks unchanged for this many days are moved to the archive
+# table by the archive_tasks command or job (see tasks/archive.py)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -136,12 +241,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'tasks.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # Require authentication by default
     ],
+    # The same JSON as DRF's defaults, faster when orjson is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'tasks.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'tasks.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -17,23 +17,18 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="GTD (Getting Things Done) API",
-        default_version='v1',
-        description="API documentation for GTD (Getting Things Done) Application",
-    ),
-)
+from tasks.metrics import metrics_view
+
+from .schema import SchemaView
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('tasks.urls')),
-    path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('api/redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('api/schema/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
+    path('api/docs/', SchemaView.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('api/redoc/', SchemaView.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('api/schema/', SchemaView.without_ui(cache_timeout=0), name='schema-json'),
+    path('metrics', metrics_view, name='metrics'),
     path('', RedirectView.as_view(url='/api/docs/', permanent=False), name='home'),
 ]
@@ -1,36 +1,144 @@
 from django.contrib import admin
-from .models import Task, Group
+from django.contrib.admin.exceptions import NotRegistered
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .models import Task, Group, Job
+from .permissions import is_owner, owned_by
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that reads the row count of an unfiltered large table from
+    the database statistics instead of running COUNT(*) over it. Filtered
+    lists, small tables and backends without statistics (SQLite) are
+    counted exactly.
+    """
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if not query.where:
+            estimate = self.estimate(query.model, self.object_list.db)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+        return super().count
+
+    @staticmethod
+    def estimate(model, using):
+        connection = connections[using]
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(
+                    'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                    'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table]
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            else:
+                return None
+            row = cursor.fetchone()
+        return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class BoundedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """
+    Related-object filter listing at most ``limit`` choices (the first rows
+    the related admin shows, plus the selected ones) rather than every row
+    of the related table. Other values can still be filtered on by URL,
+    e.g. from the autocomplete links of a change form.
+    """
+    limit = 20
+
+    def field_choices(self, field, request, model_admin):
+        model = field.remote_field.model
+        try:
+            queryset = model_admin.admin_site.get_model_admin(model).get_queryset(request)
+        except NotRegistered:
+            queryset = model._default_manager.all()
+        ordering = self.field_admin_ordering(field, request, model_admin) or model._meta.ordering or ['pk']
+        objects = list(queryset.order_by(*ordering)[:self.limit])
+        selected = set(self.lookup_val or []) - {str(obj.pk) for obj in objects}
+        if selected:
+            try:
+                objects += queryset.filter(pk__in=selected)
+            except (ValueError, ValidationError):
+                # Invalid values are reported by the change list itself
+                pass
+        return [(obj.pk, str(obj)) for obj in objects]
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    Change lists that cost the same number of queries however large the
+    tables: estimated counts, no full-table count or facet counts, and
+    relations loaded with the rows.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.list_select_related and self.list_select_related is not True:
+            # Also used by autocomplete and filter choices, which print __str__
+            queryset = queryset.select_related(*self.list_select_related)
+        return queryset
+
+
+class OwnedModelAdmin(ScalableModelAdmin):
+    """Staff users only see and change their own rows (superusers see all)."""
+
+    def get_queryset(self, request):
+        return owned_by(super().get_queryset(request), request.user)
+
+    def has_change_permission(self, request, obj=None):
+        allowed = super().has_change_permission(request, obj)
+        return allowed and (obj is None or is_owner(request.user, obj))
+
+    def has_delete_permission(self, request, obj=None):
+        allowed = super().has_delete_permission(request, obj)
+        return allowed and (obj is None or is_owner(request.user, obj))
 
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(OwnedModelAdmin):
     list_display = ['name', 'owner', 'created_at']
+    list_select_related = ['owner']
     search_fields = ['name', 'owner__username']
-    list_filter = ['created_at', 'owner']
+    list_filter = ['created_at', ('owner', BoundedRelatedFieldListFilter)]
+    autocomplete_fields = ['owner']
     readonly_fields = ['created_at']
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if request.user.is_superuser:
-            return qs
-        return qs.filter(owner=request.user)
-
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(OwnedModelAdmin):
     list_display = ['title', 'owner', 'group', 'completed', 'due_date', 'created_at']
-    list_filter = ['completed', 'group', 'created_at', 'due_date', 'owner']
+    list_select_related = ['owner', 'group__owner']
+    list_filter = [
+        'completed', ('group', BoundedRelatedFieldListFilter), 'created_at', 'due_date',
+        ('owner', BoundedRelatedFieldListFilter),
+    ]
     search_fields = ['title', 'description', 'owner__username']
+    autocomplete_fields = ['owner', 'group']
     list_editable = ['completed']
     readonly_fields = ['created_at', 'updated_at']
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        if request.user.is_superuser:
-            return qs
-        return qs.filter(owner=request.user)
-        
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if db_field.name == "group" and not request.user.is_superuser:
-            kwargs["queryset"] = Group.objects.filter(owner=request.user)
+        if db_field.name == "group":
+            # Only used to validate the submitted group: the autocomplete
+            # widget renders the selected group alone
+            kwargs["queryset"] = owned_by(Group.objects.all(), request.user)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+@admin.register(Job)
+class JobAdmin(ScalableModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'owner', 'created_at', 'finished_at']
+    list_select_related = ['owner']
+    list_filter = ['status', 'name']
+    readonly_fields = [field.name for field in Job._meta.fields]
@@ -0,0 +1,157 @@
+"""
+Archival of old completed tasks.
+
+Every pending-task query scans the Task table, which mostly fills up with
+completed tasks nobody touches again. ``archive_completed`` moves completed
+tasks last updated before a cutoff into ArchivedTask (run it with
+``manage.py archive_tasks`` or the ``archive_tasks`` job), ``batch_size``
+rows per transaction: one INSERT ... SELECT copies a batch, ids and
+timestamps included, and one DELETE removes it from Task.
+
+Moving a task is not a change to it. The DELETE sends no signals, so
+archiving writes no sync tombstones and publishes no events, and the
+TaskCounter rows keep counting archived tasks. ``/api/tasks/completed/``
+lists both tables through ``TieredQuerySet``; the other task lists only
+cover live tasks.
+
+``restore`` moves archived tasks back with a fresh ``updated_at``, so sync
+clients pick them up and the next archive run leaves them alone.
+"""
+from django.db import connections, router, transaction
+from django.db.models import Value
+from django.utils import timezone
+
+from .caching import invalidate_tasks
+from .models import ArchivedTask, Task
+
+BATCH_SIZE = 1000
+
+
+def archive_completed(before, queryset=None, batch_size=BATCH_SIZE):
+    """
+    Archive the tasks of ``queryset`` (default: every task) that are
+    completed and were last updated before ``before``. Task has no
+    completion time, so the last update stands in for it. Returns the
+    number of tasks archived.
+    """
+    queryset = Task.objects.all() if queryset is None else queryset
+    queryset = queryset.filter(completed=True, updated_at__lt=before)
+    return _move(queryset, ArchivedTask, batch_size, archived_at=timezone.now())
+
+
+def restore(queryset, batch_size=BATCH_SIZE):
+    """Move the archived tasks of ``queryset`` back to Task; returns how many moved."""
+    return _move(queryset, Task, batch_size, updated_at=timezone.now())
+
+
+def _move(queryset, target, batch_size, **overrides):
+    source = queryset.model
+    using = router.db_for_write(source)
+    moved = last = 0
+    while True:
+        with transaction.atomic(using=using):
+            # Locked until the copy and delete commit, so a concurrent
+            # write cannot slip in between them
+            rows = list(
+                queryset.using(using).select_for_update().filter(pk__gt=last).order_by('pk')
+                .values_list('pk', 'owner_id')[:batch_size]
+            )
+            if not rows:
+                return moved
+            ids = [pk for pk, _ in rows]
+            _copy(source, target, ids, using, overrides)
+            # A raw DELETE: Task's post_delete receivers would treat the
+            # move as a deletion
+            source._base_manager.using(using).filter(pk__in=ids)._raw_delete(using)
+        moved += len(ids)
+        last = ids[-1]
+        invalidate_tasks(*{owner_id for _, owner_id in rows})
+
+
+def _copy(source, target, ids, using, overrides):
+    """INSERT ... SELECT rows ``ids`` of ``source`` into ``target``, with ``overrides`` for some columns."""
+    fields = target._meta.concrete_fields
+    annotations = {
+        f'new_{name}': Value(value, output_field=target._meta.get_field(name))
+        for name, value in overrides.items()
+    }
+    rows = (
+        source._base_manager.using(using).filter(pk__in=ids).order_by().annotate(**annotations)
+        .values_list(*[f'new_{field.name}' if field.name in overrides else field.attname for field in fields])
+    )
+    connection = connections[using]
+    sql, params = rows.query.get_compiler(using).as_sql()
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {connection.ops.quote_name(target._meta.db_table)} ({columns}) {sql}', params)
+
+
+class TieredQuerySet:
+    """
+    Read-only view of a Task queryset followed by an ArchivedTask queryset
+    with the same filters, read as one ``UNION ALL``. It supports what the
+    task list responses and paginators use: ``filter()``, ``order_by()``,
+    ``values()``, ``count()``, slicing and iteration. Rows are always
+    ``.values()`` dicts; fields the ordering needs are added to them.
+    """
+    ordered = True
+
+    def __init__(self, tasks, archived, ordering=None, fields=None):
+        self.tasks = tasks
+        self.archived = archived
+        # Ties on the ordering are broken by id, as in TaskOrderingFilter
+        self.ordering = tuple(ordering or tasks.query.order_by or (*Task._meta.ordering, '-id'))
+        self.fields = fields
+        self.model = Task
+        self.db = tasks.db
+
+    def _clone(self, **kwargs):
+        return type(self)(**{
+            'tasks': self.tasks, 'archived': self.archived,
+            'ordering': self.ordering, 'fields': self.fields, **kwargs,
+        })
+
+    def filter(self, *args, **kwargs):
+        return self._clone(tasks=self.tasks.filter(*args, **kwargs), archived=self.archived.filter(*args, **kwargs))
+
+    def order_by(self, *ordering):
+        return self._clone(ordering=ordering)
+
+    def values(self, *fields):
+        return self._clone(fields=fields)
+
+    def count(self):
+        return self.tasks.count() + self.archived.count()
+
+    def union(self, limit=None):
+        """
+        The rows as one ordered Task ``values()`` queryset; with ``limit``,
+        only the first ``limit`` rows of each table are merged, so the
+        database does not sort both tables whole for one page.
+        """
+        fields = list(self.fields or [field.attname for field in Task._meta.concrete_fields])
+        fields += [name.lstrip('-') for name in self.ordering if name.lstrip('-') not in fields]
+        tasks, archived = (self._part(part, fields, limit) for part in (self.tasks, self.archived))
+        return tasks.union(archived, all=True).order_by(*self.ordering)
+
+    def _part(self, queryset, fields, limit):
+        rows = queryset.order_by().values(*fields)
+        if limit is None:
+            return rows
+        if connections[queryset.db].features.supports_slicing_ordering_in_compound:
+            return rows.order_by(*self.ordering)[:limit]
+        # SQLite allows no LIMIT on the members of a UNION, only in
+        # subqueries; this one reads the table alone, without the joins
+        # of ``fields``, so it can walk the index in order
+        return rows.filter(pk__in=queryset.order_by(*self.ordering).values('pk')[:limit])
+
+    def iterator(self, chunk_size=None):
+        return self.union().iterator(chunk_size=chunk_size)
+
+    def __iter__(self):
+        return iter(self.union())
+
+    def __getitem__(self, key):
+        if isinstance(key, slice) and key.stop is not None:
+            return self.union(limit=key.stop)[key]
+        return self.union()[key]
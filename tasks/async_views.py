@@ -0,0 +1,256 @@
+"""
+Async-native task and group endpoints for ASGI deployments.
+
+DRF viewsets are synchronous, so under an ASGI server every request to
+them is handed to a worker thread. These views are plain ``async def``
+Django views using the async ORM (``aget``, ``acount``, ``async for``),
+and return the same payloads as TaskViewSet/GroupViewSet. They are served
+under ``/api/async/``, with the live event stream (see tasks/events.py),
+which needs an ASGI server to hold its connections open.
+"""
+import asyncio
+import base64
+import binascii
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import CSRFCheck
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .authentication import aauthenticate_token
+from . import counters, events
+from .caching import invalidate_tasks
+from .models import Task, Group
+from .parsers import loads
+from .permissions import owned_by
+from .renderers import dumps
+from .serializers import TaskSerializer, GroupSerializer
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+async def authenticate(request):
+    """
+    Resolve the user from a Token, Basic or session credential, in the same
+    order as REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].
+    Returns ``(user, error_response)``.
+    """
+    keyword, _, credentials = request.headers.get('Authorization', '').partition(' ')
+    if keyword == 'Token':
+        user = await aauthenticate_token(credentials.strip())
+        return (user, None) if user else (None, error('Invalid token.', 401))
+    if keyword == 'Basic':
+        try:
+            username, _, password = base64.b64decode(credentials).decode().partition(':')
+        except (binascii.Error, UnicodeDecodeError):
+            return None, error('Invalid basic header.', 401)
+        user = await aauthenticate(request, username=username, password=password)
+        return (user, None) if user else (None, error('Invalid username/password.', 401))
+
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None, error('Authentication credentials were not provided.', 401)
+    if request.method not in SAFE_METHODS:
+        # Session auth needs CSRF protection, exactly like SessionAuthentication
+        check = CSRFCheck(lambda req: None)
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            return None, error(f'CSRF Failed: {reason.reason_phrase}', 403)
+    return user, None
+
+
+def async_api(*methods):
+    """Authenticate the request and restrict it to ``methods``."""
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return error(f'Method "{request.method}" not allowed.', 405)
+            user, response = await authenticate(request)
+            if response is not None:
+                return response
+            request.user = user
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def respond(data, status=200):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def parse_body(request):
+    try:
+        data = loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def paginate(request, queryset, serializer_class, prepare=None):
+    """
+    Page-number pagination matching DRF's PageNumberPagination output.
+    ``prepare`` is awaited on the page's rows before they are serialized.
+    """
+    page_size = api_settings.PAGE_SIZE
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 0
+    count = await queryset.acount()
+    offset = (page - 1) * page_size
+    if page < 1 or (offset and offset >= count):
+        return error('Invalid page.', 404)
+
+    rows = [obj async for obj in queryset[offset:offset + page_size]]
+    if prepare is not None:
+        await prepare(rows)
+    url = request.build_absolute_uri()
+    next_url = replace_query_param(url, 'page', page + 1) if offset + page_size < count else None
+    if page == 1:
+        previous_url = None
+    elif page == 2:
+        previous_url = remove_query_param(url, 'page')
+    else:
+        previous_url = replace_query_param(url, 'page', page - 1)
+    return respond({
+        'count': count,
+        'next': next_url,
+        'previous': previous_url,
+        'results': serializer_class(rows, many=True).data,
+    })
+
+
+def task_queryset(user):
+    return owned_by(Task.objects.select_related('group', 'owner'), user)
+
+
+def group_queryset():
+    return Group.objects.select_related('owner', 'task_counter')
+
+
+async def attach_counters(groups):
+    """
+    Load the counter rows missing from ``groups`` (e.g. bulk-created groups),
+    which GroupSerializer would otherwise count synchronously.
+    """
+    for group in groups:
+        if getattr(group, 'task_counter', None) is None:
+            group.task_counter = await sync_to_async(counters.get_counter)('group_id', group.pk)
+
+
+@async_api('GET', 'POST')
+async def task_list(request):
+    """List the current user's tasks, or create one"""
+    if request.method == 'GET':
+        return await paginate(request, task_queryset(request.user), TaskSerializer)
+
+    data = parse_body(request)
+    if data is None:
+        return error('JSON parse error.', 400)
+    serializer = TaskSerializer(data=data)
+    # Validating the group id is the only ORM access in validation
+    if not await sync_to_async(serializer.is_valid)():
+        return respond(serializer.errors, status=400)
+    task = await Task.objects.acreate(owner=request.user, **serializer.validated_data)
+    data = TaskSerializer(task).data
+    # The async ORM autocommits, so there is no transaction to wait for
+    events.emit_committed('task', 'created', [(task.owner_id, task.pk, data)])
+    return respond(data, status=201)
+
+
+@async_api('GET')
+async def task_detail(request, pk):
+    try:
+        task = await task_queryset(request.user).aget(pk=pk)
+    except Task.DoesNotExist:
+        return error('No Task matches the given query.', 404)
+    return respond(TaskSerializer(task).data)
+
+
+@async_api('POST')
+async def task_toggle_completed(request, pk):
+    """Toggle the completed status of a task"""
+    # Same single conditional UPDATE as TaskViewSet.toggle_completed
+    task = await sync_to_async(task_queryset(request.user).toggle_completed)(pk)
+    if task is None:
+        return error('No Task matches the given query.', 404)
+    invalidate_tasks(task.owner_id)
+    data = TaskSerializer(task).data
+    events.emit_committed('task', 'updated', [(task.owner_id, task.pk, data)])
+    return respond(data)
+
+
+@async_api('GET', 'POST')
+async def group_list(request):
+    """List all groups, or create one owned by the current user"""
+    if request.method == 'GET':
+        return await paginate(request, group_queryset(), GroupSerializer, attach_counters)
+
+    data = parse_body(request)
+    if data is None:
+        return error('JSON parse error.', 400)
+    serializer = GroupSerializer(data=data)
+    if not serializer.is_valid():
+        return respond(serializer.errors, status=400)
+    group = await Group.objects.acreate(owner=request.user, **serializer.validated_data)
+    data = GroupSerializer(group).data
+    events.emit_committed('group', 'created', [(group.owner_id, group.pk, data)])
+    return respond(data, status=201)
+
+
+@async_api('GET')
+async def group_detail(request, pk):
+    try:
+        group = await group_queryset().aget(pk=pk)
+    except Group.DoesNotExist:
+        return error('No Group matches the given query.', 404)
+    await attach_counters([group])
+    return respond(GroupSerializer(group).data)
+
+
+async def event_stream(channels):
+    """
+    Yield a ``ready`` event carrying the current sync watermark, then the
+    events published on ``channels``, with a keep-alive comment whenever
+    the stream has been idle for ``events.KEEPALIVE`` seconds.
+    """
+    broker = events.get_broker()
+    subscription = broker.subscribe(channels)
+    try:
+        yield events.encode('ready', {}, events.watermark())
+        while True:
+            try:
+                async with asyncio.timeout(events.KEEPALIVE):
+                    message = await subscription.get()
+            except TimeoutError:
+                message = events.KEEPALIVE_COMMENT
+            yield message
+    finally:
+        # Also reached when the client disconnects and the response is cancelled
+        broker.unsubscribe(subscription)
+
+
+@async_api('GET')
+async def event_list(request):
+    """Stream the current user's task and group changes as Server-Sent Events"""
+    if not isinstance(request, ASGIRequest):
+        return error('The event stream is only served over ASGI.', 501)
+    response = StreamingHttpResponse(
+        event_stream(events.channels_for(request.user)), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
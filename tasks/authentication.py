@@ -0,0 +1,92 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from rest_framework import authentication, exceptions
+
+from .models import AuthToken
+
+
+class TokenCache:
+    """
+    Small thread-safe, in-process TTL cache of ``digest -> (token id,
+    user id)``. Entries expire after ``ttl`` seconds so revocations made by
+    other worker processes take effect within that window. Users are not
+    cached: they are loaded on every request, so deactivations and
+    permission changes apply at once.
+    """
+
+    def __init__(self, ttl=60, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        ids, expires = entry
+        if expires < time.monotonic():
+            self.discard(digest)
+            return None
+        return ids
+
+    def set(self, digest, ids):
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                self._entries.clear()
+            self._entries[digest] = (ids, time.monotonic() + self.ttl)
+
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+async def aauthenticate_token(key):
+    """Async counterpart of TokenAuthentication; returns the user or None."""
+    digest = AuthToken.hash_key(key)
+    ids = token_cache.get(digest)
+    if ids is None:
+        ids = await AuthToken.objects.filter(digest=digest).values_list('pk', 'user_id').afirst()
+        if ids is None:
+            return None
+        token_cache.set(digest, ids)
+    user = await User.objects.filter(pk=ids[1]).afirst()
+    return user if user is not None and user.is_active else None
+
+
+class TokenAuthentication(authentication.TokenAuthentication):
+    """
+    Authenticate ``Authorization: Token <key>`` headers against AuthToken.
+
+    The presented key is hashed and looked up by digest, so no secret is
+    ever compared byte by byte, and recently seen tokens are served from
+    ``token_cache`` without touching the token table; only the user is
+    read, by primary key. This avoids running the password hasher on every
+    request as BasicAuthentication does.
+    """
+    keyword = 'Token'
+
+    def authenticate_credentials(self, key):
+        digest = AuthToken.hash_key(key)
+        ids = token_cache.get(digest)
+        if ids is None:
+            ids = AuthToken.objects.filter(digest=digest).values_list('pk', 'user_id').first()
+            if ids is None:
+                raise exceptions.AuthenticationFailed('Invalid token.')
+            token_cache.set(digest, ids)
+
+        token_id, user_id = ids
+        user = User.objects.filter(pk=user_id).first()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # request.auth: enough of the token to identify and revoke it
+        return (user, AuthToken(pk=token_id, digest=digest, user=user))
@@ -0,0 +1,816 @@
+"""
+Benchmarks for the tasks API.
+
+Every benchmark runs against a throwaway test database (see the
+``benchmark`` management command), seeds its own data and returns a dict
+of ``{label: {metric: value}}`` results.
+
+    python manage.py benchmark indexes --tasks 50000
+"""
+import asyncio
+import base64
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.utils import timezone
+
+from . import counters, jobs
+from .models import Task, Group, AuthToken
+
+BENCHMARKS = {}
+
+WORDS = ['report', 'email', 'invoice', 'meeting', 'review', 'deploy', 'groceries', 'call', 'plan', 'design']
+
+# Users the load and events benchmarks spread their data and clients over
+LOAD_USERS = 10
+
+
+def benchmark(name):
+    """Register a benchmark function under ``name``."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def seed(users=1, groups_per_user=10, tasks_per_user=1000, batch_size=1000):
+    """
+    Bulk-insert synthetic users, groups and tasks and return the users.
+    Roughly a third of the tasks are completed and half have a due date.
+    """
+    password = make_password(None)
+    offset = User.objects.count()
+    created = User.objects.bulk_create(
+        [User(username=f'bench{offset + i}', password=password) for i in range(users)],
+        batch_size=batch_size,
+    )
+    # bulk_create() only sets primary keys on some backends
+    created = list(User.objects.filter(username__in=[u.username for u in created]).order_by('id'))
+
+    now = timezone.now()
+    for user in created:
+        Group.objects.bulk_create(
+            [Group(name=f'Group {i}', owner=user) for i in range(groups_per_user)],
+            batch_size=batch_size,
+        )
+        groups = list(Group.objects.filter(owner=user))
+        batch = []
+        for i in range(tasks_per_user):
+            batch.append(Task(
+                title=f'Task {i}',
+                description=f'{WORDS[i % len(WORDS)]} {WORDS[i * 7 % len(WORDS)]} for {user.username}',
+                completed=i % 3 == 0,
+                due_date=now + timedelta(days=i % 60) if i % 2 else None,
+                group=groups[i % len(groups)] if groups else None,
+                owner=user,
+            ))
+            if len(batch) >= batch_size:
+                Task.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Task.objects.bulk_create(batch)
+        # Real groups and users have counter rows; bulk_create() skips them
+        counters.rebuild('user_id', user.pk)
+        for group in groups:
+            counters.rebuild('group_id', group.pk)
+    analyze()
+    return created
+
+
+def analyze():
+    """Refresh planner statistics so EXPLAIN reflects the seeded data."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('ANALYZE TABLE tasks_task, tasks_archivedtask, tasks_group')
+            cursor.fetchall()
+        elif connection.vendor in ('sqlite', 'postgresql'):
+            cursor.execute('ANALYZE')
+
+
+def no_response_cache():
+    """Measure the full request path rather than response cache hits."""
+    return override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+
+
+def summarize(timings):
+    """Latency percentiles, in milliseconds, for a list of timings in milliseconds."""
+    timings = sorted(timings)
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+        'max_ms': round(timings[-1], 3),
+    }
+
+
+def time_request(client, url, repeat=10, method='get', **kwargs):
+    """Issue ``repeat`` requests and return latency stats in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'status': response.status_code, **summarize(timings)}
+
+
+@benchmark('indexes')
+def indexes(tasks=10000, repeat=10, **options):
+    """EXPLAIN plans and latency for the owner-scoped task listings."""
+    user, = seed(users=1, tasks_per_user=tasks)
+    group = Group.objects.filter(owner=user).first()
+    client = Client()
+    client.force_login(user)
+
+    owned = Task.objects.filter(owner=user)
+    routes = {
+        '/api/tasks/': owned,
+        '/api/tasks/completed/': owned.filter(completed=True),
+        '/api/tasks/pending/': owned.filter(completed=False),
+        f'/api/groups/{group.pk}/tasks/': owned.filter(group=group),
+    }
+    results = {}
+    for url, queryset in routes.items():
+        results[url] = time_request(client, url, repeat=repeat)
+        results[url]['plan'] = queryset[:20].explain()
+    return results
+
+
+@benchmark('auth')
+def auth(repeat=10, **options):
+    """Requests per second on /api/users/profile/ with Basic vs Token auth."""
+    user = User.objects.create_user(username='bench-auth', password='bench-pass-123')
+    token, key = AuthToken.issue(user)
+    basic = base64.b64encode(b'bench-auth:bench-pass-123').decode()
+    client = Client()
+
+    results = {}
+    for label, header in [('basic', f'Basic {basic}'), ('token', f'Token {key}')]:
+        stats = time_request(client, '/api/users/profile/', repeat=repeat, HTTP_AUTHORIZATION=header)
+        stats['requests_per_s'] = round(1000 / stats['p50_ms'], 1)
+        results[label] = stats
+    return results
+
+
+@benchmark('bulk')
+def bulk(tasks=200, **options):
+    """Create and then complete ``tasks`` tasks one request at a time vs. in one batch."""
+    user, = seed(users=1, tasks_per_user=0)
+    client = Client()
+    client.force_login(user)
+    items = [{'title': f'Task {i}', 'description': '...'} for i in range(tasks)]
+
+    results = {}
+    start = time.perf_counter()
+    ids = [client.post('/api/tasks/', item, content_type='application/json').json()['id'] for item in items]
+    for pk in ids:
+        client.post(f'/api/tasks/{pk}/toggle_completed/')
+    results['per_item'] = {'total_ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    start = time.perf_counter()
+    created = client.post('/api/tasks/bulk/', items, content_type='application/json').json()
+    updates = [{'id': task['id'], 'completed': True} for task in created]
+    client.patch('/api/tasks/bulk/', updates, content_type='application/json')
+    results['batch'] = {'total_ms': round((time.perf_counter() - start) * 1000, 3)}
+
+    for stats in results.values():
+        stats['tasks_per_s'] = round(tasks * 1000 / stats['total_ms'], 1)
+    return results
+
+
+@benchmark('asgi')
+def asgi(tasks=1000, repeat=500, concurrency=50, **options):
+    """
+    Throughput of ``repeat`` task-list requests issued ``concurrency`` at a
+    time through the WSGI handler (a thread per connection), the ASGI
+    handler running the sync DRF view, and the ASGI handler running the
+    async-native view. Requests go straight to the handlers, with no network.
+    """
+    user, = seed(users=1, tasks_per_user=tasks)
+    headers = {'Authorization': f'Token {AuthToken.issue(user)[1]}'}
+
+    def wsgi_worker(count):
+        client, timings = Client(headers=headers), []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get('/api/tasks/')
+            assert response.status_code == 200, response.status_code
+            timings.append((time.perf_counter() - start) * 1000)
+        connection.close()
+        return timings
+
+    async def asgi_run(url):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                assert response.status_code == 200, response.status_code
+                return (time.perf_counter() - start) * 1000
+        return await asyncio.gather(*[one() for _ in range(repeat)])
+
+    runs = {
+        'wsgi': lambda: [t for chunk in ThreadPoolExecutor(concurrency).map(
+            wsgi_worker, [repeat // concurrency] * concurrency) for t in chunk],
+        'asgi_sync_view': lambda: asyncio.run(asgi_run('/api/tasks/')),
+        'asgi_async_view': lambda: asyncio.run(asgi_run('/api/async/tasks/')),
+    }
+    results = {}
+    for label, run in runs.items():
+        with no_response_cache():
+            start = time.perf_counter()
+            timings = run()
+            elapsed = time.perf_counter() - start
+        results[label] = {'requests_per_s': round(len(timings) / elapsed, 1), **summarize(timings)}
+    return results
+
+
+@benchmark('search')
+def search(tasks=1000000, repeat=10, **options):
+    """Filter, ordering and full-text search latency on /api/tasks/."""
+    user, = seed(users=1, tasks_per_user=tasks, batch_size=5000)
+    group = Group.objects.filter(owner=user).first()
+    client = Client()
+    client.force_login(user)
+    day = (timezone.now() + timedelta(days=7)).date().isoformat()
+
+    results = {}
+    with no_response_cache():
+        for query in [
+            '', f'due_before={day}', f'group={group.pk}', 'completed=false',
+            'ordering=due_date', 'search=invoice', 'search=invoice+deploy',
+        ]:
+            results[f'/api/tasks/?{query}'] = time_request(client, f'/api/tasks/?{query}', repeat=repeat)
+
+    # The table scan the full-text index replaces
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        queryset = Task.objects.filter(owner=user, description__icontains='invoice')
+        queryset.count()
+        list(queryset[:20])
+        timings.append((time.perf_counter() - start) * 1000)
+    results['icontains baseline (count + first page)'] = summarize(timings)
+    return results
+
+
+@benchmark('serializers')
+def serializers(tasks=1000, repeat=20, **options):
+    """
+    Time per 1,000 rows to fetch and serialize a task listing: every field
+    vs. the ``id,title,completed,due_date`` sparse fieldset, each through
+    model instances (``.only()`` for the sparse set) and ``.values()`` rows.
+    """
+    from .serializers import TaskSerializer
+    from .views import FieldSelectionMixin
+
+    user, = seed(users=1, tasks_per_user=tasks)
+    queryset = Task.objects.filter(owner=user).select_related('group', 'owner')
+    full = TaskSerializer()
+    sparse = TaskSerializer(fields=['id', 'title', 'completed', 'due_date'])
+
+    def instances(serializer):
+        narrowed = queryset if serializer is full else FieldSelectionMixin.select_fields(queryset, serializer)
+        return (lambda: list(narrowed.all())), (lambda rows: TaskSerializer(rows, many=True, fields=list(serializer.fields)).data)
+
+    def values(serializer):
+        return (lambda: list(queryset.values(*serializer.value_lookups()))), serializer.from_values
+
+    modes = {
+        'full/instances': instances(full),
+        'full/values': values(full),
+        'sparse/instances': instances(sparse),
+        'sparse/values': values(sparse),
+    }
+    per_1000 = 1000 / tasks
+    results = {}
+    for label, (fetch, serialize) in modes.items():
+        fetch_ms, serialize_ms = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = fetch()
+            fetched = time.perf_counter()
+            serialize(rows)
+            fetch_ms.append((fetched - start) * 1000 * per_1000)
+            serialize_ms.append((time.perf_counter() - fetched) * 1000 * per_1000)
+        results[label] = {
+            'fetch_p50_ms': round(statistics.median(fetch_ms), 3),
+            'serialize_p50_ms': round(statistics.median(serialize_ms), 3),
+            **summarize([f + s for f, s in zip(fetch_ms, serialize_ms)]),
+        }
+    return results
+
+
+@benchmark('instrumentation')
+def instrumentation(tasks=1000, repeat=200, **options):
+    """/api/tasks/ latency without the metrics middleware, and with it at several sample rates."""
+    from django.conf import settings
+
+    user, = seed(users=1, tasks_per_user=tasks)
+    client = Client()
+    client.force_login(user)
+    middleware = ['tasks.metrics.InstrumentationMiddleware', *settings.MIDDLEWARE]
+
+    results = {}
+    with no_response_cache():
+        results['off'] = time_request(client, '/api/tasks/', repeat=repeat)
+        for rate in (0.01, 0.1, 1.0):
+            with override_settings(INSTRUMENTATION=True, INSTRUMENTATION_SAMPLE_RATE=rate, MIDDLEWARE=middleware):
+                results[f'sample_rate={rate}'] = time_request(client, '/api/tasks/', repeat=repeat)
+    return results
+
+
+@benchmark('encoding')
+def encoding(tasks=1000, repeat=50, **options):
+    """
+    Time and bytes per 1,000 tasks to encode a full task listing with DRF's
+    JSONRenderer (datetimes formatted by the serializer) and FastJSONRenderer
+    (datetimes left native), to parse it back with each parser, and to
+    compress it with gzip and brotli; plus an NDJSON export of all ``tasks``
+    with and without ``Accept-Encoding``.
+    """
+    import io
+    import json
+
+    from rest_framework.renderers import JSONRenderer
+
+    from . import compression
+    from .parsers import FastJSONParser
+    from .renderers import FastJSONRenderer
+    from .serializers import TaskSerializer
+
+    user, = seed(users=1, tasks_per_user=tasks)
+    serializer = TaskSerializer()
+    rows = list(Task.objects.filter(owner=user).values(*serializer.value_lookups()))
+    per_1000 = 1000 / tasks
+
+    def timed(function, *args):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function(*args)
+            timings.append((time.perf_counter() - start) * 1000 * per_1000)
+        return result, {'p50_ms': round(statistics.median(timings), 3)}
+
+    results = {}
+    modes = {
+        'drf': (JSONRenderer(), lambda: serializer.from_values(rows)),
+        'fast': (FastJSONRenderer(), lambda: serializer.from_values(rows, native_datetimes=True)),
+    }
+    for label, (renderer, serialize) in modes.items():
+        content, stats = timed(lambda: renderer.render(serialize()))
+        results[f'{label}/encode'] = {**stats, 'bytes': round(len(content) * per_1000)}
+    results['drf/parse'] = timed(lambda: json.loads(content.decode()))[1]
+    results['fast/parse'] = timed(lambda: FastJSONParser().parse(io.BytesIO(content)))[1]
+
+    codings = ('gzip', 'br') if compression.brotli is not None else ('gzip',)
+    for coding in codings:
+        compressed, stats = timed(compression.compress, content, coding)
+        results[f'compress/{coding}'] = {**stats, 'bytes': round(len(compressed) * per_1000)}
+
+    client = Client()
+    client.force_login(user)
+    for coding in ('identity', *codings):
+        timings, size = [], 0
+        for _ in range(max(1, repeat // 10)):
+            start = time.perf_counter()
+            response = client.get('/api/tasks/?stream=ndjson', HTTP_ACCEPT_ENCODING=coding)
+            size = len(b''.join(response.streaming_content))
+            timings.append((time.perf_counter() - start) * 1000)
+        results[f'export/{coding}'] = {**summarize(timings), 'bytes': size}
+    return results
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+@benchmark('transfer')
+def transfer(tasks=1000000, **options):
+    """
+    Export a user's dataset to a file and import it for another user, in
+    both formats. ``peak_rss_growth_mb`` is how far each run raised the
+    process's peak memory beyond seeding, which stays flat when memory is
+    bounded by the chunk size rather than the dataset.
+    """
+    from . import transfer as dataset
+
+    user, = seed(users=1, tasks_per_user=tasks, batch_size=5000)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in dataset.FORMATS:
+            path = os.path.join(tmp, f'export.{fmt}')
+            peak = peak_rss_mb()
+            start = time.perf_counter()
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                for chunk in dataset.iter_export(user, fmt):
+                    f.write(chunk)
+            elapsed = time.perf_counter() - start
+            results[f'export {fmt}'] = {
+                'seconds': round(elapsed, 2),
+                'tasks_per_second': round(tasks / elapsed),
+                'file_mb': round(os.path.getsize(path) / (1024 * 1024), 1),
+                'peak_rss_growth_mb': round(peak_rss_mb() - peak, 1),
+            }
+
+            target = User.objects.create_user(username=f'bench-import-{fmt}')
+            peak = peak_rss_mb()
+            start = time.perf_counter()
+            with open(path, encoding='utf-8', newline='') as f:
+                counts = dataset.import_records(target, dataset.PARSERS[fmt](f))
+            elapsed = time.perf_counter() - start
+            results[f'import {fmt}'] = {
+                'seconds': round(elapsed, 2),
+                'tasks_per_second': round(counts['tasks'] / elapsed),
+                'tasks': counts['tasks'],
+                'peak_rss_growth_mb': round(peak_rss_mb() - peak, 1),
+            }
+    return results
+
+
+@benchmark('archive')
+def archive_history(tasks=2000000, pending=50000, days=90, repeat=10, **options):
+    """
+    Task list latency on a ``tasks``-row history, all but ``pending`` of it
+    completed long ago, before and after archiving the completed tasks;
+    plus the archiving rate and ``/api/tasks/completed/`` across both tables.
+    """
+    from . import archive
+
+    user, = seed(users=1, tasks_per_user=tasks, batch_size=5000)
+    owned = Task.objects.filter(owner=user)
+    # A long-lived account: mostly finished work, with recent tasks pending
+    pending = max(min(pending, tasks // 2), 1)
+    first_pending = owned.order_by('-pk').values_list('pk', flat=True)[pending - 1]
+    owned.filter(pk__lt=first_pending).update(
+        completed=True, updated_at=timezone.now() - timedelta(days=days * 2)
+    )
+    owned.filter(pk__gte=first_pending).update(completed=False)
+    counters.rebuild('user_id', user.pk)
+    analyze()
+    client = Client()
+    client.force_login(user)
+    urls = [
+        '/api/tasks/pending/', '/api/tasks/pending/?pagination=cursor',
+        '/api/tasks/pending/?ordering=due_date', '/api/tasks/', '/api/tasks/completed/',
+    ]
+
+    results = {}
+    with no_response_cache():
+        for url in urls:
+            results[f'before {url}'] = time_request(client, url, repeat=repeat)
+
+        start = time.perf_counter()
+        archived = archive.archive_completed(timezone.now() - timedelta(days=days), batch_size=5000)
+        elapsed = time.perf_counter() - start
+        results['archive'] = {
+            'tasks': archived, 'seconds': round(elapsed, 2), 'tasks_per_second': round(archived / elapsed),
+        }
+        analyze()
+
+        for url in urls:
+            results[f'after {url}'] = time_request(client, url, repeat=repeat)
+    return results
+
+
+@benchmark('events')
+def events(concurrency=2000, repeat=20, **options):
+    """
+    Hold ``concurrency`` idle Server-Sent Event streams open on the ASGI
+    application (spread over ``LOAD_USERS`` users), then publish ``repeat``
+    group events from another thread, as a sync view would, and time how
+    long each takes to reach every stream. ``kb_per_connection`` is the
+    Python memory held per open stream, traced with tracemalloc; the ASGI
+    server's own connection state comes on top.
+    """
+    from GTD.asgi import application
+
+    from . import events as live
+
+    users = seed(users=LOAD_USERS, groups_per_user=1, tasks_per_user=1)
+    keys = [AuthToken.issue(user)[1] for user in users]
+    group = Group.objects.filter(owner=users[0]).first()
+    message = live.encode('group.updated', {'id': group.pk, 'data': {'name': group.name}})
+    broker = live.get_broker()
+
+    class Stream:
+        """One client connection, driving the handler through the ASGI interface."""
+
+        def __init__(self, key):
+            self.key = key
+            self.requested = False
+            self.closed = asyncio.Event()
+            self.status = None
+            self.received = 0
+
+        def scope(self):
+            return {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': '/api/async/events/',
+                'raw_path': b'/api/async/events/', 'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'testserver'), (b'authorization', f'Token {self.key}'.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+            }
+
+        async def receive(self):
+            if not self.requested:
+                self.requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await self.closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(self, event):
+            if event['type'] == 'http.response.start':
+                self.status = event['status']
+            elif event.get('body'):
+                self.received += 1
+
+    async def wait_for(condition, timeout=60):
+        async with asyncio.timeout(timeout):
+            while not condition():
+                await asyncio.sleep(0.001)
+
+    async def run():
+        streams = [Stream(keys[i % len(keys)]) for i in range(concurrency)]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        handlers = [asyncio.create_task(application(s.scope(), s.receive, s.send)) for s in streams]
+        # Each stream starts with its ready event
+        await wait_for(lambda: all(s.received for s in streams))
+        connect_s = time.perf_counter() - start
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        assert {s.status for s in streams} == {200}, {s.status for s in streams}
+
+        timings = []
+        for round_ in range(1, repeat + 1):
+            start = time.perf_counter()
+            await asyncio.to_thread(broker.publish, ('groups',), message)
+            await wait_for(lambda: all(s.received > round_ for s in streams))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        subscribed = broker.subscriber_count()
+        for stream in streams:
+            stream.closed.set()
+        await asyncio.gather(*handlers)
+        return connect_s, held, timings, subscribed
+
+    connect_s, held, timings, subscribed = asyncio.run(run())
+    return {
+        'connect': {
+            'connections': concurrency,
+            'seconds': round(connect_s, 2),
+            'kb_per_connection': round(held / concurrency / 1024, 1),
+        },
+        'fan-out': {'events': repeat, **summarize(timings)},
+        'subscribers': {'open': subscribed, 'after_disconnect': broker.subscriber_count()},
+        'process': {'peak_rss_mb': round(peak_rss_mb(), 1)},
+    }
+
+
+# Routes of tasks/urls.py the load benchmark leaves out, by name prefix
+LOAD_SKIPPED = {
+    'user-profile-': 'UserViewSet registered again under users/profile/; same views as user-*',
+    'async-events': 'an endless stream, measured by the events benchmark',
+}
+
+
+def route_names():
+    """The names of every route in tasks/urls.py."""
+    from django.urls import URLResolver
+
+    from . import urls
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            else:
+                yield pattern.name
+    return set(walk(urls.urlpatterns))
+
+
+def measure(client, method, make, repeat):
+    """
+    Issue ``repeat`` requests built by ``make()`` (called untimed, so it may
+    create the rows a request consumes) and return latency stats, the
+    queries per request, and the peak Python memory of one more request.
+    """
+    from .metrics import RequestSample
+
+    def send():
+        path, kwargs = make()
+        response = getattr(client, method.lower())(path, **kwargs)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        return response
+
+    timings, queries = [], []
+    for _ in range(repeat):
+        sample = RequestSample()
+        with connection.execute_wrapper(sample):
+            start = time.perf_counter()
+            response = send()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(sample.queries)
+
+    tracemalloc.start()
+    try:
+        send()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'status': response.status_code, **summarize(timings), 'queries': max(queries),
+            'peak_kb': round(peak / 1024)}
+
+
+@benchmark('load')
+def load(tasks=1000, repeat=50, **options):
+    """
+    p50/p99 latency, queries per request and peak memory for every route in
+    tasks/urls.py, through the test client against ``tasks`` tasks spread
+    over ten users. Run it at 1000, 100000 and 1000000 tasks, and compare
+    runs with ``--baseline``.
+    """
+    from django.core import signing
+
+    from . import archive
+
+    users = seed(users=LOAD_USERS, tasks_per_user=max(tasks // LOAD_USERS, 1), batch_size=5000)
+    user = users[0]
+    client = Client(headers={'Authorization': f'Token {AuthToken.issue(user)[1]}'})
+    task = Task.objects.filter(owner=user).order_by('pk').first()
+    group = Group.objects.filter(owner=user).order_by('pk').first()
+    bulk_ids = list(Task.objects.filter(owner=user).order_by('pk').values_list('pk', flat=True)[:20])
+    # The watermark /api/tasks/sync/ returns; a full snapshot is unbounded
+    watermark = signing.dumps(timezone.now().isoformat(), salt='tasks.sync')
+    job = jobs.enqueue('rebuild_counters', owner=user)
+    serial = iter(range(10 ** 9))
+    json_body = {'content_type': 'application/json'}
+
+    def new_task():
+        return Task.objects.create(title='Load', description='...', owner=user, group=group)
+
+    def new_tasks(count):
+        return [new_task().pk for _ in range(count)]
+
+    def archived_task():
+        pk = Task.objects.create(title='Load', description='...', owner=user, group=group, completed=True).pk
+        archive.archive_completed(timezone.now(), Task.objects.filter(pk=pk))
+        return pk
+
+    def throwaway_user():
+        other = User.objects.create_user(username=f'load-{next(serial)}')
+        return other, {'Authorization': f'Token {AuthToken.issue(other)[1]}'}
+
+    def delete_self():
+        other, headers = throwaway_user()
+        return f'/api/users/{other.pk}/', {'headers': headers}
+
+    def import_body():
+        lines = [f'{{"type": "group", "id": 1, "name": "Imported {next(serial)}"}}']
+        lines += [f'{{"type": "task", "title": "Imported {i}", "description": "...", "group": 1}}' for i in range(10)]
+        return '\n'.join(lines)
+
+    def static(path, **kwargs):
+        return lambda: (path, kwargs)
+
+    scenarios = [
+        # (label, route, method, make(), repeat)
+        ('', 'api-root', 'GET', static('/api/'), None),
+        ('', 'task-list', 'GET', static('/api/tasks/'), None),
+        ('?pagination=cursor', 'task-list', 'GET', static('/api/tasks/?pagination=cursor'), None),
+        ('?search=invoice', 'task-list', 'GET', static('/api/tasks/?search=invoice'), None),
+        ('?fields=id,title', 'task-list', 'GET', static('/api/tasks/?fields=id,title'), None),
+        ('', 'task-detail', 'GET', static(f'/api/tasks/{task.pk}/'), None),
+        ('', 'task-completed', 'GET', static('/api/tasks/completed/'), None),
+        ('', 'task-pending', 'GET', static('/api/tasks/pending/'), None),
+        ('?since=', 'task-sync', 'GET', static(f'/api/tasks/sync/?since={watermark}'), None),
+        ('', 'task-stats', 'GET', static('/api/tasks/stats/'), None),
+        ('', 'group-list', 'GET', static('/api/groups/'), None),
+        ('', 'group-detail', 'GET', static(f'/api/groups/{group.pk}/'), None),
+        ('', 'group-tasks', 'GET', static(f'/api/groups/{group.pk}/tasks/'), None),
+        ('', 'user-list', 'GET', static('/api/users/'), None),
+        ('', 'user-detail', 'GET', static(f'/api/users/{user.pk}/'), None),
+        ('', 'user-profile', 'GET', static('/api/users/profile/'), None),
+        # Streams the whole dataset, so once is enough
+        ('', 'user-export', 'GET', static('/api/users/export/'), 1),
+        ('', 'async-task-list', 'GET', static('/api/async/tasks/'), None),
+        ('', 'async-task-detail', 'GET', static(f'/api/async/tasks/{task.pk}/'), None),
+        ('', 'async-group-list', 'GET', static('/api/async/groups/'), None),
+        ('', 'async-group-detail', 'GET', static(f'/api/async/groups/{group.pk}/'), None),
+        ('', 'login', 'GET', static('/api/auth/login/'), None),
+        ('', 'job-list', 'GET', static('/api/jobs/'), None),
+        ('', 'job-detail', 'GET', lambda: (f'/api/jobs/{job.pk}/', {}), None),
+
+        ('', 'task-list', 'POST', static('/api/tasks/', data={'title': 'Load', 'description': '...'}), None),
+        ('', 'task-detail', 'PUT', static(
+            f'/api/tasks/{task.pk}/', data={'title': 'Put', 'description': '...'}, **json_body), None),
+        ('', 'task-detail', 'PATCH', static(f'/api/tasks/{task.pk}/', data={'title': 'Patched'}, **json_body), None),
+        ('', 'task-detail', 'DELETE', lambda: (f'/api/tasks/{new_task().pk}/', {}), None),
+        ('', 'task-toggle-completed', 'POST', static(f'/api/tasks/{task.pk}/toggle_completed/'), None),
+        ('', 'task-restore', 'POST', lambda: (f'/api/tasks/{archived_task()}/restore/', {}), None),
+        ('x20', 'task-bulk', 'POST', static(
+            '/api/tasks/bulk/', data=[{'title': f'Bulk {i}', 'description': '...'} for i in range(20)],
+            **json_body), None),
+        ('x20', 'task-bulk', 'PATCH', static(
+            '/api/tasks/bulk/', data=[{'id': pk, 'title': 'Bulk'} for pk in bulk_ids], **json_body), None),
+        ('x20', 'task-bulk', 'DELETE', lambda: ('/api/tasks/bulk/', {'data': new_tasks(20), **json_body}), None),
+        ('', 'group-list', 'POST', lambda: ('/api/groups/', {'data': {'name': f'Load {next(serial)}'}}), None),
+        ('', 'group-detail', 'PATCH', static(f'/api/groups/{group.pk}/', data={'name': 'Patched'}, **json_body), None),
+        ('', 'group-detail', 'DELETE', lambda: (
+            f"/api/groups/{Group.objects.create(name='Load', owner=user).pk}/", {}), None),
+        ('', 'group-reassign', 'POST', static(
+            f'/api/groups/{group.pk}/reassign/', data={'group': None}, **json_body), None),
+        # Password hashing dominates registration, by design
+        ('', 'user-list', 'POST', lambda: ('/api/users/', {
+            'data': {'username': f'load-new-{next(serial)}', 'password': 'load-pass-123'}}), 5),
+        ('', 'user-detail', 'PATCH', static(f'/api/users/{user.pk}/', data={'first_name': 'Load'}, **json_body), None),
+        ('self', 'user-detail', 'DELETE', delete_self, None),
+        ('', 'user-token', 'POST', static('/api/users/token/'), None),
+        ('', 'user-token', 'DELETE', lambda: ('/api/users/token/', {'headers': throwaway_user()[1]}), None),
+        ('x10', 'user-import-data', 'POST', lambda: (
+            '/api/users/import/', {'data': import_body(), 'content_type': 'application/x-ndjson'}), None),
+        ('', 'async-task-list', 'POST', static(
+            '/api/async/tasks/', data={'title': 'Load', 'description': '...'}, **json_body), None),
+        ('', 'async-task-toggle-completed', 'POST', static(f'/api/async/tasks/{task.pk}/toggle_completed/'), None),
+        ('', 'async-group-list', 'POST', lambda: (
+            '/api/async/groups/', {'data': {'name': f'Load {next(serial)}'}, **json_body}), None),
+        ('', 'logout', 'POST', static('/api/auth/logout/'), None),
+    ]
+
+    results = {}
+    with no_response_cache():
+        for label, route, method, make, count in scenarios:
+            name = f'{method} {route} {label}'.strip()
+            results[name] = measure(client, method, make, count or repeat)
+
+    covered = {route for _, route, *_ in scenarios}
+    uncovered = {name for name in route_names() - covered
+                 if not any(name.startswith(prefix) for prefix in LOAD_SKIPPED)}
+    if uncovered:
+        results['uncovered routes'] = {'names': ', '.join(sorted(uncovered))}
+    results['process'] = {'peak_rss_mb': round(peak_rss_mb(), 1)}
+    return results
+
+
+def _paired(results, baseline, key):
+    for label, metrics in results.items():
+        old_metrics = baseline.get(label)
+        if isinstance(metrics, dict) and isinstance(old_metrics, dict):
+            value, old = metrics.get(key), old_metrics.get(key)
+            if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (value, old)):
+                yield label, value, old
+
+
+def speed_ratio(results, baseline):
+    """
+    Median p50 latency ratio between this run and ``baseline``: how much
+    slower (above 1) or faster the whole run was, e.g. on another machine.
+    """
+    ratios = [value / old for _, value, old in _paired(results, baseline, 'p50_ms') if old > 0]
+    return statistics.median(ratios) if ratios else 1.0
+
+
+def compare(results, baseline, tolerance=0.5, min_ms=1.0):
+    """
+    List the metrics in ``results`` that regressed from ``baseline`` (a
+    previous ``--output`` file):
+
+    - ``queries``: any increase
+    - ``*_kb``/``*_mb`` memory: more than ``tolerance`` above the baseline
+    - ``p50_ms``: more than ``tolerance`` above the baseline scaled by
+      ``speed_ratio()``, and by at least ``min_ms``, so a uniformly slower
+      machine or sub-millisecond noise is not reported. Tail latencies need
+      far more samples than a benchmark run takes to compare reliably.
+    """
+    regressions = []
+    for label, metrics in results.items():
+        if isinstance(metrics, dict):
+            for key in metrics:
+                if key == 'queries' or key.endswith(('_kb', '_mb')):
+                    for _, value, old in _paired({label: metrics}, baseline, key):
+                        if value > old if key == 'queries' else value > old * (1 + tolerance):
+                            regressions.append(f'{label}: {key} {old} -> {value}')
+    scale = speed_ratio(results, baseline)
+    for label, value, old in _paired(results, baseline, 'p50_ms'):
+        expected = old * scale
+        if value > expected * (1 + tolerance) and value - expected >= min_ms:
+            regressions.append(f'{label}: p50_ms {old} -> {value} (x{value / expected:.2f} after scaling)')
+    return regressions
@@ -0,0 +1,117 @@
+"""
+Per-user response cache for read endpoints.
+
+Cached responses are keyed on the user, the full request URL, the
+rendered format and a set of version counters. Writes never delete cache
+entries; they bump the counters (see signals.py), which changes the key so
+stale entries are simply never read again and age out. The same key
+doubles as a strong ETag, so ``If-None-Match`` revalidation costs a few
+cache reads and no database work. Cache misses read from a replica when
+one is configured (see replicas.py).
+
+Version scopes:
+
+- ``tasks``: the current user's tasks (all tasks for superusers)
+- ``groups``: group rows, which also feed ``group_name`` in task payloads
+- ``group_counts``: per-group task counts, which change with any task write
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import replicas
+
+VERSION_KEY_PREFIX = 'gtd:version:'
+RESPONSE_KEY_PREFIX = 'gtd:response:'
+
+
+def _version_key(scope):
+    return f'{VERSION_KEY_PREFIX}{scope}'
+
+
+def bump(*scopes):
+    """Invalidate every cached response that depends on ``scopes``."""
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Start from a fresh timestamp so an evicted counter never
+            # comes back at a value an older cached response was keyed on
+            cache.set(key, time.time_ns(), None)
+    replicas.mark_written(*scopes)
+
+
+def invalidate_tasks(*owner_ids):
+    """Invalidate cached task and group-count responses for these owners."""
+    bump(*[f'tasks:{owner_id}' for owner_id in set(owner_ids)], 'tasks:all', 'group_counts')
+    replicas.pin(*owner_ids)
+
+
+def _versions(scopes):
+    keys = [_version_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            found[key] = time.time_ns()
+            cache.add(key, found[key], None)
+    return [str(found[key]) for key in keys]
+
+
+def _resolve(scope, user):
+    if scope == 'tasks':
+        return 'tasks:all' if user.is_superuser else f'tasks:{user.pk}'
+    return scope
+
+
+def cached_response(*scopes):
+    """
+    Cache the successful responses of a viewset action per user and serve
+    ``304 Not Modified`` when the client's ``If-None-Match`` still matches.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(self, request, *args, **kwargs)
+
+            resolved = [_resolve(scope, request.user) for scope in scopes]
+            versions = _versions(resolved)
+            fingerprint = '|'.join([
+                str(request.user.pk),
+                request.accepted_renderer.format,
+                # Paginated bodies hold absolute next/previous links
+                request.scheme,
+                request.get_host(),
+                request.get_full_path(),
+                *versions,
+            ])
+            digest = hashlib.md5(fingerprint.encode()).hexdigest()
+            etag = f'"{digest}"'
+            key = f'{RESPONSE_KEY_PREFIX}{digest}'
+
+            if etag in request.headers.get('If-None-Match', ''):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                data = cache.get(key)
+                if data is not None:
+                    response = Response(data)
+                else:
+                    with replicas.reading_from(replicas.choose_replica(request.user.pk, resolved)):
+                        response = method(self, request, *args, **kwargs)
+                    if not isinstance(response, Response) or response.status_code != 200:
+                        return response
+                    cache.set(key, response.data, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization', 'Cookie'])
+            return response
+        return wrapper
+    return decorator
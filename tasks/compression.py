@@ -0,0 +1,134 @@
+"""
+Negotiated response compression.
+
+``CompressionMiddleware`` works like Django's GZipMiddleware, with two
+differences: it answers ``Accept-Encoding: br`` with brotli when the
+optional ``brotli`` package is installed, and it leaves responses under
+``COMPRESSION_MIN_SIZE`` bytes alone, since compressing them costs more
+time than it saves on the wire. Streaming responses (NDJSON exports) are
+compressed chunk by chunk. Server-Sent Events are not compressed, so each
+event reaches the client as soon as it is sent.
+
+As in GZipMiddleware, strong ETags become weak ones, and gzipped responses
+(not streams, which only carry exported data) are padded with a random
+number of bytes to mitigate BREACH.
+"""
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    # Optional: only gzip is offered
+    brotli = None
+
+# brotli's default quality (11) is meant for static files, not responses
+BROTLI_QUALITY = 4
+# GZipMiddleware's BREACH mitigation
+MAX_RANDOM_BYTES = 100
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+
+def accepted_codings(header):
+    """``{coding: qvalue}`` from an ``Accept-Encoding`` header."""
+    codings = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def choose_coding(header):
+    """The best coding we can produce for ``header``, brotli on ties, or None."""
+    accepted = accepted_codings(header)
+    best, best_q = None, 0.0
+    for coding in (('br', 'gzip') if brotli else ('gzip',)):
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(content, coding):
+    if coding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content, max_random_bytes=MAX_RANDOM_BYTES)
+
+
+def _stream_compressor(coding):
+    """``(compress, flush, finish)`` functions of an incremental compressor."""
+    if coding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        return compressor.process, compressor.flush, compressor.finish
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def compress_stream(chunks, coding):
+    """Compress an iterable of chunks, flushing after each one."""
+    compress, flush, finish = _stream_compressor(coding)
+    for chunk in chunks:
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+async def acompress_stream(chunks, coding):
+    compress, flush, finish = _stream_compressor(coding)
+    async for chunk in chunks:
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with gzip or brotli, as negotiated with ``Accept-Encoding``."""
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        if response.has_header('Content-Encoding') or response.get('Content-Type', '').startswith(UNCOMPRESSED_TYPES):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = choose_coding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            wrap = acompress_stream if response.is_async else compress_stream
+            response.streaming_content = wrap(response.streaming_content, coding)
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(response.content, coding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = coding
+        return response
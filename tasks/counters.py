@@ -0,0 +1,198 @@
+"""
+Denormalized per-user and per-group task counters (TaskCounter).
+
+Every change to a task is recorded as "remove the old state, add the new
+state" against the counter rows of the task's owner and group. The rows
+are locked with SELECT ... FOR UPDATE inside the caller's transaction, so
+concurrent writers serialize on them and the counts stay exact.
+
+``overdue`` depends on the clock, so it is kept lazily: it counts pending
+tasks due at or before ``overdue_as_of``, and ``next_due_at`` is a lower
+bound on the next pending due date after that. Reads recount only once
+``next_due_at`` has passed; until then the stored value is still exact.
+
+Archived tasks (tasks/archive.py) keep being counted: they are all
+completed, and none is overdue.
+
+A missing counter row is rebuilt from the tasks table on first use, so
+counters never need to be backfilled by hand (see the
+``rebuild_task_counters`` management command to check or repair them).
+
+Counts are read from the primary, even when called from a view reading
+from a replica (tasks/replicas.py): they are stored there, and a replica
+may not have the latest tasks, nor the counter row just created.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from . import replicas
+from .models import ArchivedTask, Group, Task, TaskCounter
+
+# Task fields whose changes affect the counters
+COUNTED_FIELDS = frozenset(['owner', 'owner_id', 'group', 'group_id', 'completed', 'due_date'])
+
+
+@dataclass(frozen=True)
+class TaskState:
+    owner_id: int = None
+    group_id: int = None
+    completed: bool = False
+    due_date: datetime = None
+
+    @classmethod
+    def of(cls, task):
+        return cls(task.owner_id, task.group_id, task.completed, task.due_date)
+
+    def scopes(self):
+        if self.owner_id is not None:
+            yield ('user_id', self.owner_id)
+        if self.group_id is not None:
+            yield ('group_id', self.group_id)
+
+
+def locked_state(pk):
+    """The stored state of task ``pk``, locking its row until the transaction ends."""
+    row = Task.objects.select_for_update().filter(pk=pk).values_list(
+        'owner_id', 'group_id', 'completed', 'due_date'
+    ).first()
+    return TaskState(*row) if row else None
+
+
+def record(old, new):
+    """Record that one task went from ``old`` to ``new`` (either may be None)."""
+    if old != new:
+        record_many([(old, new)])
+
+
+def record_many(changes):
+    """Record ``(old_state, new_state)`` pairs, issuing one update per counter row."""
+    deltas = {}
+    for old, new in changes:
+        for sign, state in ((-1, old), (1, new)):
+            if state is None:
+                continue
+            for scope in state.scopes():
+                deltas.setdefault(scope, []).append((sign, state))
+
+    with transaction.atomic():
+        # Lock rows in a stable order so concurrent writers cannot deadlock
+        for scope in sorted(deltas):
+            _apply(scope, deltas[scope])
+
+
+def _apply(scope, states):
+    counter = TaskCounter.objects.select_for_update().filter(**{scope[0]: scope[1]}).first()
+    if counter is None:
+        # The task rows already reflect this change, so a recount is exact.
+        # Pure removals skip it: they may come from cascades deleting the
+        # user or group itself, and the next read rebuilds the row anyway.
+        if any(sign > 0 for sign, _ in states):
+            rebuild(*scope)
+        return
+
+    for sign, state in states:
+        counter.total += sign
+        if state.completed:
+            counter.completed += sign
+        elif state.due_date is not None:
+            if state.due_date <= counter.overdue_as_of:
+                counter.overdue += sign
+            elif sign > 0 and (counter.next_due_at is None or state.due_date < counter.next_due_at):
+                # Removals leave next_due_at early, which only costs an extra recount
+                counter.next_due_at = state.due_date
+    counter.save(update_fields=['total', 'completed', 'overdue', 'next_due_at'])
+
+
+def create_many(objs):
+    """
+    Insert new tasks, or new groups, with their ids set and their counters
+    kept as ``save()`` would. Call inside a transaction.
+    """
+    if not objs:
+        return
+    model = type(objs[0])
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # Without INSERT ... RETURNING (e.g. MySQL) bulk_create cannot
+        # report the new ids, so insert row by row (each save() keeps the
+        # counters)
+        for obj in objs:
+            obj.save(force_insert=True)
+        return
+    model.objects.bulk_create(objs)
+    # bulk_create() skips save() and the post_save signals
+    if model is Group:
+        TaskCounter.objects.bulk_create([TaskCounter(group=group) for group in objs])
+    else:
+        record_many([(None, TaskState.of(task)) for task in objs])
+
+
+@replicas.reading_from(None)
+def compute(field, value, now=None, archived=True):
+    """
+    Count the tasks of a scope from scratch, as TaskCounter field values.
+    ``archived=False`` skips counting the archive, when only ``overdue``
+    and ``next_due_at`` are needed.
+    """
+    now = now or timezone.now()
+    pending = Q(completed=False, due_date__isnull=False)
+    scope = {'owner_id' if field == 'user_id' else 'group_id': value}
+    # Aggregate aliases may not shadow the fields they filter on
+    values = Task.objects.filter(**scope).aggregate(
+        total_count=Count('pk'),
+        completed_count=Count('pk', filter=Q(completed=True)),
+        overdue_count=Count('pk', filter=pending & Q(due_date__lte=now)),
+        next_due=Min('due_date', filter=pending & Q(due_date__gt=now)),
+    )
+    archived = ArchivedTask.objects.filter(**scope).count() if archived else 0
+    return {
+        'total': values['total_count'] + archived,
+        'completed': values['completed_count'] + archived,
+        'overdue': values['overdue_count'],
+        'overdue_as_of': now,
+        'next_due_at': values['next_due'],
+    }
+
+
+@replicas.reading_from(None)
+def rebuild(field, value):
+    """Recount one scope and store the result, creating the row if needed."""
+    values = compute(field, value)
+    if TaskCounter.objects.filter(**{field: value}).update(**values):
+        return
+    try:
+        with transaction.atomic():
+            TaskCounter.objects.create(**{field: value}, **values)
+    except IntegrityError:
+        # Created concurrently; our recount is at least as fresh
+        TaskCounter.objects.filter(**{field: value}).update(**values)
+
+
+@replicas.reading_from(None)
+def refresh_overdue(counter):
+    """Recount ``overdue`` if a pending task has become due since the last count."""
+    now = timezone.now()
+    if counter.next_due_at is None or counter.next_due_at > now:
+        return counter
+    field, value = ('user_id', counter.user_id) if counter.user_id else ('group_id', counter.group_id)
+    with transaction.atomic():
+        counter = TaskCounter.objects.select_for_update().get(pk=counter.pk)
+        values = compute(field, value, now, archived=False)
+        counter.overdue = values['overdue']
+        counter.next_due_at = values['next_due_at']
+        counter.overdue_as_of = now
+        counter.save(update_fields=['overdue', 'next_due_at', 'overdue_as_of'])
+    return counter
+
+
+@replicas.reading_from(None)
+def get_counter(field, value):
+    """The up-to-date TaskCounter for a user or group, creating it if missing."""
+    counter = TaskCounter.objects.filter(**{field: value}).first()
+    if counter is None:
+        rebuild(field, value)
+        return TaskCounter.objects.get(**{field: value})
+    return refresh_overdue(counter)
@@ -0,0 +1,166 @@
+"""
+Live change events for clients that would otherwise poll.
+
+Task and group writes made through the API publish events such as
+
+    id: <sync watermark>
+    event: task.updated
+    data: {"id": 41, "data": {...task payload...}}
+
+which ``GET /api/async/events/`` streams to connected clients as
+Server-Sent Events. ``data`` is the object as the API returns it, and is
+left out of ``*.deleted`` events. The ``id`` of every event is a
+``/api/tasks/sync/`` watermark: a client that reconnects, or receives a
+``resync`` event because it fell too far behind, catches up with
+``/api/tasks/sync/?since=<last event id>``.
+
+Events are encoded once, after the writing transaction commits, and
+handed to subscribers through a broker. ``LocalBroker`` reaches the
+subscribers of the current process only; another broker (e.g. over Redis
+pub/sub) can be configured with ``EVENTS_BROKER`` as long as it offers the
+same ``subscribe``/``unsubscribe``/``publish`` methods.
+"""
+import asyncio
+import functools
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .renderers import dumps
+
+# Seconds between comments sent on idle streams, so proxies keep them open
+KEEPALIVE = 15
+
+KEEPALIVE_COMMENT = b': keep-alive\n\n'
+RESYNC = b'event: resync\ndata: {}\n\n'
+
+
+def watermark(moment=None):
+    """A signed ``/api/tasks/sync/`` watermark for ``moment`` (default now)."""
+    return signing.dumps((moment or timezone.now()).isoformat(), salt='tasks.sync')
+
+
+def encode(event, data, event_id=None):
+    """One Server-Sent Event as bytes."""
+    lines = [f'id: {event_id}'.encode()] if event_id else []
+    lines += [f'event: {event}'.encode(), b'data: ' + dumps(data)]
+    return b'\n'.join(lines) + b'\n\n'
+
+
+def channels_for(user):
+    """Channels streamed to ``user``: their tasks (every task for superusers) and all groups."""
+    return ('tasks' if user.is_superuser else f'user:{user.pk}', 'groups')
+
+
+class Subscription:
+    """
+    A bounded backlog of encoded events, read by one event loop. Kept
+    small: a server holds one per open stream.
+    """
+    __slots__ = ('channels', 'loop', 'size', 'messages', 'waiter')
+
+    def __init__(self, channels, size):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.size = size
+        self.messages = deque()
+        self.waiter = None
+
+    def deliver(self, message):
+        if len(self.messages) >= self.size:
+            # Too far behind: drop the backlog and have the client resync
+            self.messages.clear()
+            message = RESYNC
+        self.messages.append(message)
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def get(self):
+        while not self.messages:
+            self.waiter = self.loop.create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        return self.messages.popleft()
+
+
+class LocalBroker:
+    """In-process fan-out to the subscribers of this worker."""
+    queue_size = 100
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = defaultdict(set)
+
+    def subscribe(self, channels):
+        """Subscribe the running event loop to ``channels``."""
+        subscription = Subscription(channels, self.queue_size)
+        with self.lock:
+            for channel in channels:
+                self.channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.channels[channel]
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(set().union(*self.channels.values()))
+
+    def publish(self, channels, message):
+        """Deliver ``message`` to the subscribers of ``channels``; safe from any thread."""
+        by_loop = defaultdict(list)
+        with self.lock:
+            for subscription in set().union(*[self.channels.get(channel, ()) for channel in channels]):
+                by_loop[subscription.loop].append(subscription)
+        # One wake-up per event loop, however many subscribers it serves
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, message)
+            except RuntimeError:
+                # The loop has closed, and its streams with it
+                pass
+
+
+def _deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+@functools.cache
+def get_broker():
+    return import_string(settings.EVENTS_BROKER)()
+
+
+def emit(model, action, items):
+    """
+    Publish ``<model>.<action>`` events (``model`` is ``'task'`` or
+    ``'group'``) once the current transaction commits. ``items`` are
+    ``(owner_id, pk, data)`` triples, where ``data`` is the serialized
+    object, or None for deletions.
+    """
+    items = list(items)
+    if items:
+        transaction.on_commit(functools.partial(emit_committed, model, action, items))
+
+
+def emit_committed(model, action, items):
+    """Publish events for writes that are already committed, as emit() does on commit."""
+    broker = get_broker()
+    event_id = watermark()
+    for owner_id, pk, data in items:
+        payload = {'id': pk} if data is None else {'id': pk, 'data': data}
+        channels = ('tasks', f'user:{owner_id}') if model == 'task' else ('groups',)
+        broker.publish(channels, encode(f'{model}.{action}', payload, event_id))
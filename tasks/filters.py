@@ -0,0 +1,108 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .search import search
+
+
+def parse_boundary(value, end_of_day=False):
+    """
+    Parse an ISO date or datetime query value. A bare date means the start
+    of that day, or the start of the next day when ``end_of_day`` is set.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        if end_of_day:
+            day += timedelta(days=1)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class TaskFilterBackend(BaseFilterBackend):
+    """
+    Filter tasks with query parameters:
+
+    - ``due_after`` / ``due_before``: ISO date or datetime (dates are inclusive)
+    - ``group``: group id, or ``none`` for tasks without a group
+    - ``completed``: ``true`` or ``false``
+    - ``search``: words that must all appear in the title or description
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        errors = {}
+
+        if params.get('due_after'):
+            try:
+                queryset = queryset.filter(due_date__gte=parse_boundary(params['due_after']))
+            except ValueError:
+                errors['due_after'] = ['Enter a valid date or datetime.']
+        if params.get('due_before'):
+            try:
+                due_before = parse_boundary(params['due_before'], end_of_day=True)
+                if parse_datetime(params['due_before']) is None:
+                    queryset = queryset.filter(due_date__lt=due_before)
+                else:
+                    queryset = queryset.filter(due_date__lte=due_before)
+            except ValueError:
+                errors['due_before'] = ['Enter a valid date or datetime.']
+
+        group = params.get('group')
+        if group == 'none':
+            queryset = queryset.filter(group__isnull=True)
+        elif group:
+            if group.isdigit():
+                queryset = queryset.filter(group_id=int(group))
+            else:
+                errors['group'] = ['Enter a group id or "none".']
+
+        completed = params.get('completed', '').lower()
+        if completed in ('true', '1'):
+            queryset = queryset.filter(completed=True)
+        elif completed in ('false', '0'):
+            queryset = queryset.filter(completed=False)
+        elif completed:
+            errors['completed'] = ['Enter true or false.']
+
+        if errors:
+            raise ValidationError(errors)
+
+        if params.get('search'):
+            queryset = search(queryset, params['search'])
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        def parameter(name, description, schema_type='string'):
+            return {
+                'name': name,
+                'required': False,
+                'in': 'query',
+                'description': description,
+                'schema': {'type': schema_type},
+            }
+        return [
+            parameter('due_after', 'Only tasks due on or after this ISO date/datetime'),
+            parameter('due_before', 'Only tasks due on or before this ISO date/datetime'),
+            parameter('group', 'Group id, or "none" for ungrouped tasks'),
+            parameter('completed', 'true or false', 'boolean'),
+            parameter('search', 'Words to find in the title or description'),
+        ]
+
+
+class TaskOrderingFilter(OrderingFilter):
+    """``?ordering=due_date,-created_at``; ids break ties so pages are stable."""
+    ordering_fields = ['created_at', 'updated_at', 'due_date', 'title', 'completed']
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering and request.query_params.get(self.ordering_param):
+            return queryset.order_by(*ordering, '-id')
+        return queryset
@@ -0,0 +1,182 @@
+"""
+Database-backed background jobs.
+
+Requests enqueue a Job row (inside their own transaction, so a job never
+runs for a write that was rolled back) and return; ``manage.py run_worker``
+processes claim and run them. No broker is needed, and any number of
+workers can run: each job is claimed with a conditional UPDATE that only
+one worker can win.
+
+Handlers are registered with ``@job(name)`` and called with the job's
+payload as keyword arguments; their return value (JSON) is stored as the
+job's result. A handler that raises is retried with exponential backoff
+until ``max_attempts``, so handlers must be safe to run again.
+"""
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import archive, counters, events, transfer
+from .caching import bump, invalidate_tasks
+from .models import Group, Job, Task, TaskCounter
+from .serializers import TaskSerializer
+
+HANDLERS = {}
+
+# Queued jobs considered per claim attempt, so concurrent workers racing
+# for the oldest job fall through to the next one
+CLAIM_CANDIDATES = 10
+RETRY_DELAY = timedelta(seconds=10)
+
+
+def job(name):
+    """Register a job handler under ``name``."""
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, owner=None, max_attempts=3, run_after=None, **payload):
+    """Queue job ``name`` to run with ``payload`` and return it."""
+    if name not in HANDLERS:
+        raise ValueError(f"Unknown job '{name}'")
+    return Job.objects.create(
+        name=name, owner=owner, payload=payload, max_attempts=max_attempts,
+        run_after=run_after or timezone.now(),
+    )
+
+
+def claim():
+    """Mark the oldest due job as running and return it, or None if there is none."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'pk')
+    for pk in due.values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1
+        ):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Run a claimed job and record its result, or schedule a retry."""
+    try:
+        handler = HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f"No handler for job '{job.name}'")
+        result = handler(**job.payload)
+    except Exception:
+        job.error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_after = now + RETRY_DELAY * 2 ** (job.attempts - 1)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = now
+        job.save(update_fields=['status', 'run_after', 'error', 'finished_at'])
+        return job
+
+    job.status = Job.DONE
+    job.result = result
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def requeue_stale(timeout):
+    """
+    Recover jobs left running by a worker that died: retry them, or fail
+    those with no attempts left. Returns the number of jobs recovered.
+    """
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - timeout)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='The worker running this job stopped.', finished_at=timezone.now()
+    )
+    return failed + stale.update(status=Job.QUEUED)
+
+
+@job('reassign_group_tasks')
+def reassign_group_tasks(group_id, to_group_id=None, delete=False, batch_size=1000):
+    """
+    Move every task of group ``group_id`` to ``to_group_id`` (None leaves
+    them ungrouped), ``batch_size`` rows per transaction, then delete the
+    group if ``delete``. Counters and sync timestamps are updated as the
+    tasks move, so a rerun after a failure picks up where it stopped.
+    Publishes the same events as the equivalent API writes.
+    """
+    serializer = TaskSerializer()
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Task.objects.select_for_update().filter(group_id=group_id).order_by('pk')
+                .values_list('pk', 'owner_id', 'completed', 'due_date')[:batch_size]
+            )
+            if not rows:
+                break
+            Task.objects.filter(pk__in=[row[0] for row in rows]).update(
+                group_id=to_group_id, updated_at=timezone.now()
+            )
+            counters.record_many([
+                (counters.TaskState(owner_id, group_id, completed, due_date),
+                 counters.TaskState(owner_id, to_group_id, completed, due_date))
+                for _, owner_id, completed, due_date in rows
+            ])
+            updated = Task.objects.filter(pk__in=[row[0] for row in rows]).order_by('pk')
+            events.emit('task', 'updated', [
+                (data['owner'], data['id'], data)
+                for data in serializer.from_values(updated.values(*serializer.value_lookups()))
+            ])
+        moved += len(rows)
+        invalidate_tasks(*{row[1] for row in rows})
+
+    if delete:
+        group = Group.objects.filter(pk=group_id).first()
+        if group is not None:
+            group.delete()
+            events.emit('group', 'deleted', [(group.owner_id, group_id, None)])
+    return {'moved': moved}
+
+
+@job('rebuild_counters')
+def rebuild_counters():
+    """Recount every stored TaskCounter row."""
+    rebuilt = 0
+    for counter in TaskCounter.objects.only('user_id', 'group_id').iterator():
+        field, value = ('user_id', counter.user_id) if counter.user_id else ('group_id', counter.group_id)
+        counters.rebuild(field, value)
+        rebuilt += 1
+    bump('group_counts')
+    return {'rebuilt': rebuilt}
+
+
+@job('export_data')
+def export_data(user_id, fmt='ndjson'):
+    """Export a user's dataset to a file in ``EXPORT_DIR``."""
+    user = User.objects.get(pk=user_id)
+    directory = Path(settings.EXPORT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{user.username}-{timezone.now():%Y%m%d-%H%M%S}.{fmt}'
+    partial = path.with_name(f'.{path.name}.partial')
+    with open(partial, 'w', encoding='utf-8', newline='') as f:
+        for chunk in transfer.iter_export(user, fmt):
+            f.write(chunk)
+    partial.replace(path)
+    return {'path': str(path)}
+
+
+@job('archive_tasks')
+def archive_tasks(days=None, batch_size=archive.BATCH_SIZE):
+    """Archive tasks completed more than ``days`` (default ARCHIVE_AFTER_DAYS) days ago."""
+    days = settings.ARCHIVE_AFTER_DAYS if days is None else days
+    before = timezone.now() - timedelta(days=days)
+    return {'archived': archive.archive_completed(before, batch_size=batch_size)}
@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tasks import archive, jobs
+from tasks.models import ArchivedTask
+
+
+class Command(BaseCommand):
+    help = 'Move old completed tasks to the archive table, or restore a user\'s archived tasks with --restore.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help=f'Archive tasks completed more than this many days ago (default {settings.ARCHIVE_AFTER_DAYS})',
+        )
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE, help='Tasks moved per transaction')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue an archive_tasks job (see run_worker) and exit',
+        )
+        parser.add_argument('--restore', metavar='USERNAME', help="Move this user's archived tasks back instead")
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            user = User.objects.filter(username=options['restore']).first()
+            if user is None:
+                raise CommandError(f"No user named '{options['restore']}'")
+            restored = archive.restore(ArchivedTask.objects.filter(owner=user), batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Restored {restored} tasks for {user.username}'))
+            return
+
+        if options['background']:
+            job = jobs.enqueue('archive_tasks', days=options['days'], batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Queued {job}'))
+            return
+
+        before = timezone.now() - timedelta(days=options['days'])
+        archived = archive.archive_completed(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} tasks completed before {before:%Y-%m-%d %H:%M}'))
@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from tasks.benchmarks import BENCHMARKS, compare, speed_ratio
+
+
+class Command(BaseCommand):
+    help = 'Run a tasks API benchmark against a throwaway test database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS), help='Benchmark to run')
+        parser.add_argument('--tasks', type=int, help='Tasks to seed per user (default depends on the benchmark)')
+        parser.add_argument('--repeat', type=int, help='Requests per measurement (default depends on the benchmark)')
+        parser.add_argument('--concurrency', type=int, help='Concurrent connections, for load benchmarks')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument(
+            '--baseline',
+            help='Compare against the results of an earlier --output; exit non-zero on regressions',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Allowed latency/memory growth over the baseline, as a fraction (default 0.5)',
+        )
+
+    def handle(self, *args, **options):
+        func = BENCHMARKS.get(options['name'])
+        if func is None:
+            raise CommandError(f"Unknown benchmark '{options['name']}'")
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = func(**{key: value for key, value in options.items() if value is not None})
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for label, metrics in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            for key, value in metrics.items():
+                self.stdout.write(f'  {key}: {value}')
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, default=str)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            self.stdout.write(f'Speed vs. baseline: x{speed_ratio(results, baseline):.2f} (median p50 ratio)')
+            regressions = compare(results, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
@@ -0,0 +1,39 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import jobs, transfer
+
+
+class Command(BaseCommand):
+    help = "Export a user's groups and tasks as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=sorted(transfer.FORMATS), default='ndjson')
+        parser.add_argument('--output', default='-', help='File to write (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows read per query')
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue a job that writes the export to EXPORT_DIR (see run_worker) and exit',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        if options['background']:
+            job = jobs.enqueue('export_data', owner=user, user_id=user.pk, fmt=options['format'])
+            self.stdout.write(self.style.SUCCESS(f'Queued {job}'))
+            return
+        chunks = transfer.iter_export(user, options['format'], options['chunk_size'])
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        # newline='' keeps the CSV writer's \r\n line endings as they are
+        with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported {user.username} to {options['output']}"))
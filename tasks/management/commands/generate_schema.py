@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from GTD import schema
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema artifact served by /api/schema/, removing stale versions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Regenerate the artifact even if the current version already exists',
+        )
+
+    def handle(self, *args, **options):
+        path = schema.artifact_path()
+        if options['force'] or not path.exists():
+            schema.write_artifact(path, schema.generate_schema())
+            self.stdout.write(f'Wrote {path}')
+        else:
+            self.stdout.write(f'{path} is up to date')
+
+        for stale in path.parent.glob('openapi-*.json'):
+            if stale != path:
+                stale.unlink()
+                self.stdout.write(f'Removed {stale}')
+        self.stdout.write(self.style.SUCCESS(f'Schema version {schema.schema_version()}'))
@@ -0,0 +1,43 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from tasks import transfer
+
+
+class Command(BaseCommand):
+    help = "Import groups and tasks from an NDJSON or CSV export as new rows owned by a user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help="Export file, or '-' for stdin")
+        parser.add_argument(
+            '--format', choices=sorted(transfer.FORMATS),
+            help='Input format (default: csv for .csv files, ndjson otherwise)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+        parse = transfer.PARSERS[fmt]
+        try:
+            if path == '-':
+                counts = transfer.import_records(user, parse(sys.stdin), options['batch_size'])
+            else:
+                with open(path, encoding='utf-8', newline='') as f:
+                    counts = transfer.import_records(user, parse(f), options['batch_size'])
+        except ValidationError as exc:
+            raise CommandError(f'Nothing imported: {exc.detail}')
+        except (OSError, UnicodeDecodeError) as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['groups']} groups and {counts['tasks']} tasks for {user.username}"
+        ))
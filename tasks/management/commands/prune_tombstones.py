@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tasks.models import Tombstone
+from tasks.views import TaskViewSet
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than the sync retention window.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - TaskViewSet.sync_retention
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones older than {cutoff:%Y-%m-%d %H:%M}'))
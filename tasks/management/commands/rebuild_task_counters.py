@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks import counters, jobs
+from tasks.models import TaskCounter
+
+FIELDS = ['total', 'completed', 'overdue']
+
+
+class Command(BaseCommand):
+    help = 'Recount the per-user and per-group task counters, or check them with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report counters that differ from a fresh count; exit non-zero if any do',
+        )
+        parser.add_argument(
+            '--background', action='store_true',
+            help='Queue a job that recounts every counter (see run_worker) and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('rebuild_counters')
+            self.stdout.write(self.style.SUCCESS(f'Queued {job}'))
+            return
+
+        # Missing rows need no repair: they are built on first use
+        checked = mismatched = 0
+        for counter in TaskCounter.objects.iterator():
+            field, value = ('user_id', counter.user_id) if counter.user_id else ('group_id', counter.group_id)
+            actual = {name: getattr(counter, name) for name in FIELDS}
+            # Stored overdue counts are exact as of overdue_as_of (see
+            # counters.py), so count as of then rather than refresh the row
+            counted = counters.compute(field, value, now=counter.overdue_as_of)
+            expected = {name: counted[name] for name in FIELDS}
+            checked += 1
+            if actual != expected:
+                mismatched += 1
+                self.stdout.write(f'{field}={value}: stored {actual}, counted {expected}')
+                if not options['check']:
+                    counters.rebuild(field, value)
+
+        if options['check'] and mismatched:
+            raise CommandError(f'{mismatched} of {checked} counters are out of date')
+        verb = 'out of date' if options['check'] else 'rebuilt'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} counters, {mismatched} {verb}'))
@@ -0,0 +1,75 @@
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from tasks import jobs
+from tasks.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (see tasks/jobs.py) until stopped with SIGTERM or Ctrl-C.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, help='Exit after running this many jobs')
+        parser.add_argument(
+            '--stale-after', type=int, default=3600,
+            help='Requeue jobs left running this many seconds by a worker that died (default 3600)',
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        # Finish the current job, then exit
+        previous = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            self.work(options)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            self.release_connections()
+
+    def work(self, options):
+        stale_after = timedelta(seconds=options['stale_after'])
+        ran = 0
+        next_recovery = 0
+        while not self.stopping and (options['max_jobs'] is None or ran < options['max_jobs']):
+            self.release_connections()
+            if time.monotonic() >= next_recovery:
+                recovered = jobs.requeue_stale(stale_after)
+                if recovered:
+                    self.stdout.write(f'Recovered {recovered} stale jobs')
+                next_recovery = time.monotonic() + 60
+
+            job = jobs.claim()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+
+            start = time.perf_counter()
+            job = jobs.run(job)
+            ran += 1
+            elapsed = (time.perf_counter() - start) * 1000
+            line = f'{job} in {elapsed:.0f} ms'
+            if job.status == Job.DONE:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(self.style.ERROR(line))
+                self.stdout.write(job.error)
+
+    def release_connections(self):
+        """
+        Drop broken or expired connections between jobs, as the request cycle
+        does for views. Skipped inside a transaction (a test case), where
+        Django would take the connection for obsolete.
+        """
+        if not any(connection.in_atomic_block for connection in connections.all()):
+            close_old_connections()
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,278 @@
+"""
+Per-route request instrumentation.
+
+``InstrumentationMiddleware`` (enabled with ``INSTRUMENTATION=true``)
+records, for every request, its duration and response size under the
+route name (``task-list``, ``group-tasks``, ...). A sample of requests
+(``INSTRUMENTATION_SAMPLE_RATE``) also records the SQL query count and
+time, and the time spent serializing: serializer ``.data`` and
+``from_values()`` and, in viewsets using ``InstrumentedViewMixin``,
+rendering. Unsampled requests cost two clock reads and a locked counter
+update, so the middleware can stay on in production.
+
+Every response carries a ``Server-Timing`` header; ``/metrics`` serves
+the totals in the Prometheus text format. The totals are per process, so
+scrape each worker (or run one metrics-scraped process per host).
+"""
+import contextvars
+import hmac
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_sample = contextvars.ContextVar('gtd_request_sample', default=None)
+
+
+class RequestSample:
+    """Detailed measurements for one sampled request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+
+@contextmanager
+def timed_serialization():
+    """Add the enclosed time to the current sampled request's serialize time."""
+    sample = _current_sample.get()
+    if sample is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.serialize_seconds += time.perf_counter() - start
+
+
+class RouteStats:
+    __slots__ = ('requests', 'duration_sum', 'buckets', 'response_bytes', 'sampled',
+                 'queries', 'db_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.requests = 0
+        self.duration_sum = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.response_bytes = 0
+        self.sampled = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+class MetricsRegistry:
+    """Thread-safe, in-process totals keyed by ``(route, method, status)``."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status, duration, size, sample=None):
+        key = (route, method, str(status))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = RouteStats()
+            stats.requests += 1
+            stats.duration_sum += duration
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[i] += 1
+                    break
+            stats.response_bytes += size
+            if sample is not None:
+                stats.sampled += 1
+                stats.queries += sample.queries
+                stats.db_seconds += sample.db_seconds
+                stats.serialize_seconds += sample.serialize_seconds
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+    def render(self):
+        """The totals in the Prometheus text exposition format."""
+        with self._lock:
+            stats = sorted(self._stats.items())
+            stats = [(key, _copy(value)) for key, value in stats]
+
+        def labels(route, method, status, **extra):
+            pairs = {'route': route, 'method': method, 'status': status, **extra}
+            return ','.join(f'{name}="{_escape(value)}"' for name, value in pairs.items())
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        metric('gtd_http_requests_total', 'counter', 'Requests handled.', [
+            f'gtd_http_requests_total{{{labels(*key)}}} {s.requests}' for key, s in stats
+        ])
+        histogram = []
+        for key, s in stats:
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, s.buckets):
+                cumulative += count
+                histogram.append(f'gtd_http_request_duration_seconds_bucket{{{labels(*key, le=bound)}}} {cumulative}')
+            histogram.append(f'gtd_http_request_duration_seconds_bucket{{{labels(*key, le="+Inf")}}} {s.requests}')
+            histogram.append(f'gtd_http_request_duration_seconds_sum{{{labels(*key)}}} {s.duration_sum:.6f}')
+            histogram.append(f'gtd_http_request_duration_seconds_count{{{labels(*key)}}} {s.requests}')
+        metric('gtd_http_request_duration_seconds', 'histogram', 'Request duration.', histogram)
+        metric('gtd_http_response_size_bytes_total', 'counter', 'Response body bytes (streamed bodies excluded).', [
+            f'gtd_http_response_size_bytes_total{{{labels(*key)}}} {s.response_bytes}' for key, s in stats
+        ])
+        metric('gtd_http_sampled_requests_total', 'counter', 'Requests with SQL and serialization measured.', [
+            f'gtd_http_sampled_requests_total{{{labels(*key)}}} {s.sampled}' for key, s in stats
+        ])
+        metric('gtd_db_queries_total', 'counter', 'SQL queries issued by sampled requests.', [
+            f'gtd_db_queries_total{{{labels(*key)}}} {s.queries}' for key, s in stats
+        ])
+        metric('gtd_db_query_seconds_total', 'counter', 'SQL time of sampled requests.', [
+            f'gtd_db_query_seconds_total{{{labels(*key)}}} {s.db_seconds:.6f}' for key, s in stats
+        ])
+        metric('gtd_serialize_seconds_total', 'counter', 'Serialization and rendering time of sampled requests.', [
+            f'gtd_serialize_seconds_total{{{labels(*key)}}} {s.serialize_seconds:.6f}' for key, s in stats
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+def _copy(stats):
+    copy = RouteStats()
+    for name in RouteStats.__slots__:
+        value = getattr(stats, name)
+        setattr(copy, name, list(value) if isinstance(value, list) else value)
+    return copy
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+def route_name(request):
+    """The URL name of the matched route; unmatched paths share one label."""
+    match = getattr(request, 'resolver_match', None)
+    return (match.url_name or match.view_name) if match else 'unmatched'
+
+
+def server_timing(duration, sample=None):
+    parts = []
+    if sample is not None:
+        parts.append(f'db;dur={sample.db_seconds * 1000:.2f};desc="{sample.queries} queries"')
+        parts.append(f'serialize;dur={sample.serialize_seconds * 1000:.2f}')
+    parts.append(f'total;dur={duration * 1000:.2f}')
+    return ', '.join(parts)
+
+
+class InstrumentationMiddleware:
+    """Record per-route timings and add a ``Server-Timing`` header."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 0.1)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        if random.random() < self.sample_rate:
+            sample = RequestSample()
+            token = _current_sample.set(sample)
+            try:
+                with _wrap_connections(sample):
+                    response = self.get_response(request)
+            finally:
+                _current_sample.reset(token)
+        else:
+            sample = None
+            response = self.get_response(request)
+        return self.finish(request, response, time.perf_counter() - start, sample)
+
+    async def __acall__(self, request):
+        # Async views run their queries on other threads, so only the
+        # duration and size are recorded here
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, time.perf_counter() - start)
+
+    def finish(self, request, response, duration, sample=None):
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(route_name(request), request.method, response.status_code, duration, size, sample)
+        response['Server-Timing'] = server_timing(duration, sample)
+        return response
+
+
+@contextmanager
+def _wrap_connections(sample):
+    wrappers = [connection.execute_wrapper(sample) for connection in connections.all()]
+    for wrapper in wrappers:
+        wrapper.__enter__()
+    try:
+        yield
+    finally:
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+
+
+class TimedRenderer:
+    """Proxy a DRF renderer, counting ``render()`` as serialization time."""
+
+    def __init__(self, renderer):
+        self._renderer = renderer
+
+    def __getattr__(self, name):
+        return getattr(self._renderer, name)
+
+    def render(self, *args, **kwargs):
+        with timed_serialization():
+            return self._renderer.render(*args, **kwargs)
+
+
+class InstrumentedViewMixin:
+    """Count response rendering as serialization time in sampled requests."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if renderer is not None and _current_sample.get() is not None:
+            response.accepted_renderer = TimedRenderer(renderer)
+        return response
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; needs ``Authorization: Bearer <METRICS_TOKEN>`` if set."""
+    if not getattr(settings, 'INSTRUMENTATION', False):
+        raise Http404
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    # Bytes, as compare_digest() rejects non-ASCII str
+    given = request.headers.get('Authorization', '').encode()
+    if token and not hmac.compare_digest(given, f'Bearer {token}'.encode()):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
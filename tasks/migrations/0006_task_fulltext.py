@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:30
+
+from django.db import migrations
+
+
+def add_fulltext_index(apps, schema_editor):
+    # SQLite gets an FTS5 table instead, see tasks.search.ensure_sqlite_fts
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE tasks_task ADD FULLTEXT INDEX task_title_description_ft (title, description)'
+        )
+
+
+def remove_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE tasks_task DROP INDEX task_title_description_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, remove_fulltext_index),
+    ]
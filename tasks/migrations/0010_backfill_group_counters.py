@@ -0,0 +1,63 @@
+from django.db import migrations
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def backfill_group_counters(apps, schema_editor):
+    """
+    Create the TaskCounter rows of groups created before 0007_task_counter,
+    so listing groups reads counters instead of counting each group's tasks.
+    """
+    Group = apps.get_model('tasks', 'Group')
+    Task = apps.get_model('tasks', 'Task')
+    ArchivedTask = apps.get_model('tasks', 'ArchivedTask')
+    TaskCounter = apps.get_model('tasks', 'TaskCounter')
+    using = schema_editor.connection.alias
+    now = timezone.now()
+    pending = Q(completed=False, due_date__isnull=False)
+
+    missing = Group.objects.using(using).filter(task_counter__isnull=True).order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while True:
+        ids = list(missing.filter(pk__gt=last)[:BATCH_SIZE])
+        if not ids:
+            return
+        counts = {
+            row['group_id']: row for row in
+            Task.objects.using(using).filter(group_id__in=ids).values('group_id').annotate(
+                total_count=Count('pk'),
+                completed_count=Count('pk', filter=Q(completed=True)),
+                overdue_count=Count('pk', filter=pending & Q(due_date__lte=now)),
+                next_due=Min('due_date', filter=pending & Q(due_date__gt=now)),
+            ).order_by()
+        }
+        archived = dict(
+            ArchivedTask.objects.using(using).filter(group_id__in=ids).values('group_id')
+            .annotate(count=Count('pk')).order_by().values_list('group_id', 'count')
+        )
+        empty = {'total_count': 0, 'completed_count': 0, 'overdue_count': 0, 'next_due': None}
+        TaskCounter.objects.using(using).bulk_create([
+            TaskCounter(
+                group_id=pk,
+                total=counts.get(pk, empty)['total_count'] + archived.get(pk, 0),
+                completed=counts.get(pk, empty)['completed_count'] + archived.get(pk, 0),
+                overdue=counts.get(pk, empty)['overdue_count'],
+                overdue_as_of=now,
+                next_due_at=counts.get(pk, empty)['next_due'],
+            )
+            for pk in ids
+        ])
+        last = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_archivedtask'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_group_counters, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,18 @@
-from django.db import models
+import dataclasses
+import hashlib
+import secrets
+
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Group(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     owner = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
@@ -19,6 +26,29 @@ class Group(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name', 'id'], name='group_name_id_idx'),
+        ]
+
+
+class TaskQuerySet(models.QuerySet):
+
+    def toggle_completed(self, pk):
+        """
+        Flip ``completed`` on task ``pk`` with one conditional UPDATE, if the
+        task is in this queryset (e.g. the owner's tasks). Returns the updated
+        task, or None. Like bulk writes, this sends no post_save signal.
+        """
+        from . import counters
+
+        with transaction.atomic(using=self.db):
+            if not self.filter(pk=pk).update(completed=~F('completed'), updated_at=timezone.now()):
+                return None
+            # The UPDATE holds the row lock, so this reads our own write
+            task = self.get(pk=pk)
+            new = counters.TaskState.of(task)
+            counters.record(dataclasses.replace(new, completed=not new.completed), new)
+        return task
 
 
 class Task(models.Model):
@@ -37,8 +67,180 @@ class Task(models.Model):
         blank=True
     )
 
+    objects = TaskQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} ({self.owner.username if self.owner else 'No owner'})"
 
+    def save(self, *args, **kwargs):
+        """Save and update the owner's and group's TaskCounter in one transaction"""
+        from . import counters
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not counters.COUNTED_FIELDS.intersection(update_fields):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(using=kwargs.get('using')):
+            old = counters.locked_state(self.pk) if self.pk and not kwargs.get('force_insert') else None
+            if old is not None and update_fields is not None:
+                # Counted columns we don't write keep their stored values,
+                # which may be newer than ours (e.g. a concurrent toggle)
+                written = {name.removesuffix('_id') for name in update_fields}
+                for field in dataclasses.fields(old):
+                    if field.name.removesuffix('_id') not in written:
+                        setattr(self, field.name, getattr(old, field.name))
+            super().save(*args, **kwargs)
+            counters.record(old, counters.TaskState.of(self))
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='task_owner_created_idx'),
+            models.Index(fields=['owner', 'completed', 'created_at'], name='task_owner_completed_idx'),
+            models.Index(fields=['group', 'owner', 'created_at'], name='task_group_owner_idx'),
+            models.Index(fields=['owner', 'due_date'], name='task_owner_due_date_idx'),
+            models.Index(fields=['owner', 'updated_at'], name='task_owner_updated_idx'),
+        ]
+
+
+class ArchivedTask(models.Model):
+    """
+    A completed task moved out of the Task table by tasks/archive.py, with
+    the same columns and id it had there. Archived tasks are still counted
+    in TaskCounter and listed by ``/api/tasks/completed/``.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField()
+    due_date = models.DateTimeField(null=True, blank=True)
+    completed = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    group = models.ForeignKey(
+        Group, null=True, blank=True, on_delete=models.SET_NULL, related_name='archived_tasks'
+    )
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_tasks', null=True, blank=True
+    )
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.title} (archived {self.archived_at:%Y-%m-%d})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='archived_owner_created_idx'),
+            models.Index(fields=['group', 'owner', 'created_at'], name='archived_group_owner_idx'),
+        ]
+
+
+class TaskCounter(models.Model):
+    """
+    Denormalized task counts for one user (their tasks) or one group (all of
+    its tasks). Maintained by tasks/counters.py; ``overdue`` is valid as of
+    ``overdue_as_of`` and is recounted once ``next_due_at`` has passed.
+    """
+    user = models.OneToOneField(
+        User, null=True, blank=True, on_delete=models.CASCADE, related_name='task_counter'
+    )
+    group = models.OneToOneField(
+        Group, null=True, blank=True, on_delete=models.CASCADE, related_name='task_counter'
+    )
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    overdue_as_of = models.DateTimeField(default=timezone.now)
+    next_due_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        scope = f"user {self.user_id}" if self.user_id else f"group {self.group_id}"
+        return f"Counters for {scope}: {self.total} tasks"
+
+    @property
+    def pending(self):
+        return self.total - self.completed
+
+
+class Tombstone(models.Model):
+    """Record of a deleted Task or Group, kept so sync clients learn about deletions."""
+    TASK = 'task'
+    GROUP = 'group'
+    MODEL_CHOICES = [(TASK, 'Task'), (GROUP, 'Group')]
+
+    model = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    # No FK constraint: tombstones are written while the owner may itself be deleted
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+            models.Index(fields=['owner', 'deleted_at'], name='tombstone_owner_deleted_idx'),
+        ]
+
+
+class AuthToken(models.Model):
+    """API token. Only a SHA-256 digest of the key is stored."""
+    digest = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='auth_tokens')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Token for {self.user.username} ({self.created_at:%Y-%m-%d})"
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        """Create a token for ``user`` and return ``(token, key)``; the key is not recoverable later."""
+        key = secrets.token_urlsafe(32)
+        return cls.objects.create(digest=cls.hash_key(key), user=user), key
+
+
+class Job(models.Model):
+    """
+    Deferred work run by ``manage.py run_worker``: ``name`` selects a handler
+    registered in tasks/jobs.py, which is called with ``payload`` as keyword
+    arguments. Failed jobs are retried with backoff up to ``max_attempts``.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['owner', 'created_at'], name='job_owner_created_idx'),
+        ]
@@ -0,0 +1,205 @@
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique composite ordering.
+
+    Unlike DRF's CursorPagination, the cursor stores the full key of the
+    boundary row, so every page is a single indexed range scan with no
+    OFFSET and no COUNT(*), however deep the client pages.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.check_ordering(request, view)
+        self.base_url = request.build_absolute_uri()
+        reverse, position = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self._invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self.coerce_position(position, queryset.model)
+            queryset = queryset.filter(self._after(position, ordering))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        self.next_position = self._key(rows[-1]) if has_next and rows else None
+        self.previous_position = self._key(rows[0]) if has_previous and rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(False, self.next_position)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(True, self.previous_position)
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps({'r': reverse, 'p': position}, default=str)
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def check_ordering(self, request, view):
+        """
+        Reject ``?ordering`` from the view's OrderingFilter: cursors are keyed
+        on the pagination's own ordering, which would replace it.
+        """
+        for backend in getattr(view, 'filter_backends', ()):
+            if issubclass(backend, OrderingFilter) and request.query_params.get(backend.ordering_param):
+                raise ValidationError({backend.ordering_param: [
+                    'Cursor pagination has a fixed ordering; use page numbers to sort.'
+                ]})
+
+    def decode_cursor(self, request):
+        """Return ``(reverse, position)``; ``position`` is None on the first page."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return False, None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            reverse, position = bool(payload['r']), payload['p']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def coerce_position(self, position, model):
+        """Convert each cursor key with its ordering field; NotFound for keys that do not fit."""
+        values = []
+        for name, value in zip(self.key_fields(), position):
+            if value is None or isinstance(value, (dict, list)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                values.append(model._meta.get_field(name).to_python(value))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            if values[-1] is None:
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def key_fields(self):
+        """Fields each row must carry for the cursor links to be built."""
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _key(self, obj):
+        values = []
+        for field in self.key_fields():
+            # Rows are model instances, or dicts from QuerySet.values()
+            value = obj[field] if isinstance(obj, dict) else getattr(obj, field)
+            values.append(value.isoformat() if isinstance(value, datetime) else value)
+        return values
+
+    def _after(self, position, ordering):
+        """Build ``(a, b) > (x, y)`` as an OR of prefix-equality terms."""
+        condition = Q()
+        for i, field in enumerate(ordering):
+            term = Q(**{
+                f.lstrip('-'): value for f, value in zip(ordering[:i], position[:i])
+            })
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term &= Q(**{f'{field.lstrip("-")}__{lookup}': position[i]})
+            condition |= term
+        return condition
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class TaskCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class GroupCursorPagination(KeysetPagination):
+    ordering = ('name', 'id')
+
+
+class OptInCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination by default. Clients opt into keyset pagination
+    with ``?pagination=cursor`` (and keep it by following the returned
+    links), which skips the total count.
+    """
+    cursor_class = KeysetPagination
+    mode_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.cursor_class.cursor_query_param in request.query_params):
+            self.cursor_paginator = self.cursor_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def key_fields(self):
+        return self.cursor_class().key_fields()
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append({
+            'name': self.mode_query_param,
+            'required': False,
+            'in': 'query',
+            'description': "Set to 'cursor' for keyset pagination without a total count.",
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        })
+        return parameters
+
+
+class TaskPagination(OptInCursorPagination):
+    cursor_class = TaskCursorPagination
+
+
+class GroupPagination(OptInCursorPagination):
+    cursor_class = GroupCursorPagination
@@ -0,0 +1,35 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:
+    # Optional: loads() falls back to the standard library
+    orjson = None
+
+
+def loads(content):
+    """Parse JSON ``bytes`` or ``str``, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser reading UTF-8 bodies with ``loads()``. Like JSONParser with
+    STRICT_JSON, it rejects NaN and Infinity; other charsets, and non-strict
+    parsing, are left to JSONParser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
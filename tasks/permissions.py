@@ -0,0 +1,42 @@
+"""
+Ownership rules shared by the API views and the admin.
+
+Ownership is decided on the owner's primary key, ``owner_id``, never on the
+related ``User`` instance, so a check costs no query: in querysets it is a
+column filter, and on a fetched row it compares two integers. Superusers
+own everything.
+"""
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+# Attribute holding the owner's primary key; a user owns their own row
+OWNER_FIELD = 'owner_id'
+
+
+def owner_field(model):
+    return 'pk' if model._meta.label == settings.AUTH_USER_MODEL else OWNER_FIELD
+
+
+def is_owner(user, obj):
+    """Whether ``user`` may change ``obj``."""
+    return user.is_superuser or getattr(obj, owner_field(type(obj))) == user.pk
+
+
+def owned_by(queryset, user):
+    """Restrict ``queryset`` to the rows ``user`` may change."""
+    if user.is_superuser:
+        return queryset
+    return queryset.filter(**{owner_field(queryset.model): user.pk})
+
+
+class IsOwnerOrReadOnly(BasePermission):
+    """
+    Anyone who passed the view's other permissions may read an object;
+    only its owner (or a superuser) may change or delete it.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS or is_owner(request.user, obj):
+            return True
+        self.message = f'You can only change your own {type(obj)._meta.verbose_name_plural}.'
+        return False
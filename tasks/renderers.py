@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    # Optional: dumps() falls back to the standard library
+    orjson = None
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+_default = JSONEncoder().default
+
+
+def dumps(data):
+    """
+    ``data`` as the compact UTF-8 JSON that JSONRenderer writes by default,
+    with orjson when it is installed. Datetimes, dates, times and UUIDs are
+    encoded natively; other types go through DRF's JSONEncoder.
+    """
+    if orjson is not None:
+        content = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+    else:
+        content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
+    # Like JSONRenderer, escape the line separators JavaScript rejects in strings
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same documents through ``dumps()``. Views may
+    leave datetimes in the data as ``datetime`` objects (see
+    ``native_datetimes``). Indented output, as the browsable API asks for,
+    and non-default UNICODE_JSON/COMPACT_JSON settings are left to
+    JSONRenderer.
+    """
+    native_datetimes = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Content negotiation for the NDJSON export. The export itself streams;
+    this only renders the other responses (e.g. errors) as one JSON line.
+    """
+    media_type = NDJSON_CONTENT_TYPE
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data) + b'\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Content negotiation for the CSV export; renders error dicts as one row."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(data)
+        writer.writerow(data.values())
+        return buffer.getvalue().encode()
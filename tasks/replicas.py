@@ -0,0 +1,101 @@
+"""
+Read replica routing.
+
+``DATABASE_REPLICAS`` lists database aliases that replicate the primary
+(``default``). ``ReplicaRouter`` sends every write to the primary, and reads
+too, except inside ``reading_from()``. The task and group reads cached by
+``cached_response`` run there on a cache miss: ``list``, ``retrieve``,
+``completed``, ``pending`` and ``/api/groups/{id}/tasks/``. Authentication
+and permission checks have already run by then, on the primary.
+
+Replicas lag behind the primary. Writes pin the owners of the changed
+tasks and groups to the primary for ``REPLICA_PIN_SECONDS``, so they read
+their own writes; everyone else keeps reading from the replicas. Writes
+also mark the response cache scopes they invalidate. A replica read of a
+scope marked within the window may predate the write that set the
+scope's current version, and would be cached under it, so reads of
+recently marked scopes go to the primary too. Most marks are per user
+(``tasks:<id>``); the shared scopes (``groups``, ``group_counts``,
+``tasks:all``) send the reads that depend on them to the primary for the
+window after each write, but their responses stay cached as usual.
+Pins and marks live in the cache, so they need the same shared backend
+as the response cache.
+
+Streamed responses (``?stream=ndjson``) read their rows as they are sent,
+after the view has returned, so they read from the primary.
+"""
+import contextlib
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+WRITTEN_KEY_PREFIX = 'gtd:written:'
+
+_read_alias = contextvars.ContextVar('replica_read_alias', default=None)
+
+
+def _written_key(scope):
+    return f'{WRITTEN_KEY_PREFIX}{scope}'
+
+
+def _pin_key(user_id):
+    return f'{WRITTEN_KEY_PREFIX}user:{user_id}'
+
+
+def _set_for_pin_window(keys):
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    if seconds and getattr(settings, 'DATABASE_REPLICAS', None):
+        cache.set_many(dict.fromkeys(keys, True), seconds)
+
+
+def pin(*user_ids):
+    """Keep these users' reads on the primary for ``REPLICA_PIN_SECONDS``."""
+    _set_for_pin_window([_pin_key(user_id) for user_id in set(user_ids)])
+
+
+def mark_written(*scopes):
+    """Record that ``scopes`` changed, for ``REPLICA_PIN_SECONDS``."""
+    _set_for_pin_window([_written_key(scope) for scope in scopes])
+
+
+def choose_replica(user_id, scopes):
+    """
+    The alias to read ``scopes`` from for user ``user_id``: a replica, or
+    None for the primary if the user is pinned or a scope was just written.
+    """
+    aliases = getattr(settings, 'DATABASE_REPLICAS', None)
+    if not aliases:
+        return None
+    if cache.get_many([_pin_key(user_id), *[_written_key(scope) for scope in scopes]]):
+        return None
+    return random.choice(aliases)
+
+
+@contextlib.contextmanager
+def reading_from(alias):
+    """Route the reads of this block to ``alias`` (None: the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Writes go to the primary; reads too, unless inside ``reading_from()``."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Not the database an instance was read from, which may be a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', ())}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,84 @@
+"""
+Full-text search over Task.title and Task.description.
+
+- MySQL: a FULLTEXT index (migration 0006) queried with MATCH ... AGAINST
+  in boolean mode.
+- SQLite: an external-content FTS5 table kept in sync by triggers, created
+  by ``ensure_sqlite_fts`` after every migrate (SQLite rebuilds tables on
+  ALTER, which drops their triggers).
+- Other backends, and ArchivedTask querysets (tasks/archive.py), fall
+  back to ``icontains``.
+
+Every word of the query must match, as a prefix.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Task
+
+FTS_TABLE = 'tasks_task_fts'
+
+SQLITE_FTS_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, description, content='tasks_task', content_rowid='id')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON tasks_task BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON tasks_task BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    f"VALUES ('delete', old.id, old.title, old.description); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON tasks_task BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) "
+    f"VALUES ('delete', old.id, old.title, old.description); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+
+def search_terms(query):
+    """Split a user query into safe word tokens."""
+    return re.findall(r'\w+', query)
+
+
+def ensure_sqlite_fts(connection):
+    """Create the FTS5 table and triggers if missing, rebuilding the index if so."""
+    expected = {FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", sorted(expected)
+        )
+        if {row[0] for row in cursor.fetchall()} == expected:
+            return
+        for statement in SQLITE_FTS_SQL:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search(queryset, query):
+    """Filter a Task (or ArchivedTask) queryset to rows matching every word of ``query``."""
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    # Only the live table is indexed
+    vendor = connections[queryset.db].vendor if queryset.model is Task else None
+    if vendor == 'mysql':
+        match = ' '.join(f'+{term}*' for term in terms)
+        return queryset.alias(
+            relevance=RawSQL(
+                'MATCH (tasks_task.title, tasks_task.description) AGAINST (%s IN BOOLEAN MODE)',
+                [match],
+                output_field=FloatField(),
+            )
+        ).filter(relevance__gt=0)
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+        ))
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition)
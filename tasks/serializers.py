@@ -1,13 +1,143 @@
-from rest_framework import serializers
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+from rest_framework.relations import PKOnlyObject, RelatedField
 from django.contrib.auth.models import User
-from .models import Task, Group
+from django.utils import timezone
+from . import counters
+from .metrics import timed_serialization
+from .models import Task, Group, Job
 
 
-class UserSerializer(serializers.ModelSerializer):
+def _fast_representation(field, native_datetimes=False):
+    """
+    ``field.to_representation``, specialised for ISO 8601 datetimes: DRF
+    looks the current timezone up again for every value, which dominates
+    the cost of serializing plain rows. With ``native_datetimes`` they are
+    only converted to the field's timezone, and left for the JSON encoder
+    to format.
+    """
+    if (isinstance(field, serializers.DateTimeField)
+            and str(getattr(field, 'format', api_settings.DATETIME_FORMAT)).lower() == ISO_8601):
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        if field_timezone is not None:
+            if native_datetimes:
+                def represent(value):
+                    if not timezone.is_aware(value):
+                        return field.to_representation(value)
+                    return value.astimezone(field_timezone)
+                return represent
+
+            def represent(value):
+                if not timezone.is_aware(value):
+                    return field.to_representation(value)
+                value = value.astimezone(field_timezone).isoformat()
+                return value[:-6] + 'Z' if value.endswith('+00:00') else value
+            return represent
+    return field.to_representation
+
+
+class TimedListSerializer(serializers.ListSerializer):
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets and a read-only fast path for model serializers.
+
+    Pass ``fields=[...]`` to keep only those readable fields. For listings,
+    ``value_lookups()`` names the columns those fields read, and
+    ``from_values()`` serializes the matching ``QuerySet.values()`` rows to
+    the same output as ``.data``, without building model instances.
+
+    Fields without a model source (``SerializerMethodField``) declare their
+    lookups in ``value_sources`` and are computed by a
+    ``<method_name>_from_values(row)`` method.
+
+    Serialization time is reported to the request metrics (see metrics.py);
+    set ``Meta.list_serializer_class = TimedListSerializer`` to include lists.
+    """
+    value_sources = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @property
+    def data(self):
+        with timed_serialization():
+            return super().data
+
+    @classmethod
+    def readable_field_names(cls):
+        return [field.field_name for field in cls()._readable_fields]
+
+    def value_lookups(self):
+        """ORM lookups (for ``.values()`` or ``.only()``) read by the current fields."""
+        lookups = []
+        for field in self._readable_fields:
+            if field.source == '*':
+                lookups.extend(self.value_sources[field.field_name])
+            else:
+                lookups.append('__'.join(field.source_attrs))
+        return list(dict.fromkeys(lookups))
+
+    def from_values(self, rows, native_datetimes=False):
+        """
+        Serialize ``.values(*self.value_lookups())`` rows. ``native_datetimes``
+        leaves ISO 8601 datetime fields as ``datetime`` objects, for encoders
+        that write them as ``.data`` would (see renderers.dumps()).
+        """
+        with timed_serialization():
+            return self._from_values(rows, native_datetimes)
+
+    def _from_values(self, rows, native_datetimes):
+        plan = []
+        for field in self._readable_fields:
+            if field.source == '*':
+                plan.append((field, None, getattr(self, f'{field.method_name}_from_values')))
+            else:
+                plan.append((field, '__'.join(field.source_attrs), _fast_representation(field, native_datetimes)))
+
+        data = []
+        for row in rows:
+            ret = {}
+            for field, lookup, represent in plan:
+                if lookup is None:
+                    ret[field.field_name] = represent(row)
+                    continue
+                value = row[lookup]
+                if value is None:
+                    if len(field.source_attrs) > 1:
+                        # A null relation (the related columns we read are not
+                        # nullable): like DRF's get_attribute(), use the
+                        # default, else None if allowed, else omit the field
+                        if field.default is not empty:
+                            ret[field.field_name] = field.get_default()
+                        elif field.allow_null:
+                            ret[field.field_name] = None
+                        continue
+                    ret[field.field_name] = None
+                elif isinstance(field, RelatedField):
+                    ret[field.field_name] = field.to_representation(PKOnlyObject(pk=value))
+                else:
+                    ret[field.field_name] = represent(value)
+            data.append(ret)
+        return data
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     
     class Meta:
         model = User
+        list_serializer_class = TimedListSerializer
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'password', 'date_joined']
         extra_kwargs = {
             'password': {'write_only': True},
@@ -16,35 +146,69 @@ class UserSerializer(serializers.ModelSerializer):
         }
         
     def create(self, validated_data):
-        password = validated_data.pop('password')
-        user = User.objects.create_user(**validated_data)
-        user.set_password(password)
-        user.save()
-        return user
+        # Hashed once, in the INSERT
+        return User.objects.create_user(**validated_data)
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     owner_username = serializers.CharField(source='owner.username', read_only=True)
     task_count = serializers.SerializerMethodField()
-    
+    value_sources = {'task_count': ['id', 'task_counter__total']}
+
     class Meta:
         model = Group
-        fields = ['id', 'name', 'description', 'created_at', 'owner', 'owner_username', 'task_count']
-        read_only_fields = ['id', 'created_at', 'owner']
+        list_serializer_class = TimedListSerializer
+        fields = ['id', 'name', 'description', 'created_at', 'updated_at', 'owner', 'owner_username', 'task_count']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'owner']
         
     def get_task_count(self, obj):
-        return obj.task_set.count()
+        # Read the precomputed TaskCounter (select_related by the views); a
+        # missing one is built once, so later listings find it
+        counter = getattr(obj, 'task_counter', None)
+        if counter is not None:
+            return counter.total
+        return counters.get_counter('group_id', obj.pk).total
+
+    def get_task_count_from_values(self, row):
+        if row['task_counter__total'] is not None:
+            return row['task_counter__total']
+        return counters.get_counter('group_id', row['id']).total
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     group_name = serializers.CharField(source='group.name', read_only=True)
     owner_username = serializers.CharField(source='owner.username', read_only=True)
     
     class Meta:
         model = Task
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'title', 'description', 'due_date', 'completed', 
             'created_at', 'updated_at', 'group', 'group_name', 
             'owner', 'owner_username'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'owner']
+
+    def update(self, instance, validated_data):
+        # Write only the submitted columns, so concurrent partial updates of
+        # different fields (or a toggle) are not overwritten with stale values
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class JobSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+
+    class Meta:
+        model = Job
+        list_serializer_class = TimedListSerializer
+        fields = [
+            'id', 'name', 'status', 'attempts', 'max_attempts', 'run_after',
+            'result', 'error', 'created_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class ReassignSerializer(serializers.Serializer):
+    group = serializers.PrimaryKeyRelatedField(queryset=Group.objects.all(), allow_null=True)
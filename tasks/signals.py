@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import token_cache
+from .caching import bump, invalidate_tasks
+from . import counters, replicas
+from .models import AuthToken, Group, Task, TaskCounter, Tombstone
+from .search import ensure_sqlite_fts
+
+
+@receiver(post_delete, sender=AuthToken)
+def evict_revoked_token(sender, instance, **kwargs):
+    """Drop revoked tokens from this process's cache immediately"""
+    token_cache.discard(instance.digest)
+
+
+@receiver(post_delete, sender=Task)
+def decrement_task_counters(sender, instance, **kwargs):
+    counters.record(counters.TaskState.of(instance), None)
+
+
+@receiver(post_save, sender=Group)
+def create_group_counter(sender, instance, created, raw=False, **kwargs):
+    """Start every group with a counter row so listing groups never counts tasks"""
+    if created and not raw:
+        TaskCounter.objects.create(group=instance)
+
+
+@receiver(post_delete, sender=Task)
+def record_task_deletion(sender, instance, **kwargs):
+    """Leave a tombstone so /api/tasks/sync/ can report the deletion"""
+    Tombstone.objects.create(model=Tombstone.TASK, object_id=instance.pk, owner_id=instance.owner_id)
+
+
+@receiver(pre_delete, sender=Group)
+def touch_group_tasks(sender, instance, **kwargs):
+    """
+    Deleting a group nulls Task.group with a raw UPDATE that skips auto_now,
+    so bump updated_at here for sync clients to pick up the change.
+    """
+    Task.objects.filter(group=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Group)
+def record_group_deletion(sender, instance, **kwargs):
+    """Leave a tombstone so /api/tasks/sync/ can report the deletion"""
+    Tombstone.objects.create(model=Tombstone.GROUP, object_id=instance.pk, owner_id=instance.owner_id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_responses(sender, instance, **kwargs):
+    invalidate_tasks(instance.owner_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_responses(sender, instance, **kwargs):
+    bump('groups')
+    replicas.pin(instance.owner_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_usernames(sender, instance, update_fields=None, **kwargs):
+    """owner_username is embedded in task and group payloads"""
+    if update_fields is None or 'username' in update_fields:
+        invalidate_tasks(instance.pk)
+        bump('groups')
+
+
+@receiver(post_migrate)
+def create_sqlite_search_index(sender, using, **kwargs):
+    """Set up (or repair) the SQLite FTS5 search table after migrations"""
+    if sender.name == 'tasks' and connections[using].vendor == 'sqlite':
+        ensure_sqlite_fts(connections[using])
@@ -0,0 +1,33 @@
+from django.http import StreamingHttpResponse
+
+from .renderers import NDJSON_CONTENT_TYPE, dumps
+
+
+def iter_ndjson(queryset, serializer, chunk_size=500):
+    """
+    Yield one JSON document per row. Rows are read as ``.values()`` with
+    ``.iterator()`` and serialized ``chunk_size`` at a time by
+    ``serializer.from_values()``, so memory stays bounded by the chunk
+    rather than by the size of the result set.
+    """
+    chunk = []
+    for row in queryset.values(*serializer.value_lookups()).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield _encode_chunk(chunk, serializer)
+            chunk = []
+    if chunk:
+        yield _encode_chunk(chunk, serializer)
+
+
+def _encode_chunk(chunk, serializer):
+    rows = serializer.from_values(chunk, native_datetimes=True)
+    return b''.join(dumps(row) + b'\n' for row in rows)
+
+
+def stream_ndjson(queryset, serializer, chunk_size=500):
+    """Return a streaming NDJSON response for ``queryset``."""
+    return StreamingHttpResponse(
+        iter_ndjson(queryset, serializer, chunk_size),
+        content_type=NDJSON_CONTENT_TYPE,
+    )
@@ -1,3 +1,1699 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import os
+import tempfile
+import uuid
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import StringIO
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.conf import settings
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from GTD import schema
+
+from . import benchmarks, compression, counters, events, jobs, metrics, renderers, transfer
+from .admin import BoundedRelatedFieldListFilter, EstimatedCountPaginator
+
+from .models import Task, ArchivedTask, Group, AuthToken, Job, TaskCounter, Tombstone
+from .serializers import TaskSerializer, GroupSerializer
+
+
+class GTDTestCase(APITestCase):
+
+    def tearDown(self):
+        # Response cache versions outlive the rolled-back test data
+        cache.clear()
+
+
+class QueryCountTests(GTDTestCase):
+    """
+    Guard against N+1 regressions: each list endpoint must issue the same
+    number of queries whether it returns one row or a full page.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+
+    def seed(self, count):
+        for i in range(count):
+            group = Group.objects.create(name=f'Group {i}', owner=self.user)
+            Task.objects.create(
+                title=f'Task {i}', description='...', group=group,
+                owner=self.user, completed=bool(i % 2),
+            )
+        return group
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def assertConstantQueries(self, url_for):
+        group = self.seed(2)
+        small = self.count_queries(url_for(group))
+        group = self.seed(15)
+        large = self.count_queries(url_for(group))
+        self.assertEqual(small, large)
+
+    def test_task_list(self):
+        self.assertConstantQueries(lambda group: '/api/tasks/')
+
+    def test_task_completed(self):
+        self.assertConstantQueries(lambda group: '/api/tasks/completed/')
+
+    def test_task_pending(self):
+        self.assertConstantQueries(lambda group: '/api/tasks/pending/')
+
+    def test_group_list(self):
+        self.assertConstantQueries(lambda group: '/api/groups/')
+
+    def test_group_tasks(self):
+        def url_for(group):
+            Task.objects.filter(owner=self.user).update(group=group)
+            return f'/api/groups/{group.pk}/tasks/'
+        self.assertConstantQueries(url_for)
+
+    def test_group_list_without_counters(self):
+        backfill = import_module('tasks.migrations.0010_backfill_group_counters').backfill_group_counters
+        self.seed(10)
+        expected = self.count_queries('/api/groups/')
+        expected_counts = {group['id']: group['task_count'] for group in self.client.get('/api/groups/').data['results']}
+
+        # Groups from before 0007_task_counter
+        TaskCounter.objects.filter(group__isnull=False).delete()
+        cache.clear()
+        backfill(django_apps, connection.schema_editor())
+        self.assertEqual(self.count_queries('/api/groups/'), expected)
+        self.assertEqual(dict(TaskCounter.objects.filter(group__isnull=False).values_list('group_id', 'total')),
+                         expected_counts)
+
+        # A row missing anyway is built on first use
+        TaskCounter.objects.filter(group__isnull=False).delete()
+        cache.clear()
+        response = self.client.get('/api/groups/')
+        self.assertEqual({group['id']: group['task_count'] for group in response.data['results']}, expected_counts)
+        cache.clear()
+        self.assertEqual(self.count_queries('/api/groups/'), expected)
+
+    def test_group_task_count(self):
+        group = self.seed(3)
+        Task.objects.create(title='Extra', description='...', group=group, owner=self.user)
+        response = self.client.get(f'/api/groups/{group.pk}/')
+        self.assertEqual(response.data['task_count'], 2)
+
+
+class CursorPaginationTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        for i in range(45):
+            Task.objects.create(title=f'Task {i}', description='...', owner=self.user)
+            Group.objects.create(name=f'Group {i % 5}', owner=self.user)
+        # Ties on the leading sort key must be broken by id
+        Task.objects.update(created_at=timezone.now())
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(*)' in q['sql'] for q in ctx.captured_queries))
+            ids.extend(row['id'] for row in response.data['results'])
+            url, pages = response.data['next'], pages + 1
+        return ids, pages, response
+
+    def test_task_cursor_walk(self):
+        ids, pages, _ = self.walk('/api/tasks/?pagination=cursor')
+        expected = list(Task.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_cursor_rejects_ordering(self):
+        for url in ('/api/tasks/?ordering=due_date&pagination=cursor',
+                    '/api/tasks/?ordering=title&cursor=eyJyIjogZmFsc2V9'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ordering', response.data)
+        self.assertEqual(self.client.get('/api/tasks/?ordering=due_date').status_code, 200)
+
+    def test_group_cursor_walk(self):
+        ids, _, _ = self.walk('/api/groups/?pagination=cursor')
+        expected = list(Group.objects.order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_previous_link(self):
+        first = self.client.get('/api/tasks/?pagination=cursor').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+
+    def test_page_number_is_default(self):
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 45)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tasks/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_mistyped_cursor_keys(self):
+        def cursor(position):
+            return base64.urlsafe_b64encode(json.dumps({'r': False, 'p': position}).encode()).decode()
+
+        task_positions = [['notadate', 1], [{'a': 1}, 1], ['2026-01-01T00:00:00Z', 'x'], [None, None], [[1], 1]]
+        group_positions = [[{'a': 1}, 1], ['Group 1', 'x'], [None, None], ['Group 1', [1]]]
+        cases = [('/api/tasks/', task_positions), ('/api/tasks/completed/', task_positions),
+                 ('/api/groups/', group_positions)]
+        for url, positions in cases:
+            for position in positions:
+                with self.subTest(url=url, position=position):
+                    response = self.client.get(f'{url}?cursor={cursor(position)}')
+                    self.assertEqual(response.status_code, 404)
+        response = self.client.get(f"/api/tasks/?cursor={cursor(['2026-01-01T00:00:00Z', '5'])}")
+        self.assertEqual(response.status_code, 200)
+
+
+class TaskListActionTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Inbox', owner=self.user)
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', description='...', owner=self.user,
+                 group=self.group, completed=bool(i % 2))
+            for i in range(50)
+        ])
+
+    def test_actions_are_paginated(self):
+        for url in ['/api/tasks/completed/', '/api/tasks/pending/',
+                    f'/api/groups/{self.group.pk}/tasks/']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), 20)
+            self.assertIsNotNone(response.data['next'])
+
+    def test_stream_ndjson(self):
+        response = self.client.get('/api/tasks/completed/?stream=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertTrue(all(json.loads(line)['completed'] for line in lines))
+
+    def test_stream_group_tasks(self):
+        response = self.client.get(f'/api/groups/{self.group.pk}/tasks/?stream=ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 50)
+
+
+class TokenAuthenticationTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+
+    def issue(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'alice:pass12345').decode())
+        response = self.client.post('/api/users/token/')
+        self.assertEqual(response.status_code, 201)
+        self.client.credentials()
+        return response.data['token']
+
+    def test_token_round_trip(self):
+        key = self.issue()
+        self.assertFalse(AuthToken.objects.filter(digest=key).exists())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        response = self.client.get('/api/users/profile/')
+        self.assertEqual(response.data['username'], 'alice')
+
+        # Served from the in-process cache on repeat use
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/users/profile/')
+        self.assertFalse(any('tasks_authtoken' in q['sql'] for q in ctx.captured_queries))
+
+    def test_revoke(self):
+        key = self.issue()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+        self.assertEqual(self.client.delete('/api/users/token/').status_code, 204)
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+    def test_user_changes_apply_to_cached_tokens(self):
+        key = self.issue()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+        other = User.objects.create_user(username='bob')
+        Task.objects.create(title='Theirs', description='...', owner=other)
+        self.assertEqual(self.client.get('/api/tasks/').data['count'], 0)
+
+        # An update() sends no signals, as from another process
+        User.objects.filter(pk=self.user.pk).update(is_superuser=True)
+        self.assertEqual(self.client.get('/api/tasks/').data['count'], 1)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token not-a-token')
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+
+class BulkTaskTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Inbox', owner=self.user)
+
+    def test_bulk_create(self):
+        items = [{'title': f'Task {i}', 'description': '...', 'group': self.group.pk} for i in range(5)]
+        response = self.client.post('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(Task.objects.filter(owner=self.user, group=self.group).count(), 5)
+
+    def test_bulk_create_without_returning(self):
+        # As on MySQL: tasks are inserted one by one, through save()
+        items = [{'title': f'Task {i}', 'description': '...', 'group': self.group.pk} for i in range(3)]
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            response = self.client.post('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(task['id'] for task in response.data),
+                         list(Task.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(counters.get_counter('group_id', self.group.pk).total, 3)
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+    def test_bulk_create_reports_errors_per_item(self):
+        items = [{'title': 'Ok', 'description': '...'}, {'description': 'no title'}]
+        response = self.client.post('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('title', response.data[1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_update(self):
+        tasks = [Task.objects.create(title=f'Task {i}', description='...', owner=self.user) for i in range(20)]
+        items = [{'id': t.pk, 'completed': True} for t in tasks]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.patch('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(len(ctx), 10)
+        self.assertEqual(Task.objects.filter(completed=True).count(), 20)
+
+    def test_bulk_update_respects_ownership(self):
+        mine = Task.objects.create(title='Mine', description='...', owner=self.user)
+        theirs = Task.objects.create(title='Theirs', description='...', owner=self.other)
+        items = [{'id': mine.pk, 'completed': True}, {'id': theirs.pk, 'completed': True}]
+        response = self.client.patch('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[1], {'id': ['Not found.']})
+        self.assertFalse(Task.objects.filter(completed=True).exists())
+
+    def test_bulk_update_writes_only_submitted_columns(self):
+        first, second = [Task.objects.create(title=f'Task {i}', description='...', owner=self.user) for i in range(2)]
+        is_valid = TaskSerializer.is_valid
+
+        def validate_during_toggle(serializer, *args, **kwargs):
+            # A toggle of the first task's "completed", which the row lock
+            # serializes with the batch on databases that support it
+            Task.objects.filter(pk=first.pk).update(completed=True)
+            return is_valid(serializer, *args, **kwargs)
+
+        items = [{'id': first.pk, 'title': 'Renamed'}, {'id': second.pk, 'completed': True}]
+        with mock.patch.object(TaskSerializer, 'is_valid', validate_during_toggle):
+            response = self.client.patch('/api/tasks/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Task.objects.order_by('pk').values_list('title', 'completed')),
+                         [('Renamed', True), ('Task 1', True)])
+
+    def test_bulk_items_must_be_ids(self):
+        task = Task.objects.create(title='Task', description='...', owner=self.user)
+        for items in ([True], [[task.pk]], [{'id': True}], [{'id': str(task.pk)}], [None]):
+            with self.subTest(items=items):
+                response = self.client.delete('/api/tasks/bulk/', items, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, [{'id': ['A valid integer is required.']}])
+        response = self.client.patch('/api/tasks/bulk/', [{'id': True, 'completed': True}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.objects.filter(completed=True).exists())
+
+        response = self.client.delete('/api/tasks/bulk/', [{'id': task.pk}], format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Task.objects.exists())
+
+    def test_bulk_delete(self):
+        mine = [Task.objects.create(title=f'Task {i}', description='...', owner=self.user) for i in range(3)]
+        theirs = Task.objects.create(title='Theirs', description='...', owner=self.other)
+        response = self.client.delete('/api/tasks/bulk/', [t.pk for t in mine] + [theirs.pk], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Task.objects.count(), 4)
+
+        response = self.client.delete('/api/tasks/bulk/', [t.pk for t in mine], format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(Task.objects.all()), [theirs])
+
+
+class SyncTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Inbox', owner=self.user)
+        self.task = Task.objects.create(title='Old', description='...', owner=self.user, group=self.group)
+        Task.objects.create(title='Not mine', description='...', owner=self.other)
+
+    def sync(self, watermark=None):
+        url = '/api/tasks/sync/' + (f'?since={watermark}' if watermark else '')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_full_snapshot(self):
+        data = self.sync()
+        self.assertEqual([t['id'] for t in data['tasks']], [self.task.pk])
+        self.assertEqual([g['id'] for g in data['groups']], [self.group.pk])
+
+    def test_delta(self):
+        watermark = self.sync()['watermark']
+        past = timezone.now() - timedelta(minutes=5)
+        Task.objects.update(updated_at=past)
+        Group.objects.update(updated_at=past)
+
+        new = Task.objects.create(title='New', description='...', owner=self.user)
+        self.client.delete(f'/api/tasks/{self.task.pk}/')
+        data = self.sync(watermark)
+        self.assertEqual([t['id'] for t in data['tasks']], [new.pk])
+        self.assertEqual(data['groups'], [])
+        self.assertEqual(data['deleted'], {'tasks': [self.task.pk], 'groups': []})
+
+    def test_group_deletion_touches_tasks(self):
+        watermark = self.sync()['watermark']
+        Task.objects.update(updated_at=timezone.now() - timedelta(minutes=5))
+        group_id = self.group.pk
+        self.group.delete()
+        data = self.sync(watermark)
+        self.assertEqual(data['deleted']['groups'], [group_id])
+        self.assertEqual(data['tasks'][0]['group'], None)
+
+    def test_invalid_watermark(self):
+        response = self.client.get('/api/tasks/sync/?since=forged')
+        self.assertEqual(response.status_code, 400)
+
+
+class ResponseCacheTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Inbox', owner=self.user)
+        self.task = Task.objects.create(title='Task', description='...', owner=self.user, group=self.group)
+
+    def count_queries(self, url, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **headers)
+        return response, len(ctx)
+
+    def test_repeat_reads_are_cached(self):
+        for url in ['/api/tasks/', f'/api/tasks/{self.task.pk}/', '/api/groups/',
+                    f'/api/groups/{self.group.pk}/', f'/api/groups/{self.group.pk}/tasks/']:
+            first, _ = self.count_queries(url)
+            second, queries = self.count_queries(url)
+            self.assertEqual(queries, 0, url)
+            self.assertEqual(first.data, second.data)
+            self.assertEqual(first['ETag'], second['ETag'])
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com'])
+    def test_links_follow_the_request_url(self):
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', description='...', owner=self.user) for i in range(20)
+        ])
+        self.assertTrue(self.client.get('/api/tasks/').data['next'].startswith('http://testserver/'))
+        for headers, prefix in [({'HTTP_HOST': 'api.example.com'}, 'http://api.example.com/'),
+                                ({'secure': True}, 'https://testserver/')]:
+            response = self.client.get('/api/tasks/', **headers)
+            self.assertTrue(response.data['next'].startswith(prefix), response.data['next'])
+
+    def test_if_none_match(self):
+        etag = self.client.get('/api/tasks/')['ETag']
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.client.post(f'/api/tasks/{self.task.pk}/toggle_completed/')
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['completed'])
+
+    def test_group_rename_invalidates_tasks(self):
+        self.client.get('/api/tasks/')
+        self.client.patch(f'/api/groups/{self.group.pk}/', {'name': 'Renamed'})
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['results'][0]['group_name'], 'Renamed')
+
+    def test_task_write_updates_group_count(self):
+        self.client.get('/api/groups/')
+        self.client.post('/api/tasks/bulk/', [{'title': 'New', 'description': '...', 'group': self.group.pk}], format='json')
+        response = self.client.get('/api/groups/')
+        self.assertEqual(response.data['results'][0]['task_count'], 2)
+
+    def test_other_users_writes_keep_cache(self):
+        self.client.get('/api/tasks/')
+        Task.objects.create(title='Theirs', description='...', owner=self.other)
+        _, queries = self.count_queries('/api/tasks/')
+        self.assertEqual(queries, 0)
+
+    def test_cache_is_per_user(self):
+        self.client.get('/api/tasks/')
+        self.client.force_authenticate(self.other)
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 0)
+
+
+class AsyncEndpointTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.group = Group.objects.create(name='Inbox', owner=self.user)
+        self.task = Task.objects.create(title='Task', description='...', owner=self.user, group=self.group)
+        Task.objects.create(title='Theirs', description='...', owner=self.other)
+        self.token = AuthToken.issue(self.user)[1]
+
+    async def test_payloads_match_sync_endpoints(self):
+        headers = {'Authorization': f'Token {self.token}'}
+        for url in ['tasks/', f'tasks/{self.task.pk}/', 'groups/', f'groups/{self.group.pk}/']:
+            sync = await self.async_client.get(f'/api/{url}', headers=headers)
+            native = await self.async_client.get(f'/api/async/{url}', headers=headers)
+            self.assertEqual(native.status_code, 200, url)
+            self.assertEqual(native.json(), sync.json(), url)
+
+    async def test_create_and_toggle(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            '/api/async/tasks/', {'title': 'New', 'description': '...', 'group': self.group.pk},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['group_name'], 'Inbox')
+
+        response = await self.async_client.post(f'/api/async/tasks/{response.json()["id"]}/toggle_completed/')
+        self.assertTrue(response.json()['completed'])
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/async/tasks/').status_code, 401)
+
+    def test_other_users_tasks_are_hidden(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        theirs = Task.objects.get(owner=self.other)
+        self.assertEqual(self.client.get(f'/api/async/tasks/{theirs.pk}/').status_code, 404)
+
+    def test_basic_auth_and_validation(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'alice:pass12345').decode())
+        response = self.client.post('/api/async/tasks/', {'description': 'no title'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('title', response.json())
+
+
+class TaskFilterTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Work', owner=self.user)
+        now = timezone.now()
+        self.report = Task.objects.create(
+            title='Quarterly report', description='Draft the finance numbers',
+            owner=self.user, group=self.group, due_date=now + timedelta(days=2),
+        )
+        self.groceries = Task.objects.create(
+            title='Groceries', description='Milk and reporting paper', completed=True,
+            owner=self.user, due_date=now + timedelta(days=10),
+        )
+        self.call = Task.objects.create(title='Call mom', description='Sunday', owner=self.user)
+
+    def ids(self, query):
+        response = self.client.get(f'/api/tasks/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_due_range(self):
+        day = (timezone.now() + timedelta(days=5)).date().isoformat()
+        self.assertEqual(self.ids(f'due_before={day}'), [self.report.pk])
+        self.assertEqual(self.ids(f'due_after={day}'), [self.groceries.pk])
+
+    def test_group_and_completed(self):
+        self.assertEqual(self.ids(f'group={self.group.pk}'), [self.report.pk])
+        self.assertEqual(set(self.ids('group=none')), {self.groceries.pk, self.call.pk})
+        self.assertEqual(set(self.ids('completed=false')), {self.report.pk, self.call.pk})
+
+    def test_ordering(self):
+        self.assertEqual(self.ids('ordering=title'), [self.call.pk, self.groceries.pk, self.report.pk])
+
+    def test_search(self):
+        self.assertEqual(set(self.ids('search=report')), {self.report.pk, self.groceries.pk})
+        self.assertEqual(self.ids('search=finance+quarter'), [self.report.pk])
+        self.assertEqual(self.ids('search=nothing'), [])
+
+    def test_search_follows_edits(self):
+        self.client.patch(f'/api/tasks/{self.call.pk}/', {'title': 'Call the finance team'})
+        self.assertEqual(set(self.ids('search=finance')), {self.report.pk, self.call.pk})
+        self.client.delete(f'/api/tasks/{self.report.pk}/')
+        self.assertEqual(self.ids('search=finance'), [self.call.pk])
+
+    def test_filters_apply_to_actions(self):
+        response = self.client.get(f'/api/tasks/pending/?group={self.group.pk}')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.report.pk])
+
+    def test_invalid_values(self):
+        response = self.client.get('/api/tasks/?due_after=soon&completed=maybe')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'due_after', 'completed'})
+
+
+class TaskCounterTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.work = Group.objects.create(name='Work', owner=self.user)
+        self.home = Group.objects.create(name='Home', owner=self.user)
+
+    def stats(self, query=''):
+        response = self.client.get(f'/api/tasks/stats/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def assertCountersExact(self):
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+    def test_write_paths(self):
+        past, future = timezone.now() - timedelta(days=1), timezone.now() + timedelta(days=1)
+        late = self.client.post('/api/tasks/', {'title': 'Late', 'description': '...',
+                                                'due_date': past.isoformat(), 'group': self.work.pk}).data
+        self.client.post('/api/tasks/', {'title': 'Soon', 'description': '...',
+                                         'due_date': future.isoformat(), 'group': self.work.pk})
+        self.client.post('/api/tasks/bulk/', [{'title': 'Bulk', 'description': '...'}] * 3, format='json')
+        Task.objects.create(title='Theirs', description='...', owner=self.other, group=self.work)
+        self.assertEqual(self.stats(), {'total': 5, 'completed': 0, 'pending': 5, 'overdue': 1})
+        self.assertEqual(self.stats(f'?group={self.work.pk}')['total'], 3)
+
+        self.client.post(f'/api/tasks/{late["id"]}/toggle_completed/')
+        self.client.patch(f'/api/tasks/{late["id"]}/', {'group': self.home.pk})
+        self.assertEqual(self.stats(), {'total': 5, 'completed': 1, 'pending': 4, 'overdue': 0})
+        self.assertEqual(self.stats(f'?group={self.home.pk}')['completed'], 1)
+        self.assertEqual(self.client.get(f'/api/groups/{self.work.pk}/').data['task_count'], 2)
+
+        self.client.delete(f'/api/tasks/{late["id"]}/')
+        self.assertEqual(self.stats()['total'], 4)
+        self.assertCountersExact()
+
+    def test_overdue_follows_the_clock(self):
+        task = Task.objects.create(title='Soon', description='...', owner=self.user,
+                                   due_date=timezone.now() + timedelta(hours=1))
+        self.assertEqual(self.stats()['overdue'], 0)
+        # Let the due date pass without touching the task through save()
+        Task.objects.filter(pk=task.pk).update(due_date=timezone.now() - timedelta(seconds=1))
+        TaskCounter.objects.filter(user=self.user).update(next_due_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.stats()['overdue'], 1)
+
+    def test_check_is_read_only(self):
+        Task.objects.create(title='Soon', description='...', owner=self.user,
+                            due_date=timezone.now() + timedelta(hours=1))
+        # The task has become due since the counter was last recounted
+        TaskCounter.objects.filter(user=self.user).update(overdue_as_of=timezone.now() - timedelta(hours=2),
+                                                          next_due_at=timezone.now() - timedelta(hours=1))
+        Task.objects.update(due_date=timezone.now() - timedelta(hours=1))
+        before = list(TaskCounter.objects.values())
+        with self.assertNumQueries(1 + 2 * len(before)):
+            self.assertCountersExact()
+        self.assertEqual(list(TaskCounter.objects.values()), before)
+        self.assertEqual(self.stats()['overdue'], 1)
+
+    def test_rebuild_repairs_drift(self):
+        Task.objects.create(title='Task', description='...', owner=self.user, group=self.work)
+        TaskCounter.objects.filter(user=self.user).update(total=42)
+        with self.assertRaises(CommandError):
+            self.assertCountersExact()
+        call_command('rebuild_task_counters', stdout=StringIO())
+        self.assertCountersExact()
+        self.assertEqual(self.stats()['total'], 1)
+
+
+class SchemaTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema.reset()
+        self.addCleanup(schema.reset)
+
+    def test_generated_once_and_revalidated(self):
+        with mock.patch.object(schema, 'generate_schema', wraps=schema.generate_schema) as generate:
+            first = self.client.get('/api/schema/?format=openapi')
+            again = self.client.get('/api/docs/?format=openapi')
+            self.client.get('/api/schema/?format=yaml')
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('/tasks/stats/', json.loads(first.content)['paths'])
+        self.assertEqual(again['ETag'], first['ETag'])
+        self.assertTrue(schema.artifact_path().exists())
+
+        response = self.client.get('/api/schema/?format=openapi', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_artifact_survives_restarts(self):
+        call_command('generate_schema', stdout=StringIO())
+        schema.reset()
+        with mock.patch.object(schema, 'generate_schema') as generate:
+            response = self.client.get('/api/schema/?format=openapi')
+        generate.assert_not_called()
+        self.assertEqual(response.content, schema.artifact_path().read_bytes())
+
+    def test_version_follows_serializers(self):
+        version = schema.compute_version()
+        self.assertEqual(schema.compute_version(), version)
+        meta = TaskSerializer.Meta
+        with mock.patch.object(meta, 'extra_kwargs', {'description': {'required': False}}, create=True):
+            self.assertNotEqual(schema.compute_version(), version)
+
+    def test_stale_artifacts_removed(self):
+        stale = self.dir / 'openapi-0000000000000000.json'
+        stale.write_text('{}')
+        call_command('generate_schema', stdout=StringIO())
+        self.assertEqual(list(self.dir.glob('openapi-*.json')), [schema.artifact_path()])
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/schema/?format=openapi').status_code, 401)
+
+
+class FieldSelectionTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Work', owner=self.user)
+        self.tasks = [
+            Task.objects.create(title='Grouped', description='...', owner=self.user,
+                                group=self.group, due_date=timezone.now()),
+            Task.objects.create(title='Loose', description='...', owner=self.user, completed=True),
+        ]
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, ' '.join(query['sql'] for query in ctx.captured_queries)
+
+    def test_values_rows_match_serializer(self):
+        tasks = Task.objects.filter(owner=self.user)
+        serializer = TaskSerializer()
+        self.assertEqual(
+            serializer.from_values(tasks.values(*serializer.value_lookups())),
+            TaskSerializer(tasks, many=True).data,
+        )
+        # The list endpoint returns exactly what the instance serializer would
+        # (its data holds datetimes, which the renderer encodes natively)
+        response, _ = self.get('/api/tasks/')
+        self.assertEqual(json.loads(response.content)['results'], TaskSerializer(tasks, many=True).data)
+        response, _ = self.get('/api/groups/')
+        self.assertEqual(json.loads(response.content)['results'], GroupSerializer(Group.objects.all(), many=True).data)
+
+    def test_sparse_list(self):
+        response, sql = self.get('/api/tasks/?fields=id,title,completed,due_date')
+        self.assertEqual(
+            [set(row) for row in response.data['results']],
+            [{'id', 'title', 'completed', 'due_date'}] * 2,
+        )
+        self.assertNotIn('description', sql)
+        self.assertNotIn('auth_user', sql.split('FROM "tasks_task"')[-1])
+
+        response, _ = self.get('/api/tasks/?fields=title&pagination=cursor')
+        self.assertEqual(response.data['results'], [{'title': 'Loose'}, {'title': 'Grouped'}])
+
+        response = self.client.get('/api/tasks/?fields=title&stream=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(rows, [{'title': 'Loose'}, {'title': 'Grouped'}])
+
+        response, _ = self.get('/api/groups/?fields=name,task_count')
+        self.assertEqual(response.data['results'], [{'name': 'Work', 'task_count': 1}])
+        response, _ = self.get('/api/users/?fields=username')
+        self.assertEqual(response.data['results'], [{'username': 'alice'}])
+
+    def test_sparse_retrieve(self):
+        task = self.tasks[0]
+        response, sql = self.get(f'/api/tasks/{task.pk}/?fields=title,group_name')
+        self.assertEqual(response.data, {'title': 'Grouped', 'group_name': 'Work'})
+        self.assertNotIn('description', sql)
+
+    def test_unknown_or_write_only_fields(self):
+        self.assertEqual(self.client.get('/api/tasks/?fields=title,nope').status_code, 400)
+        self.assertEqual(self.client.get('/api/users/?fields=password').status_code, 400)
+        # Writes always return the full representation
+        response = self.client.post(f'/api/tasks/{self.tasks[0].pk}/toggle_completed/?fields=title')
+        self.assertIn('completed', response.data)
+
+
+class AtomicWriteTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.task = Task.objects.create(title='Task', description='...', owner=self.user)
+
+    def test_toggle_is_one_update(self):
+        url = f'/api/tasks/{self.task.pk}/toggle_completed/'
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url)
+        self.assertTrue(response.data['completed'])
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('NOT', updates[0])
+        self.assertIn('"owner_id" =', updates[0])
+        self.assertFalse(any('FOR UPDATE' in q['sql'] and 'tasks_task' in q['sql'] for q in ctx.captured_queries))
+
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.completed)
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['completed'], 1)
+
+    def test_owner_check_in_queryset(self):
+        theirs = Task.objects.create(title='Theirs', description='...', owner=self.other)
+        for response in [
+            self.client.post(f'/api/tasks/{theirs.pk}/toggle_completed/'),
+            self.client.patch(f'/api/tasks/{theirs.pk}/', {'title': 'Mine now'}),
+            self.client.delete(f'/api/tasks/{theirs.pk}/'),
+            self.client.post('/api/tasks/nope/toggle_completed/'),
+        ]:
+            self.assertEqual(response.status_code, 404)
+        theirs.refresh_from_db()
+        self.assertEqual((theirs.title, theirs.completed), ('Theirs', False))
+
+        group = Group.objects.create(name='Theirs', owner=self.other)
+        self.assertEqual(self.client.patch(f'/api/groups/{group.pk}/', {'name': 'x'}).status_code, 403)
+        self.assertEqual(self.client.delete(f'/api/groups/{group.pk}/').status_code, 403)
+        self.assertTrue(Group.objects.filter(pk=group.pk, name='Theirs').exists())
+
+    def test_patch_writes_only_submitted_columns(self):
+        stale = Task.objects.get(pk=self.task.pk)
+        Task.objects.filter(pk=self.task.pk).toggle_completed(self.task.pk)
+        serializer = TaskSerializer(stale, data={'title': 'Renamed'}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        with CaptureQueriesContext(connection) as ctx:
+            serializer.save()
+        update, = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "tasks_task"')]
+        self.assertNotIn('"completed"', update)
+
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.completed), ('Renamed', True))
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+
+class ConcurrencyTests(APITransactionTestCase):
+    """Concurrent writers against a real (committed) database."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.task = Task.objects.create(title='Task', description='...', owner=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def hammer(self, threads, per_thread, request):
+        def worker(_):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                return [request(client, i).status_code for i in range(per_thread)]
+            finally:
+                connections.close_all()
+        with ThreadPoolExecutor(threads) as pool:
+            return [code for codes in pool.map(worker, range(threads)) for code in codes]
+
+    def test_concurrent_toggles(self):
+        url = f'/api/tasks/{self.task.pk}/toggle_completed/'
+        codes = self.hammer(8, 25, lambda client, i: client.post(url))
+        self.assertEqual(codes, [200] * 200)
+        self.task.refresh_from_db()
+        self.assertFalse(self.task.completed)
+
+        codes = self.hammer(7, 1, lambda client, i: client.post(url))
+        self.assertEqual(codes, [200] * 7)
+        self.task.refresh_from_db()
+        self.assertTrue(self.task.completed)
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+    def test_toggles_and_edits_do_not_clobber(self):
+        url = f'/api/tasks/{self.task.pk}/'
+
+        def request(client, i):
+            if i % 2:
+                return client.patch(url, {'description': f'edit {i}'})
+            return client.post(f'{url}toggle_completed/')
+        codes = self.hammer(6, 20, request)
+        self.assertEqual(codes, [200] * 120)
+        self.task.refresh_from_db()
+        # 60 toggles in total, whatever the interleaving with the edits
+        self.assertFalse(self.task.completed)
+        self.assertTrue(self.task.description.startswith('edit'))
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+
+class InstrumentationTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Work', owner=self.user)
+        Task.objects.create(title='Task', description='...', owner=self.user, group=self.group)
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+        self.middleware = ['tasks.metrics.InstrumentationMiddleware', *settings.MIDDLEWARE]
+        self.enable(sample_rate=1.0)
+
+    def enable(self, sample_rate):
+        override = override_settings(
+            INSTRUMENTATION=True,
+            INSTRUMENTATION_SAMPLE_RATE=sample_rate,
+            MIDDLEWARE=self.middleware,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def stats(self, route, method='GET', status='200'):
+        return metrics.registry._stats[(route, method, status)]
+
+    def test_sampled_request(self):
+        response = self.client.get('/api/tasks/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=[\d.]+$')
+        stats = self.stats('task-list')
+        self.assertEqual((stats.requests, stats.sampled), (1, 1))
+        self.assertGreater(stats.queries, 0)
+        self.assertGreater(stats.serialize_seconds, 0)
+        self.assertEqual(stats.response_bytes, len(response.content))
+
+        self.client.get(f'/api/groups/{self.group.pk}/tasks/')
+        self.client.get('/api/tasks/999999/')
+        self.client.get('/api/nothing-here/')
+        self.assertEqual(self.stats('group-tasks').requests, 1)
+        self.assertEqual(self.stats('task-detail', status='404').requests, 1)
+        self.assertEqual(self.stats('unmatched', status='404').requests, 1)
+
+    def test_unsampled_request(self):
+        self.enable(sample_rate=0.0)
+        response = self.client.get('/api/tasks/')
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+$')
+        stats = self.stats('task-list')
+        self.assertEqual((stats.requests, stats.sampled, stats.queries), (1, 0, 0))
+
+    async def test_async_view(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/api/async/tasks/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertEqual(self.stats('async-task-list').requests, 1)
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/tasks/')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('# TYPE gtd_http_request_duration_seconds histogram', body)
+        self.assertIn('gtd_http_requests_total{route="task-list",method="GET",status="200"} 1', body)
+        self.assertIn('gtd_http_request_duration_seconds_bucket{route="task-list",method="GET",status="200",le="+Inf"} 1', body)
+        self.assertRegex(body, r'gtd_db_queries_total\{route="task-list",method="GET",status="200"\} [1-9]')
+
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            for wrong in ('Bearer secre', 'Bearer sécret'):
+                self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION=wrong).status_code, 401)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        with override_settings(INSTRUMENTATION=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+class TransferTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Work, "main"', owner=self.user)
+        Task.objects.create(title='Write', description='two\nlines', owner=self.user, group=self.group,
+                            due_date=timezone.now() - timedelta(days=1))
+        Task.objects.create(title='Done', description='...', owner=self.user, completed=True)
+        Task.objects.create(title='Theirs', description='...', owner=self.other)
+
+    def export(self, fmt):
+        response = self.client.get(f'/api/users/export/?format={fmt}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_round_trip(self):
+        for fmt, content_type in transfer.FORMATS.items():
+            with self.subTest(fmt=fmt):
+                body = self.export(fmt)
+                target = User.objects.create_user(username=f'carol-{fmt}')
+                self.client.force_authenticate(target)
+                response = self.client.post('/api/users/import/', data=body, content_type=content_type)
+                self.client.force_authenticate(self.user)
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.data, {'groups': 1, 'tasks': 2})
+
+                tasks = Task.objects.filter(owner=target).order_by('title')
+                self.assertEqual(
+                    list(tasks.values_list('title', 'description', 'completed', 'group__name', 'group__owner')),
+                    [('Done', '...', True, None, None), ('Write', 'two\nlines', False, 'Work, "main"', target.pk)],
+                )
+                self.assertNotEqual(tasks[1].group_id, self.group.pk)
+                stats = counters.get_counter('user_id', target.pk)
+                self.assertEqual((stats.total, stats.completed, stats.overdue), (2, 1, 1))
+                self.assertEqual(counters.get_counter('group_id', tasks[1].group_id).total, 1)
+
+    def test_import_without_returning(self):
+        # As on MySQL: groups are inserted one by one, through save()
+        features = type(connection.features)
+        body = self.export('ndjson')
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', False):
+            response = self.client.post('/api/users/import/', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'groups': 1, 'tasks': 2})
+        group = Group.objects.exclude(pk=self.group.pk).get(owner=self.user)
+        self.assertEqual(TaskCounter.objects.filter(group=group).count(), 1)
+        self.assertEqual(counters.get_counter('group_id', group.pk).total, 1)
+
+    def test_export_is_chunked(self):
+        lines = ''.join(transfer.iter_export(self.user, chunk_size=1)).splitlines()
+        self.assertEqual([json.loads(line)['type'] for line in lines], ['group', 'task', 'task'])
+        with CaptureQueriesContext(connection) as ctx:
+            list(transfer.iter_records(self.user, chunk_size=1))
+        # One query per chunk, plus the empty one ending each keyset scan
+        # (groups, tasks and archived tasks)
+        self.assertEqual(len(ctx.captured_queries), 6)
+
+    def test_invalid_import_is_rolled_back(self):
+        body = (
+            '{"type": "group", "id": 1, "name": "New"}\n'
+            '{"type": "task", "title": "Ok", "description": "...", "group": 1}\n'
+            '{"type": "task", "title": "Bad", "description": "...", "group": 2}\n'
+        )
+        response = self.client.post('/api/users/import/', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['line'], '3')
+        self.assertFalse(Group.objects.filter(name='New').exists())
+        self.assertEqual(Task.objects.filter(owner=self.user).count(), 2)
+
+        response = self.client.post('/api/users/import/', data={'title': 'x'}, format='json')
+        self.assertEqual(response.status_code, 415)
+
+    def test_commands(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'alice.csv')
+            call_command('export_data', 'alice', '--format', 'csv', '--output', path, stdout=StringIO())
+            out = StringIO()
+            call_command('import_data', 'bob', path, stdout=out)
+        self.assertIn('Imported 1 groups and 2 tasks', out.getvalue())
+        self.assertEqual(Task.objects.filter(owner=self.other).count(), 3)
+        with self.assertRaises(CommandError):
+            call_command('import_data', 'nobody', path)
+
+
+class LoadBenchmarkTests(GTDTestCase):
+
+    def test_every_route_is_driven(self):
+        results = benchmarks.load(tasks=20, repeat=1)
+        self.assertNotIn('uncovered routes', results)
+        statuses = {label: metrics['status'] for label, metrics in results.items() if 'status' in metrics}
+        self.assertEqual({label: code for label, code in statuses.items() if code >= 400}, {})
+        self.assertTrue(all('queries' in results[label] and 'peak_kb' in results[label] for label in statuses))
+
+    def test_compare_with_baseline(self):
+        baseline = {
+            'GET a': {'p50_ms': 10.0, 'p99_ms': 20.0, 'queries': 2, 'peak_kb': 100},
+            'GET b': {'p50_ms': 10.0, 'queries': 2},
+            'GET c': {'p50_ms': 10.0, 'queries': 2},
+        }
+        # Uniformly 2x slower (another machine) with noisy tails: no regression
+        slower = {label: {**metrics, 'p50_ms': 20.0, 'p99_ms': 90.0} for label, metrics in baseline.items()}
+        self.assertEqual(benchmarks.compare(slower, baseline), [])
+
+        slower['GET a'].update(p50_ms=40.0, queries=3, peak_kb=200)
+        self.assertEqual(len(benchmarks.compare(slower, baseline)), 3)
+
+
+class JobQueueTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Big', owner=self.user)
+        self.other_group = Group.objects.create(name='Other', owner=self.user)
+        for i in range(5):
+            Task.objects.create(title=f'Task {i}', description='...', owner=self.user, group=self.group,
+                                completed=i % 2 == 0)
+
+    def work(self):
+        out = StringIO()
+        call_command('run_worker', '--once', stdout=out)
+        return out.getvalue()
+
+    def test_enqueue_claim_and_run(self):
+        job = jobs.enqueue('rebuild_counters', owner=self.user)
+        self.assertEqual(job.status, Job.QUEUED)
+        claimed = jobs.claim()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (job.pk, Job.RUNNING, 1))
+        # Claimed jobs are not handed to a second worker
+        self.assertIsNone(jobs.claim())
+        jobs.run(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result, {'rebuilt': TaskCounter.objects.count()})
+        with self.assertRaises(ValueError):
+            jobs.enqueue('no-such-job')
+
+    def test_failures_are_retried_then_failed(self):
+        job = jobs.enqueue('export_data', max_attempts=2, user_id=0)
+        jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('DoesNotExist', job.error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(jobs.claim())
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        jobs.run(jobs.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_stale_jobs_are_recovered(self):
+        retry = jobs.enqueue('rebuild_counters')
+        give_up = jobs.enqueue('rebuild_counters', max_attempts=1)
+        jobs.claim(), jobs.claim()
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.requeue_stale(timedelta(hours=1)), 2)
+        retry.refresh_from_db()
+        give_up.refresh_from_db()
+        self.assertEqual((retry.status, give_up.status), (Job.QUEUED, Job.FAILED))
+
+    def test_large_group_delete_is_deferred(self):
+        with mock.patch('tasks.views.GroupViewSet.inline_delete_limit', 3):
+            response = self.client.delete(f'/api/groups/{self.group.pk}/')
+            self.assertEqual(response.status_code, 202)
+            self.assertTrue(Group.objects.filter(pk=self.group.pk).exists())
+            self.assertEqual(self.client.get(response['Location']).data['status'], Job.QUEUED)
+
+            self.assertIn('reassign_group_tasks', self.work())
+            self.assertFalse(Group.objects.filter(pk=self.group.pk).exists())
+            self.assertEqual(Task.objects.filter(owner=self.user, group=None).count(), 5)
+            self.assertEqual(self.client.get(response['Location']).data['result'], {'moved': 5})
+            # Small groups are still deleted in the request
+            response = self.client.delete(f'/api/groups/{self.other_group.pk}/')
+            self.assertEqual(response.status_code, 204)
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+    def test_reassign(self):
+        response = self.client.post(f'/api/groups/{self.group.pk}/reassign/',
+                                    {'group': self.other_group.pk}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.work()
+        self.assertEqual(Task.objects.filter(group=self.other_group).count(), 5)
+        self.assertEqual(self.client.get('/api/tasks/stats/', {'group': self.other_group.pk}).data['completed'], 3)
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+
+        theirs = Group.objects.create(name='Theirs', owner=User.objects.create_user(username='bob'))
+        for target in (theirs.pk, self.other_group.pk):
+            response = self.client.post(f'/api/groups/{self.other_group.pk}/reassign/', {'group': target},
+                                        format='json')
+            self.assertIn(response.status_code, (400, 403))
+
+        self.client.force_authenticate(theirs.owner)
+        self.assertEqual(self.client.get('/api/jobs/').data['count'], 0)
+
+    def test_background_commands(self):
+        out = StringIO()
+        call_command('rebuild_task_counters', '--background', stdout=out)
+        with tempfile.TemporaryDirectory() as tmp, override_settings(EXPORT_DIR=tmp):
+            call_command('export_data', 'alice', '--background', '--format', 'csv', stdout=out)
+            self.assertEqual(self.work().count('done'), 2)
+            path = Job.objects.get(name='export_data').result['path']
+            self.assertEqual(Path(path).read_text().count('\ntask,'), 5)
+
+    def test_registration_writes_the_user_once(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post('/api/users/', {'username': 'carol', 'password': 'pass12345'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(User.objects.get(username='carol').check_password('pass12345'))
+
+
+class OwnershipTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Mine', owner=self.user)
+        self.theirs = Group.objects.create(name='Theirs', owner=self.other)
+
+    def capture(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, format='json')
+        return response, [q['sql'] for q in ctx.captured_queries]
+
+    def test_owner_check_issues_no_query(self):
+        for method, data in [('patch', {'name': 'x'}), ('delete', None)]:
+            response, queries = self.capture(method, f'/api/groups/{self.theirs.pk}/', data)
+            self.assertEqual(response.status_code, 403)
+            # Only the group fetch, with its owner joined for the response
+            self.assertEqual(len(queries), 1)
+
+        response, queries = self.capture('patch', f'/api/groups/{self.group.pk}/', {'name': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([sql for sql in queries if sql.startswith('SELECT') and 'FROM "auth_user"' in sql])
+
+        task = Task.objects.create(title='Task', description='...', owner=self.user)
+        response, queries = self.capture('patch', f'/api/tasks/{task.pk}/', {'title': 'Renamed'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([sql for sql in queries if sql.startswith('SELECT') and 'FROM "auth_user"' in sql])
+        self.assertIn('"owner_id" =', queries[0])
+
+    def test_users_can_only_change_themselves(self):
+        url = f'/api/users/{self.other.pk}/'
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.patch(url, {'first_name': 'Mallory'}).status_code, 403)
+        self.assertEqual(self.client.delete(url).status_code, 403)
+        self.assertTrue(User.objects.filter(pk=self.other.pk, first_name='').exists())
+        self.assertEqual(self.client.patch(f'/api/users/{self.user.pk}/', {'first_name': 'Alice'}).status_code, 200)
+
+        self.client.force_authenticate(User.objects.create_superuser(username='root', password='pass12345'))
+        self.assertEqual(self.client.patch(url, {'first_name': 'Robert'}).status_code, 200)
+        self.assertEqual(self.client.patch(f'/api/groups/{self.theirs.pk}/', {'name': 'x'}).status_code, 200)
+
+    def test_admin_shows_only_own_rows(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.user.user_permissions.set(Permission.objects.filter(codename__in=['view_group', 'change_group']))
+        self.client.force_login(self.user)
+        response = self.client.get('/admin/tasks/group/')
+        self.assertEqual([group.name for group in response.context['cl'].result_list], ['Mine'])
+        self.assertEqual(self.client.get(f'/admin/tasks/group/{self.group.pk}/change/').status_code, 200)
+        self.assertEqual(self.client.get(f'/admin/tasks/group/{self.theirs.pk}/change/').status_code, 302)
+
+
+class AdminScaleTests(GTDTestCase):
+    """Admin pages must cost the same number of queries on small and large tables."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='root', password='pass12345')
+        self.client.force_login(self.admin)
+
+    def seed(self, users):
+        start = User.objects.count()
+        owners = User.objects.bulk_create([User(username=f'user-{start + i}') for i in range(users)])
+        groups = Group.objects.bulk_create([Group(name=f'Group {owner.username}', owner=owner) for owner in owners])
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', description='...', owner=group.owner, group=group, completed=bool(i % 2))
+            for group in groups for i in range(5)
+        ])
+        jobs.enqueue('rebuild_counters', owner=owners[0])
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx), response
+
+    def test_constant_queries(self):
+        task = Task.objects.create(title='Task', description='...', owner=self.admin)
+        urls = [
+            '/admin/tasks/task/', '/admin/tasks/task/?completed__exact=1', '/admin/tasks/group/',
+            '/admin/tasks/job/', f'/admin/tasks/task/{task.pk}/change/',
+        ]
+        self.seed(3)
+        # Warm the content type and permission caches
+        for url in urls:
+            self.count_queries(url)
+        small = [self.count_queries(url)[0] for url in urls]
+        self.seed(100)
+        large = [self.count_queries(url)[0] for url in urls]
+        self.assertEqual(small, large)
+
+        _, response = self.count_queries('/admin/tasks/task/')
+        limit = BoundedRelatedFieldListFilter.limit
+        for spec in response.context['cl'].filter_specs:
+            if isinstance(spec, BoundedRelatedFieldListFilter):
+                self.assertEqual(len(spec.lookup_choices), limit)
+        _, response = self.count_queries(f'/admin/tasks/task/{task.pk}/change/')
+        self.assertLess(response.content.decode().count('<option'), 10)
+
+    def test_selected_filter_choice_is_listed(self):
+        self.seed(30)
+        owner = User.objects.order_by('-username').first()
+        _, response = self.count_queries(f'/admin/tasks/task/?owner__id__exact={owner.pk}')
+        spec, = [s for s in response.context['cl'].filter_specs if s.field_path == 'owner']
+        self.assertIn(owner.pk, [pk for pk, _ in spec.lookup_choices])
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_estimated_count(self):
+        self.seed(3)
+        with mock.patch.object(EstimatedCountPaginator, 'estimate', return_value=250000):
+            _, response = self.count_queries('/admin/tasks/task/')
+            self.assertEqual(response.context['cl'].result_count, 250000)
+            _, response = self.count_queries('/admin/tasks/task/?completed__exact=1')
+            self.assertEqual(response.context['cl'].result_count, 6)
+        with mock.patch.object(EstimatedCountPaginator, 'estimate', return_value=40):
+            _, response = self.count_queries('/admin/tasks/task/')
+            self.assertEqual(response.context['cl'].result_count, 15)
+
+
+class EventStreamTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.token = AuthToken.issue(self.user)[1]
+
+    def published(self, write):
+        """Run ``write`` and return the events it published, as (event, data) pairs."""
+        broker = mock.Mock()
+        with mock.patch.object(events, 'get_broker', return_value=broker), \
+                self.captureOnCommitCallbacks(execute=True):
+            write()
+        found = []
+        for (channels, message), _ in broker.publish.call_args_list:
+            fields = dict(line.split(': ', 1) for line in message.decode().strip().split('\n'))
+            found.append((fields['event'], json.loads(fields['data']), channels))
+        return found
+
+    def test_writes_publish_events(self):
+        self.client.force_authenticate(self.user)
+        response = None
+
+        def create():
+            nonlocal response
+            response = self.client.post('/api/tasks/', {'title': 'New', 'description': '...'}, format='json')
+
+        (event, data, channels), = self.published(create)
+        pk = response.data['id']
+        self.assertEqual(event, 'task.created')
+        self.assertEqual(data, {'id': pk, 'data': json.loads(json.dumps(response.data))})
+        self.assertEqual(set(channels), {f'user:{self.user.pk}', 'tasks'})
+
+        writes = [
+            (lambda: self.client.patch(f'/api/tasks/{pk}/', {'title': 'Renamed'}), ['task.updated']),
+            (lambda: self.client.post(f'/api/tasks/{pk}/toggle_completed/'), ['task.updated']),
+            (lambda: self.client.post('/api/tasks/bulk/', [{'title': 'a', 'description': '.'}] * 2, format='json'),
+             ['task.created'] * 2),
+            (lambda: self.client.delete(f'/api/tasks/{pk}/'), ['task.deleted']),
+            (lambda: self.client.post('/api/groups/', {'name': 'Inbox'}), ['group.created']),
+        ]
+        for write, expected in writes:
+            self.assertEqual([event for event, _, _ in self.published(write)], expected)
+
+        group = Group.objects.get(name='Inbox')
+        (event, data, channels), = self.published(lambda: self.client.delete(f'/api/groups/{group.pk}/'))
+        self.assertEqual((event, data, channels), ('group.deleted', {'id': group.pk}, ('groups',)))
+        # Rejected writes publish nothing
+        theirs = Group.objects.create(name='Theirs', owner=self.other)
+        self.assertEqual(self.published(lambda: self.client.delete(f'/api/groups/{theirs.pk}/')), [])
+
+    def test_group_jobs_publish_events(self):
+        work = Group.objects.create(name='Work', owner=self.user)
+        home = Group.objects.create(name='Home', owner=self.user)
+        tasks = [
+            Task.objects.create(title=f'Task {i}', description='...', owner=self.user, group=work)
+            for i in range(3)
+        ]
+
+        found = self.published(lambda: jobs.reassign_group_tasks(work.pk, to_group_id=home.pk, batch_size=2))
+        self.assertEqual([event for event, _, _ in found], ['task.updated'] * 3)
+        self.assertEqual([data['id'] for _, data, _ in found], [task.pk for task in tasks])
+        self.assertTrue(all(data['data']['group'] == home.pk and data['data']['group_name'] == 'Home'
+                            for _, data, _ in found))
+
+        found = self.published(lambda: jobs.reassign_group_tasks(home.pk, delete=True))
+        self.assertEqual([event for event, _, _ in found], ['task.updated'] * 3 + ['group.deleted'])
+        self.assertIsNone(found[0][1]['data']['group'])
+        self.assertEqual(found[-1][:2], ('group.deleted', {'id': home.pk}))
+
+    async def test_stream(self):
+        headers = {'Authorization': f'Token {self.token}'}
+        response = await self.async_client.get('/api/async/events/', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        ready = await anext(stream)
+        self.assertIn(b'event: ready', ready)
+        watermark = ready.decode().split('\n')[0].removeprefix('id: ')
+
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.create(title='Theirs', description='...', owner=self.other)
+                self.client.force_authenticate(self.user)
+                return self.client.post('/api/tasks/', {'title': 'Mine', 'description': '...'}).data
+
+        task = await sync_to_async(write)()
+        message = (await asyncio.wait_for(anext(stream), 5)).decode()
+        self.assertIn('event: task.created', message)
+        self.assertEqual(json.loads(message.split('data: ')[1])['id'], task['id'])
+
+        # Every event id is a sync watermark
+        event_id = message.split('\n')[0].removeprefix('id: ')
+        for since in (watermark, event_id):
+            response = await self.async_client.get('/api/tasks/sync/', {'since': since}, headers=headers)
+            self.assertEqual(response.status_code, 200)
+
+        # A client disconnecting cancels the response, as the ASGI handler does
+        self.assertEqual(events.get_broker().subscriber_count(), 1)
+        reader = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertEqual(events.get_broker().subscriber_count(), 0)
+
+    async def test_slow_client_is_told_to_resync(self):
+        broker = events.LocalBroker()
+        subscription = broker.subscribe(('groups',))
+        for i in range(broker.queue_size + 5):
+            broker.publish(('groups',), f'{i}'.encode())
+        broker.publish(('other',), b'elsewhere')
+        await asyncio.sleep(0)
+        self.assertEqual(await subscription.get(), events.RESYNC)
+        self.assertEqual(await subscription.get(), f'{broker.queue_size + 1}'.encode())
+        broker.unsubscribe(subscription)
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_requires_authentication_and_asgi(self):
+        self.assertEqual(self.client.get('/api/async/events/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(self.client.get('/api/async/events/').status_code, 501)
+
+
+class ArchiveTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.other = User.objects.create_user(username='bob', password='pass12345')
+        self.client.force_authenticate(self.user)
+        self.group = Group.objects.create(name='Work', owner=self.user)
+        for i in range(6):
+            Task.objects.create(title=f'Task {i}', description=f'note {i}', owner=self.user, group=self.group,
+                                completed=i < 4)
+        Task.objects.create(title='Theirs', description='...', owner=self.other, completed=True)
+        # Tasks 0-2 and bob's task were completed long ago
+        Task.objects.exclude(title='Task 3').filter(completed=True).update(
+            updated_at=timezone.now() - timedelta(days=100)
+        )
+        self.expected = list(Task.objects.filter(owner=self.user, completed=True).values_list('pk', flat=True))
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_tasks', '--days', '30', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def completed_ids(self, **params):
+        response = self.client.get('/api/tasks/completed/', params)
+        self.assertEqual(response.status_code, 200)
+        return [task['id'] for task in response.data['results']]
+
+    def test_completed_tasks_move_to_the_archive(self):
+        old = Task.objects.get(title='Task 0')
+        self.assertIn('Archived 4 tasks', self.archive())
+        self.assertEqual(sorted(Task.objects.values_list('title', flat=True)), ['Task 3', 'Task 4', 'Task 5'])
+        archived = ArchivedTask.objects.get(pk=old.pk)
+        self.assertEqual((archived.created_at, archived.updated_at, archived.group_id),
+                         (old.created_at, old.updated_at, self.group.pk))
+
+        # Not a deletion: no tombstones, and the counters still count them
+        self.assertFalse(Tombstone.objects.exists())
+        stats = self.client.get('/api/tasks/stats/').data
+        self.assertEqual((stats['total'], stats['completed']), (6, 4))
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+        self.assertEqual(len(self.client.get('/api/tasks/pending/').data['results']), 2)
+
+    def test_completed_endpoint_reads_both_tiers(self):
+        before = self.completed_ids()
+        self.assertEqual(sorted(before), sorted(self.expected))
+        self.archive()
+        self.assertEqual(self.completed_ids(), before)
+        self.assertEqual(self.client.get('/api/tasks/completed/').data['count'], 4)
+        self.assertEqual(self.completed_ids(ordering='-title'), sorted(before, reverse=True))
+        # The archive has no full-text index and falls back to icontains
+        self.assertEqual(self.completed_ids(search='note 1'), [ArchivedTask.objects.get(title='Task 1').pk])
+        self.assertEqual(self.completed_ids(fields='id'), before)
+
+        with mock.patch('tasks.pagination.PageNumberPagination.page_size', 3), \
+                mock.patch('tasks.pagination.TaskCursorPagination.page_size', 3):
+            self.assertEqual(self.completed_ids(page=2), before[3:])
+            first = self.client.get('/api/tasks/completed/', {'pagination': 'cursor'}).data
+            second = self.client.get(first['next']).data
+        self.assertEqual([t['id'] for t in first['results'] + second['results']], before)
+
+        response = self.client.get('/api/tasks/completed/', {'stream': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], before)
+        self.assertEqual(rows[-1]['group_name'], 'Work')
+
+    def test_restore(self):
+        task = Task.objects.get(title='Task 1')
+        before = self.completed_ids()
+        self.archive()
+        response = self.client.post(f'/api/tasks/{task.pk}/restore/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Task 1')
+        restored = Task.objects.get(pk=task.pk)
+        self.assertGreater(restored.updated_at, task.updated_at)
+        self.assertFalse(ArchivedTask.objects.filter(pk=task.pk).exists())
+        # Restored tasks count as recently changed and stay out of the archive
+        self.assertIn('Archived 0 tasks', self.archive())
+
+        theirs = ArchivedTask.objects.get(owner=self.other)
+        for pk in (task.pk, theirs.pk, 'abc'):
+            self.assertEqual(self.client.post(f'/api/tasks/{pk}/restore/').status_code, 404)
+
+        self.assertIn('Restored 2 tasks for alice', self.archive('--restore', 'alice'))
+        self.assertEqual(Task.objects.filter(owner=self.user).count(), 6)
+        self.assertEqual(self.completed_ids(), before)
+        call_command('rebuild_task_counters', '--check', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            self.archive('--restore', 'nobody')
+
+    def test_background_job_and_export(self):
+        out = StringIO()
+        call_command('archive_tasks', '--days', '30', '--background', stdout=out)
+        call_command('run_worker', '--once', stdout=out)
+        self.assertEqual(Job.objects.get(name='archive_tasks').result, {'archived': 4})
+        records = [json.loads(line) for line in ''.join(transfer.iter_export(self.user)).splitlines()]
+        self.assertEqual(len([r for r in records if r['type'] == 'task']), 6)
+
+
+class EncodingTests(GTDTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.client.force_authenticate(self.user)
+        for i in range(20):
+            Task.objects.create(title=f'Task {i}', description='Write the quarterly report', owner=self.user)
+
+    def test_dumps_matches_json_renderer(self):
+        moment = timezone.now()
+        data = {
+            'utc': moment, 'whole_second': moment.replace(microsecond=0),
+            'offset': moment.astimezone(timezone.get_fixed_timezone(90)), 'date': moment.date(),
+            'decimal': Decimal('1.5'), 'uuid': uuid.UUID(int=7), 'lazy': gettext_lazy('Tasks'),
+            'text': 'café  ', 'nested': [{'a': None, 'b': True}], 1: 'non-string key',
+        }
+        expected = JSONRenderer().render(data)
+        self.assertEqual(renderers.dumps(data), expected)
+        with mock.patch('tasks.renderers.orjson', None):
+            self.assertEqual(renderers.dumps(data), expected)
+
+    def test_native_datetimes_render_like_strings(self):
+        response = self.client.get('/api/tasks/')
+        tasks = Task.objects.filter(owner=self.user)
+        self.assertEqual(json.loads(response.content)['results'], TaskSerializer(tasks[:20], many=True).data)
+        self.assertEqual(b''.join(self.client.get('/api/tasks/?stream=ndjson').streaming_content).count(b'Z"'), 40)
+        # Indented output is left to DRF's renderer
+        response = self.client.get('/api/tasks/', HTTP_ACCEPT='application/json; indent=2')
+        self.assertIn(b'\n  "count": 20', response.content)
+
+    def test_parser(self):
+        response = self.client.post('/api/tasks/', '{"title": "café", "description": "..."}',
+                                    content_type='application/json')
+        self.assertEqual((response.status_code, response.data['title']), (201, 'café'))
+        for body in ('{"title": ', '{"title": NaN}'):
+            response = self.client.post('/api/tasks/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('JSON parse error', response.data['detail'])
+
+    def test_compression(self):
+        plain = self.client.get('/api/tasks/')
+        self.assertNotIn('Content-Encoding', plain)
+        response = self.client.get('/api/tasks/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content) / 3)
+        self.assertEqual(json.loads(gzip.decompress(response.content)), json.loads(plain.content))
+
+        # Weak ETags still revalidate
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        response = self.client.get('/api/tasks/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/api/tasks/?stream=ndjson', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).count(b'\n'), 20)
+
+        with mock.patch('tasks.compression.brotli', None):
+            self.assertNotIn('Content-Encoding', self.client.get('/api/tasks/', HTTP_ACCEPT_ENCODING='gzip;q=0, br'))
+        # Under COMPRESSION_MIN_SIZE
+        self.assertNotIn('Content-Encoding', self.client.get(f'/api/users/{self.user.pk}/', HTTP_ACCEPT_ENCODING='gzip'))
+
+    def test_negotiation(self):
+        with mock.patch('tasks.compression.brotli', object()):
+            self.assertEqual(compression.choose_coding('gzip, deflate, br'), 'br')
+            self.assertEqual(compression.choose_coding('br;q=0.5, gzip'), 'gzip')
+            self.assertEqual(compression.choose_coding('*'), 'br')
+        with mock.patch('tasks.compression.brotli', None):
+            self.assertEqual(compression.choose_coding('gzip, br'), 'gzip')
+            self.assertIsNone(compression.choose_coding('br'))
+        self.assertIsNone(compression.choose_coding('gzip;q=0, *;q=1'))
+        self.assertIsNone(compression.choose_coding(''))
+
+
+@skipUnless('replica' in settings.DATABASES, "needs DB_ENGINE=sqlite's replica alias")
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaTests(GTDTestCase):
+    """The replica test database stands in for a replica lagging behind the primary."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', password='pass12345')
+        self.bob = User.objects.create_user(username='bob', password='pass12345')
+        self.group = Group.objects.create(name='Home', owner=self.user)
+        self.written = Task.objects.create(title='Written task', description='...', owner=self.user, group=self.group)
+        # Without signals, which would write to the primary
+        User.objects.using('replica').bulk_create([self.user, self.bob])
+        Group.objects.using('replica').bulk_create([Group(pk=self.group.pk, name='Home', owner=self.user)])
+        self.replicated, _ = Task.objects.using('replica').bulk_create([
+            Task(pk=self.written.pk + 1, title='Replicated task', description='...', owner=self.user, group=self.group),
+            Task(pk=self.written.pk + 2, title="Bob's task", description='...', owner=self.bob),
+        ])
+        # Forget the setup's writes
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, url, user=None):
+        self.client.force_authenticate(user or self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [task['title'] for task in response.data['results']]
+
+    def test_reads_use_replica(self):
+        self.assertEqual(self.titles('/api/tasks/'), ['Replicated task'])
+        self.assertEqual(self.titles('/api/tasks/pending/'), ['Replicated task'])
+        self.assertEqual(self.titles('/api/tasks/completed/'), [])
+        self.assertEqual(self.titles(f'/api/groups/{self.group.pk}/tasks/'), ['Replicated task'])
+        self.assertEqual(self.client.get(f'/api/tasks/{self.replicated.pk}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.written.pk}/').status_code, 404)
+        # Actions other than these reads stay on the primary
+        self.assertEqual(self.client.get('/api/tasks/stats/').data['total'], 1)
+
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.titles('/api/tasks/?ordering=title'), ['Written task'])
+
+    def test_writes_and_authentication_use_primary(self):
+        key = AuthToken.issue(self.user)[1]
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(self.client.get('/api/tasks/').data['count'], 1)
+
+        response = self.client.post('/api/tasks/', {'title': 'New task', 'description': '...'})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Task.objects.using('default').filter(title='New task').exists())
+        self.assertFalse(Task.objects.using('replica').filter(title='New task').exists())
+
+        # An instance read from the replica is still saved to the primary
+        task = Task.objects.using('replica').get(pk=self.replicated.pk)
+        task.group = self.group
+        task.save()
+        self.assertTrue(Task.objects.using('default').filter(title='Replicated task').exists())
+
+    def test_counters_use_primary(self):
+        Task.objects.create(title='Another task', description='...', owner=self.user, group=self.group)
+        TaskCounter.objects.filter(group=self.group).delete()
+        cache.clear()
+        # Bob's listing reads the groups from the replica; the missing counter
+        # is counted and stored on the primary
+        self.client.force_authenticate(self.bob)
+        response = self.client.get('/api/groups/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([group['task_count'] for group in response.data['results']], [2])
+        self.assertEqual(TaskCounter.objects.using('default').get(group=self.group).total, 2)
+        self.assertFalse(TaskCounter.objects.using('replica').exists())
+
+    def test_read_your_writes(self):
+        response = self.client.post('/api/tasks/', {'title': 'New task', 'description': '...'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.titles('/api/tasks/?ordering=title'), ['New task', 'Written task'])
+        self.assertEqual(self.client.get(f"/api/tasks/{response.data['id']}/").status_code, 200)
+        # Other users' reads are not pinned
+        self.client.force_authenticate(self.bob)
+        response = self.client.get('/api/tasks/')
+        self.assertEqual([task['title'] for task in response.data['results']], ["Bob's task"])
+        self.assertIn('ETag', response)
+
+        # Alice's group change pins Alice. Bob's reads of the groups go to
+        # the primary for the same window, since the replica may not show
+        # it yet, and are cached under the new groups version
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.patch(f'/api/groups/{self.group.pk}/', {'name': 'House'}).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.written.pk}/').data['group_name'], 'House')
+        self.client.force_authenticate(self.bob)
+        response = self.client.get('/api/groups/')
+        self.assertEqual([group['name'] for group in response.data['results']], ['House'])
+        self.assertIn('ETag', response)
+        response = self.client.get('/api/groups/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        # Task payloads carry group names, so Bob's task listing is read from
+        # the primary too (where his replicated task does not exist)
+        response = self.client.get('/api/tasks/?completed=false')
+        self.assertEqual(response.data['results'], [])
+        self.assertIn('ETag', response)
+
+        # The pin expires
+        cache.clear()
+        self.assertEqual(self.titles('/api/tasks/'), ['Replicated task'])
@@ -0,0 +1,232 @@
+"""
+Export and import of a user's whole dataset (groups and tasks).
+
+The dataset is a stream of records, groups first, then tasks:
+
+    {"type": "group", "id": 3, "name": "Work", "description": "", "created_at": "..."}
+    {"type": "task", "id": 41, "title": "...", "description": "...", "due_date": null,
+     "completed": false, "created_at": "...", "group": 3}
+
+written as NDJSON (one record per line) or as one CSV file with the
+``CSV_COLUMNS`` header, where empty cells mean null.
+
+Export reads keyset-paginated chunks of ``.values()`` rows, so memory is
+bounded by ``chunk_size`` on every backend (MySQL's client buffers a whole
+result set even with ``.iterator()``). Import parses one record at a time
+and inserts ``batch_size`` rows per ``bulk_create``; it only keeps the map
+from exported to new group ids. Imported groups and tasks are new rows
+owned by the importing user, with new ids and creation timestamps.
+"""
+import csv
+import io
+
+from django.core import exceptions
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import counters
+from .caching import bump, invalidate_tasks
+from .models import ArchivedTask, Group, Task
+from .parsers import loads
+from .renderers import NDJSON_CONTENT_TYPE, dumps
+
+GROUP_FIELDS = ['id', 'name', 'description', 'created_at']
+TASK_FIELDS = ['id', 'title', 'description', 'due_date', 'completed', 'created_at', 'group']
+CSV_COLUMNS = ['type', 'id', 'name', 'title', 'description', 'due_date', 'completed', 'created_at', 'group']
+
+FORMATS = {'ndjson': NDJSON_CONTENT_TYPE, 'csv': 'text/csv'}
+
+
+def export_groups(user):
+    """The user's groups, plus other users' groups that their tasks are in."""
+    return Group.objects.filter(
+        Q(owner=user)
+        | Q(pk__in=Task.objects.filter(owner=user).values('group_id'))
+        | Q(pk__in=ArchivedTask.objects.filter(owner=user).values('group_id'))
+    )
+
+
+def _chunks(queryset, lookups, chunk_size):
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk').values(*lookups)[:chunk_size])
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]['id']
+
+
+def iter_records(user, chunk_size=2000):
+    """Yield lists of export records, ``chunk_size`` rows at a time."""
+    for rows in _chunks(export_groups(user), GROUP_FIELDS, chunk_size):
+        yield [{'type': 'group', **row} for row in rows]
+    lookups = [*TASK_FIELDS[:-1], 'group_id']
+    for model in (Task, ArchivedTask):
+        for rows in _chunks(model.objects.filter(owner=user), lookups, chunk_size):
+            for row in rows:
+                row['group'] = row.pop('group_id')
+            yield [{'type': 'task', **row} for row in rows]
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if hasattr(value, 'isoformat'):
+        # Same representation as the JSON output
+        return JSONEncoder().default(value)
+    return value
+
+
+def iter_export(user, fmt='ndjson', chunk_size=2000):
+    """Yield the user's dataset as NDJSON or CSV text, one chunk at a time."""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_COLUMNS)
+        for records in iter_records(user, chunk_size):
+            writer.writerows([_cell(record.get(column)) for column in CSV_COLUMNS] for record in records)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+    for records in iter_records(user, chunk_size):
+        yield ''.join(dumps(record).decode() + '\n' for record in records)
+
+
+def parse_ndjson(lines):
+    """Yield ``(line_number, record)`` from NDJSON text lines."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except ValueError:
+            raise serializers.ValidationError({'line': number, 'detail': 'Invalid JSON.'})
+        if not isinstance(record, dict):
+            raise serializers.ValidationError({'line': number, 'detail': 'Expected a JSON object.'})
+        yield number, record
+
+
+def parse_csv(lines):
+    """Yield ``(line_number, record)`` from CSV text lines, empty cells as None."""
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        return
+    missing = {'type', 'id'}.difference(reader.fieldnames)
+    if missing:
+        raise serializers.ValidationError({'line': 1, 'detail': f"Missing columns: {', '.join(sorted(missing))}."})
+    for row in reader:
+        yield reader.line_num, {key: value if value != '' else None for key, value in row.items() if key}
+
+
+PARSERS = {'ndjson': parse_ndjson, 'csv': parse_csv}
+
+
+def _clean(model, record, names, number):
+    """Validate ``record`` against the model fields ``names``."""
+    values, errors = {}, {}
+    for name in names:
+        field = model._meta.get_field(name)
+        value = record.get(name)
+        if value is None and not field.null:
+            value = field.get_default() if field.has_default() else ''
+        elif isinstance(value, str) and field.get_internal_type() == 'BooleanField':
+            # CSV exports write JSON-style booleans
+            value = {'true': True, 'false': False}.get(value.lower(), value)
+        try:
+            values[name] = field.clean(value, None)
+        except exceptions.ValidationError as exc:
+            errors[name] = exc.messages
+    if errors:
+        raise serializers.ValidationError({'line': number, **errors})
+    return values
+
+
+class Importer:
+    """Insert parsed records for ``user`` in batches, remapping group ids."""
+
+    def __init__(self, user, batch_size=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.group_ids = {}
+        self.groups = {}
+        self.tasks = []
+        self.counts = {'groups': 0, 'tasks': 0}
+
+    def add(self, number, record):
+        kind = record.get('type')
+        if kind == 'group':
+            self.add_group(number, record)
+        elif kind == 'task':
+            self.add_task(number, record)
+        else:
+            raise serializers.ValidationError({'line': number, 'type': ['Expected "group" or "task".']})
+
+    def add_group(self, number, record):
+        if self.tasks or self.counts['tasks']:
+            raise serializers.ValidationError({'line': number, 'detail': 'Groups must come before tasks.'})
+        key = str(record.get('id'))
+        if record.get('id') is None or key in self.group_ids or key in self.groups:
+            raise serializers.ValidationError({'line': number, 'id': ['A unique group id is required.']})
+        values = _clean(Group, record, ['name', 'description'], number)
+        self.groups[key] = Group(owner=self.user, **values)
+        if len(self.groups) >= self.batch_size:
+            self.flush_groups()
+
+    def add_task(self, number, record):
+        if self.groups:
+            self.flush_groups()
+        values = _clean(Task, record, ['title', 'description', 'due_date', 'completed'], number)
+        group = record.get('group')
+        if group is not None:
+            group_id = self.group_ids.get(str(group))
+            if group_id is None:
+                raise serializers.ValidationError({'line': number, 'group': [f'Unknown group {group}.']})
+            values['group_id'] = group_id
+        self.tasks.append(Task(owner=self.user, **values))
+        if len(self.tasks) >= self.batch_size:
+            self.flush_tasks()
+
+    def flush_groups(self):
+        groups = list(self.groups.values())
+        counters.create_many(groups)
+        self.group_ids.update((key, group.pk) for key, group in self.groups.items())
+        self.counts['groups'] += len(groups)
+        self.groups = {}
+
+    def flush_tasks(self):
+        Task.objects.bulk_create(self.tasks)
+        counters.record_many([(None, counters.TaskState.of(task)) for task in self.tasks])
+        self.counts['tasks'] += len(self.tasks)
+        self.tasks = []
+
+    def finish(self):
+        if self.groups:
+            self.flush_groups()
+        if self.tasks:
+            self.flush_tasks()
+        return self.counts
+
+
+def import_records(user, records, batch_size=1000):
+    """
+    Import ``(line_number, record)`` pairs for ``user`` in one transaction,
+    so an invalid record leaves nothing behind. Returns the counts created.
+    """
+    importer = Importer(user, batch_size)
+    with transaction.atomic():
+        for number, record in records:
+            importer.add(number, record)
+        counts = importer.finish()
+    # bulk_create() sends no post_save signals
+    invalidate_tasks(user.pk)
+    if counts['groups']:
+        bump('groups')
+    return counts
@@ -1,15 +1,29 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TaskViewSet, GroupViewSet, UserViewSet
+from . import async_views
+from .views import TaskViewSet, GroupViewSet, UserViewSet, JobViewSet
 
 router = DefaultRouter()
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'groups', GroupViewSet, basename='group')
+router.register(r'jobs', JobViewSet, basename='job')
 router.register(r'users', UserViewSet)
 router.register(r'users/profile', UserViewSet, basename='user-profile')
 
+# Async-native endpoints for ASGI deployments (see tasks/async_views.py)
+async_urlpatterns = [
+    path('tasks/', async_views.task_list, name='async-task-list'),
+    path('tasks/<int:pk>/', async_views.task_detail, name='async-task-detail'),
+    path('tasks/<int:pk>/toggle_completed/', async_views.task_toggle_completed, name='async-task-toggle-completed'),
+    path('groups/', async_views.group_list, name='async-group-list'),
+    path('groups/<int:pk>/', async_views.group_detail, name='async-group-detail'),
+    path('events/', async_views.event_list, name='async-events'),
+]
+
 
 urlpatterns = [
+    # First, so resolving them does not try (and keep a list of) every router route
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
     path('auth/', include('rest_framework.urls')),  # DRF login/logout views
-]
\ No newline at end of file
+]
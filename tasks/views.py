@@ -1,14 +1,132 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, UnsupportedMediaType
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+import io
+from datetime import timedelta
+
 from django.contrib.auth.models import User
-from .models import Task, Group
-from .serializers import TaskSerializer, GroupSerializer, UserSerializer
+from django.core import signing
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import archive, counters, events, jobs, transfer
+from .caching import cached_response, invalidate_tasks
+from .filters import TaskFilterBackend, TaskOrderingFilter
+from .metrics import InstrumentedViewMixin
+from .models import Task, ArchivedTask, Group, AuthToken, Job, Tombstone
+from .pagination import TaskPagination, GroupPagination
+from .permissions import IsOwnerOrReadOnly, is_owner, owned_by
+from .renderers import CSVRenderer, NDJSONRenderer
+from .serializers import (
+    TaskSerializer, GroupSerializer, UserSerializer, JobSerializer, ReassignSerializer, SparseFieldsMixin,
+)
+from .streaming import stream_ndjson
+
+
+def job_accepted(request, job):
+    """``202 Accepted`` with the background job doing the work, to poll at ``Location``."""
+    return Response(
+        JobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': reverse('job-detail', args=[job.pk], request=request)},
+    )
+
+
+class FieldSelectionMixin(InstrumentedViewMixin):
+    """
+    Sparse fieldsets: ``?fields=id,title`` on GET requests returns only those
+    fields and reads only the columns they need. Listings are serialized
+    straight from ``QuerySet.values()`` rows, without model instances.
+    """
+    fields_query_param = 'fields'
+
+    def get_requested_fields(self, serializer_class):
+        """The ``?fields=`` names valid for ``serializer_class``, or None for all."""
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            # No request while the schema is generated
+            return None
+        param = self.request.query_params.get(self.fields_query_param, '')
+        fields = [name.strip() for name in param.split(',') if name.strip()]
+        if not fields:
+            return None
+        unknown = sorted(set(fields) - set(serializer_class.readable_field_names()))
+        if unknown:
+            raise serializers.ValidationError({
+                self.fields_query_param: [f"Unknown field(s): {', '.join(unknown)}."]
+            })
+        return fields
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if issubclass(serializer_class, SparseFieldsMixin):
+            kwargs.setdefault('fields', self.get_requested_fields(serializer_class))
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'retrieve':
+            serializer_class = self.get_serializer_class()
+            fields = self.get_requested_fields(serializer_class)
+            if fields is not None:
+                queryset = self.select_fields(queryset, serializer_class(fields=fields))
+        return queryset
+
+    @staticmethod
+    def select_fields(queryset, serializer):
+        """Narrow ``queryset`` to the columns and joins ``serializer`` reads."""
+        lookups = serializer.value_lookups()
+        relations = {lookup.rsplit('__', 1)[0] for lookup in lookups if '__' in lookup}
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        return queryset.only(*lookups)
+
+    def values_response(self, queryset, serializer, paginator):
+        """Paginate and serialize ``queryset`` from ``.values()`` rows."""
+        lookups = serializer.value_lookups()
+        if paginator is not None and hasattr(paginator, 'key_fields'):
+            lookups += [field for field in paginator.key_fields() if field not in lookups]
+        rows = queryset.values(*lookups)
+        page = paginator.paginate_queryset(rows, self.request, view=self) if paginator else None
+        native = getattr(self.request.accepted_renderer, 'native_datetimes', False)
+        if page is None:
+            return Response(serializer.from_values(rows, native_datetimes=native))
+        return paginator.get_paginated_response(serializer.from_values(page, native_datetimes=native))
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        serializer = serializer_class(
+            fields=self.get_requested_fields(serializer_class),
+            context=self.get_serializer_context(),
+        )
+        return self.values_response(self.filter_queryset(self.get_queryset()), serializer, self.paginator)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class TaskListMixin(FieldSelectionMixin):
+    """
+    Shared response path for endpoints that return a list of tasks.
+    Results are paginated with TaskPagination; ``?stream=ndjson`` instead
+    streams every row as newline-delimited JSON.
+    """
+    task_pagination_class = TaskPagination
+
+    def task_list_response(self, request, queryset):
+        serializer = TaskSerializer(
+            fields=self.get_requested_fields(TaskSerializer),
+            context=self.get_serializer_context(),
+        )
+        if request.query_params.get('stream') == 'ndjson':
+            return stream_ndjson(queryset, serializer)
+        return self.values_response(queryset, serializer, self.task_pagination_class())
+
+
+class UserViewSet(FieldSelectionMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Users with registration and profile management.
     """
@@ -17,13 +135,13 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         """
-        Allow user creation (registration) and listing without authentication for testing,
-        but require authentication for other operations.
+        Allow user creation (registration) without authentication; other
+        operations require it, and users can only change or delete themselves.
         """
         if self.action in ['create']:
             permission_classes = [AllowAny]
         else:
-            permission_classes = [IsAuthenticated]
+            permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
         return [permission() for permission in permission_classes]
     
     def get_queryset(self):
@@ -32,6 +150,9 @@ class UserViewSet(viewsets.ModelViewSet):
         - Regular users: Can see all users (as per your requirement)
         - Unauthenticated: No access
         """
+        if getattr(self, 'swagger_fake_view', False):
+            # Schema generation runs without a request (see GTD/schema.py)
+            return User.objects.none()
         if not self.request.user.is_authenticated:
             return User.objects.none()
         
@@ -43,14 +164,72 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def token(self, request):
+        """
+        POST: issue an API token for the current user. The key is only shown once.
+        DELETE: revoke the token used for this request, or all of the user's
+        tokens when authenticated another way.
+        """
+        if request.method == 'DELETE':
+            if isinstance(request.auth, AuthToken):
+                request.auth.delete()
+            else:
+                request.user.auth_tokens.all().delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        token, key = AuthToken.issue(request.user)
+        return Response(
+            {'token': key, 'created_at': token.created_at},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+            renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Stream the current user's groups and tasks as NDJSON (default) or
+        CSV (``?format=csv`` or ``Accept: text/csv``).
+        """
+        fmt = request.accepted_renderer.format
+        response = StreamingHttpResponse(
+            transfer.iter_export(request.user, fmt),
+            content_type=transfer.FORMATS[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="gtd-export.{fmt}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated])
+    def import_data(self, request):
+        """
+        Import groups and tasks from an export, as new rows owned by the
+        current user. The body is read as a stream, so send it with
+        ``Content-Type: application/x-ndjson`` or ``text/csv``.
+        """
+        formats = {media_type: fmt for fmt, media_type in transfer.FORMATS.items()}
+        fmt = formats.get(request.content_type.split(';')[0].strip())
+        if fmt is None:
+            raise UnsupportedMediaType(request.content_type)
+        # Not request.data: that would read the whole body into memory
+        stream = request.stream or io.BytesIO()
+        try:
+            lines = (line.decode('utf-8') for line in iter(stream.readline, b''))
+            counts = transfer.import_records(request.user, transfer.PARSERS[fmt](lines))
+        except UnicodeDecodeError:
+            raise serializers.ValidationError({'detail': 'The body must be UTF-8 encoded.'})
+        return Response(counts, status=status.HTTP_201_CREATED)
+
 
-class GroupViewSet(viewsets.ModelViewSet):
+class GroupViewSet(TaskListMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Groups with full CRUD operations.
     Users can only see and manage their own groups.
     """
     serializer_class = GroupSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    pagination_class = GroupPagination
+    # Deleting a group with more tasks than this is left to a background job
+    inline_delete_limit = 1000
 
     def get_queryset(self):
         """
@@ -58,67 +237,100 @@ class GroupViewSet(viewsets.ModelViewSet):
         - Regular users: Can see all groups (as per your requirement)
         - Unauthenticated: No access (handled by permission_classes)
         """
+        queryset = Group.objects.select_related('owner', 'task_counter')
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
         if self.request.user.is_superuser:
-            return Group.objects.all()
+            return queryset
         else:
-            return Group.objects.all()
+            return queryset
 
     def perform_create(self, serializer):
         """Set the owner to the current user when creating a group"""
         if self.request.user.is_authenticated:
-            serializer.save(owner=self.request.user)
+            group = serializer.save(owner=self.request.user)
+            events.emit('group', 'created', [(group.owner_id, group.pk, serializer.data)])
 
-    def get_permissions(self):
+    def perform_update(self, serializer):
+        group = serializer.save()
+        events.emit('group', 'updated', [(group.owner_id, group.pk, serializer.data)])
+
+    def perform_destroy(self, instance):
+        owner_id, pk = instance.owner_id, instance.pk
+        instance.delete()
+        # Clients ungroup the group's tasks themselves
+        events.emit('group', 'deleted', [(owner_id, pk, None)])
+
+    def destroy(self, request, *args, **kwargs):
         """
-        - Superuser: Can perform all operations on all groups
-        - Regular users: Can view all groups, but only create/update/delete their own
+        Delete a group, ungrouping its tasks. With more than
+        ``inline_delete_limit`` tasks, a background job ungroups them in
+        batches and then deletes the group: the response is ``202 Accepted``
+        with the job, and the group remains until the job has run.
         """
-        permission_classes = [IsAuthenticated]
-        return [permission() for permission in permission_classes]
-
-    def update(self, request, *args, **kwargs):
-        """Only allow users to update their own groups (unless superuser)"""
         group = self.get_object()
-        if not request.user.is_superuser and group.owner != request.user:
-            return Response(
-                {"detail": "You can only update your own groups."}, 
-                status=status.HTTP_403_FORBIDDEN
-            )
-        return super().update(request, *args, **kwargs)
+        if counters.get_counter('group_id', group.pk).total <= self.inline_delete_limit:
+            self.perform_destroy(group)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        job = jobs.enqueue('reassign_group_tasks', owner=request.user, group_id=group.pk, delete=True)
+        return job_accepted(request, job)
 
-    def destroy(self, request, *args, **kwargs):
-        """Only allow users to delete their own groups (unless superuser)"""
+    @action(detail=True, methods=['post'], serializer_class=ReassignSerializer)
+    def reassign(self, request, pk=None):
+        """
+        Move every task of this group to another group (``{"group": id}``)
+        or ungroup them (``{"group": null}``) in a background job. Returns
+        ``202 Accepted`` with the job.
+        """
         group = self.get_object()
-        if not request.user.is_superuser and group.owner != request.user:
-            return Response(
-                {"detail": "You can only delete your own groups."}, 
-                status=status.HTTP_403_FORBIDDEN
-            )
-        return super().destroy(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['group']
+        if target is not None:
+            if target.pk == group.pk:
+                raise serializers.ValidationError({'group': ['Choose a different group.']})
+            if not is_owner(request.user, target):
+                raise PermissionDenied("You can only move tasks to your own groups.")
+        job = jobs.enqueue(
+            'reassign_group_tasks', owner=request.user, group_id=group.pk,
+            to_group_id=target.pk if target is not None else None,
+        )
+        return job_accepted(request, job)
+
+    @cached_response('groups', 'group_counts')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response('groups', 'group_counts')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     @action(detail=True, methods=['get'])
+    @cached_response('tasks', 'groups')
     def tasks(self, request, pk=None):
         """Get all tasks for a specific group"""
         group = self.get_object()
         
-        if request.user.is_superuser:
-            # Superuser can see all tasks in any group
-            tasks = Task.objects.filter(group=group)
-        else:
-            # Regular users can only see their own tasks in the group
-            tasks = Task.objects.filter(group=group, owner=request.user)
-        
-        serializer = TaskSerializer(tasks, many=True)
-        return Response(serializer.data)
+        # Regular users only see their own tasks in the group
+        tasks = owned_by(Task.objects.select_related('group', 'owner'), request.user).filter(group=group)
+
+        return self.task_list_response(request, tasks)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(TaskListMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Tasks with full CRUD operations.
     Users can only see and manage their own tasks.
     """
     serializer_class = TaskSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
+    pagination_class = TaskPagination
+    filter_backends = [TaskFilterBackend, TaskOrderingFilter]
+    bulk_max_items = 1000
+    # Changes committed slightly out of timestamp order are re-sent rather than missed
+    sync_overlap = timedelta(seconds=5)
+    # Tombstones older than this are pruned; older watermarks require a full resync
+    sync_retention = timedelta(days=30)
 
     def get_queryset(self):
         """
@@ -126,61 +338,280 @@ class TaskViewSet(viewsets.ModelViewSet):
         - Regular users: Can see only their own tasks
         - Unauthenticated: No access (handled by permission_classes)
         """
-        if self.request.user.is_superuser:
-            return Task.objects.all()
-        else:
-            # Regular users can only see their own tasks
-            return Task.objects.filter(owner=self.request.user)
+        queryset = Task.objects.select_related('group', 'owner')
+        if getattr(self, 'swagger_fake_view', False):
+            return queryset.none()
+        return owned_by(queryset, self.request.user)
+
+    @cached_response('tasks', 'groups')
+    def list(self, request, *args, **kwargs):
+        """List the current user's tasks (paginated, or streamed with ?stream=ndjson)"""
+        return self.task_list_response(request, self.filter_queryset(self.get_queryset()))
+
+    @cached_response('tasks', 'groups')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         """Set the owner to the current user when creating a task"""
-        serializer.save(owner=self.request.user)
+        task = serializer.save(owner=self.request.user)
+        events.emit('task', 'created', [(task.owner_id, task.pk, serializer.data)])
 
-    def update(self, request, *args, **kwargs):
-        """Only allow users to update their own tasks (unless superuser)"""
-        task = self.get_object()
-        if not request.user.is_superuser and task.owner != request.user:
+    def perform_update(self, serializer):
+        task = serializer.save()
+        events.emit('task', 'updated', [(task.owner_id, task.pk, serializer.data)])
+
+    def perform_destroy(self, instance):
+        owner_id, pk = instance.owner_id, instance.pk
+        instance.delete()
+        events.emit('task', 'deleted', [(owner_id, pk, None)])
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        Create (POST), update (PATCH) or delete (DELETE) many tasks at once.
+        POST and PATCH take a list of task objects (PATCH items need an "id"),
+        DELETE takes a list of task ids (or of objects with an "id"). The
+        batch is written in a single transaction only if every item is valid;
+        otherwise nothing is written and the response lists the errors of each
+        item by position.
+        """
+        items = request.data
+        if not isinstance(items, list):
             return Response(
-                {"detail": "You can only update your own tasks."}, 
-                status=status.HTTP_403_FORBIDDEN
+                {"detail": "Expected a list of items."},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        return super().update(request, *args, **kwargs)
-
-    def destroy(self, request, *args, **kwargs):
-        """Only allow users to delete their own tasks (unless superuser)"""
-        task = self.get_object()
-        if not request.user.is_superuser and task.owner != request.user:
+        if len(items) > self.bulk_max_items:
             return Response(
-                {"detail": "You can only delete your own tasks."}, 
-                status=status.HTTP_403_FORBIDDEN
+                {"detail": f"At most {self.bulk_max_items} items per request."},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        return super().destroy(request, *args, **kwargs)
+
+        if request.method == 'POST':
+            return self._bulk_create(items)
+        if request.method == 'PATCH':
+            return self._bulk_update(items)
+        return self._bulk_destroy(items)
+
+    def _bulk_create(self, items):
+        batch = [self.get_serializer(data=item) for item in items]
+        errors = [{} if s.is_valid() else s.errors for s in batch]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        tasks = [Task(owner=self.request.user, **s.validated_data) for s in batch]
+        with transaction.atomic():
+            counters.create_many(tasks)
+        # bulk_create() sends no post_save signals
+        invalidate_tasks(self.request.user.pk)
+        serializer = self.get_serializer(tasks, many=True)
+        events.emit('task', 'created', [
+            (task.owner_id, task.pk, data) for task, data in zip(tasks, serializer.data)
+        ])
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _item_id(item):
+        """The task id of a bulk item (an id, or an object with an "id"), or None if it has none."""
+        if isinstance(item, dict):
+            item = item.get('id')
+        # Not isinstance(): JSON true would be task 1
+        return item if type(item) is int else None
+
+    @staticmethod
+    def _missing(pk):
+        return {"id": ["Not found." if pk is not None else "A valid integer is required."]}
+
+    def _bulk_update(self, items):
+        ids = [self._item_id(item) if isinstance(item, dict) else None for item in items]
+        with transaction.atomic():
+            # Validate and apply each item against its row as read under a
+            # lock, and write only the columns the item submitted, so
+            # concurrent writes to other columns (and the counters) are not
+            # overwritten with stale values
+            instances = self.get_queryset().select_for_update(of=('self',)).in_bulk(
+                [pk for pk in ids if pk is not None]
+            )
+            batch, errors = [], []
+            for item, pk in zip(items, ids):
+                instance = instances.get(pk)
+                if instance is None:
+                    errors.append(self._missing(pk))
+                    continue
+                serializer = self.get_serializer(instance, data=item, partial=True)
+                batch.append(serializer)
+                errors.append({} if serializer.is_valid() else serializer.errors)
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+            changes = {}
+            for serializer in batch:
+                changes.setdefault(serializer.instance.pk, {}).update(serializer.validated_data)
+            now = timezone.now()
+            writes, transitions = {}, []
+            for pk, values in changes.items():
+                task = instances[pk]
+                old_state = counters.TaskState.of(task)
+                for attr, value in values.items():
+                    setattr(task, attr, value)
+                task.updated_at = now
+                transitions.append((old_state, counters.TaskState.of(task)))
+                writes.setdefault(tuple(sorted({*values, 'updated_at'})), []).append(task)
+            for fields, tasks in writes.items():
+                Task.objects.bulk_update(tasks, fields)
+            counters.record_many(transitions)
+        tasks = [instances[pk] for pk in changes]
+        # bulk_update() sends no post_save signals
+        invalidate_tasks(*[task.owner_id for task in tasks])
+        serializer = self.get_serializer(tasks, many=True)
+        events.emit('task', 'updated', [
+            (task.owner_id, task.pk, data) for task, data in zip(tasks, serializer.data)
+        ])
+        return Response(serializer.data)
+
+    def _bulk_destroy(self, items):
+        ids = [self._item_id(item) for item in items]
+        queryset = self.get_queryset().filter(pk__in=[pk for pk in ids if pk is not None])
+        found = dict(queryset.values_list('pk', 'owner_id'))
+        errors = [{} if pk in found else self._missing(pk) for pk in ids]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            queryset.delete()
+        events.emit('task', 'deleted', [(owner_id, pk, None) for pk, owner_id in found.items()])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Return tasks and groups changed since the ``since`` watermark, plus the
+        ids of those deleted, and a new watermark for the next call. Omit
+        ``since`` for a full snapshot.
+        """
+        now = timezone.now()
+        since = None
+        token = request.query_params.get('since')
+        if token:
+            try:
+                since = parse_datetime(signing.loads(token, salt='tasks.sync'))
+            except (signing.BadSignature, TypeError, ValueError):
+                since = None
+            if since is None:
+                return Response(
+                    {"detail": "Invalid sync watermark."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if since < now - self.sync_retention:
+                return Response(
+                    {"detail": "Sync watermark expired, fetch a full snapshot."},
+                    status=status.HTTP_410_GONE
+                )
+
+        tasks = self.get_queryset()
+        groups = Group.objects.select_related('owner', 'task_counter')
+        tombstones = Tombstone.objects.all()
+        if not request.user.is_superuser:
+            tombstones = tombstones.filter(Q(owner_id=request.user.pk) | Q(model=Tombstone.GROUP))
+        if since is not None:
+            changed_after = since - self.sync_overlap
+            tasks = tasks.filter(updated_at__gt=changed_after)
+            groups = groups.filter(updated_at__gt=changed_after)
+            tombstones = tombstones.filter(deleted_at__gt=changed_after)
+        else:
+            tombstones = tombstones.none()
+
+        deleted = {'tasks': [], 'groups': []}
+        for model, object_id in tombstones.values_list('model', 'object_id'):
+            deleted[f'{model}s'].append(object_id)
+
+        context = self.get_serializer_context()
+        return Response({
+            'tasks': TaskSerializer(tasks, many=True, context=context).data,
+            'groups': GroupSerializer(groups, many=True, context=context).data,
+            'deleted': deleted,
+            'watermark': events.watermark(now),
+        })
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Task counts (total, completed, pending, overdue) for the current user,
+        or for one group with ?group=<id>. Reads one precomputed counter row.
+        """
+        group = request.query_params.get('group')
+        if group:
+            if not group.isdigit() or not Group.objects.filter(pk=group).exists():
+                return Response(
+                    {"detail": "No Group matches the given query."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            counter = counters.get_counter('group_id', int(group))
+        else:
+            counter = counters.get_counter('user_id', request.user.pk)
+        return Response({
+            'total': counter.total,
+            'completed': counter.completed,
+            'pending': counter.pending,
+            'overdue': counter.overdue,
+        })
 
     @action(detail=True, methods=['post'])
     def toggle_completed(self, request, pk=None):
         """Toggle the completed status of a task"""
-        task = self.get_object()
-        if not request.user.is_superuser and task.owner != request.user:
-            return Response(
-                {"detail": "You can only toggle your own tasks."}, 
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        task.completed = not task.completed
-        task.save()
+        # One conditional UPDATE (completed = NOT completed) on the user's own
+        # tasks, so concurrent toggles never overwrite each other
+        try:
+            task = self.get_queryset().toggle_completed(pk)
+        except (TypeError, ValueError):
+            task = None
+        if task is None:
+            raise NotFound("No Task matches the given query.")
+        invalidate_tasks(task.owner_id)
         serializer = self.get_serializer(task)
+        events.emit('task', 'updated', [(task.owner_id, task.pk, serializer.data)])
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        """Move an archived task back to the live tasks"""
+        try:
+            restored = archive.restore(owned_by(ArchivedTask.objects.all(), request.user).filter(pk=pk))
+        except (TypeError, ValueError):
+            restored = 0
+        if not restored:
+            raise NotFound("No archived Task matches the given query.")
+        task = self.get_queryset().get(pk=pk)
+        serializer = self.get_serializer(task)
+        events.emit('task', 'updated', [(task.owner_id, task.pk, serializer.data)])
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cached_response('tasks', 'groups')
     def completed(self, request):
-        """Get all completed tasks for the current user"""
-        completed_tasks = self.get_queryset().filter(completed=True)
-        serializer = self.get_serializer(completed_tasks, many=True)
-        return Response(serializer.data)
+        """Get all completed tasks for the current user, archived ones included"""
+        completed_tasks = self.filter_queryset(self.get_queryset()).filter(completed=True)
+        archived_tasks = self.filter_queryset(owned_by(ArchivedTask.objects.all(), request.user))
+        return self.task_list_response(request, archive.TieredQuerySet(completed_tasks, archived_tasks))
 
     @action(detail=False, methods=['get'])
+    @cached_response('tasks', 'groups')
     def pending(self, request):
         """Get all pending tasks for the current user"""
-        pending_tasks = self.get_queryset().filter(completed=False)
-        serializer = self.get_serializer(pending_tasks, many=True)
-        return Response(serializer.data)
+        pending_tasks = self.filter_queryset(self.get_queryset()).filter(completed=False)
+        return self.task_list_response(request, pending_tasks)
+
+
+class JobViewSet(FieldSelectionMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Background jobs started by the current user (every job for superusers),
+    for polling the ``202 Accepted`` responses of deferred operations.
+    """
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Job.objects.none()
+        return owned_by(Job.objects.all(), self.request.user)